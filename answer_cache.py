@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+import numpy as np
+
+# ✅ 상품별 답변 캐시 (같은/비슷한 질문이면 검색 + LLM 호출 없이 저장된 답변 반환)
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.93))  # 이 코사인 유사도 이상이면 같은 질문으로 판단
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 3600))  # 답변 보관 기간 (초)
+ANSWER_CACHE_MAX_PER_PRODUCT = int(os.getenv("ANSWER_CACHE_MAX_PER_PRODUCT", 200))  # 상품당 최대 답변 수 (초과 시 LRU 삭제)
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def normalize_question(question):
+    """📌 공백/문장부호 차이만 있는 질문은 같은 키가 되도록 정리"""
+    question = re.sub(r"[\s?!.~,]+", " ", question.lower())
+    return question.strip()
+
+
+class AnswerCache:
+    """📌 (상품, 인덱스 버전)별 질문 임베딩 → 답변 캐시 (정확히 같은 질문 → 비슷한 질문 순으로 조회)"""
+
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_per_product=ANSWER_CACHE_MAX_PER_PRODUCT):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_product = max(1, max_per_product)
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0  # 원래 답변 시간 - 캐시 응답 시간의 합
+        self._lock = threading.Lock()
+        self._matrices = {}  # (상품, 버전) → (id 목록, 정규화된 벡터 행렬) (저장/삭제 시 다시 생성)
+        self._checked_versions = {}  # 상품 → 마지막으로 확인한 인덱스 버전
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY, product TEXT NOT NULL, version TEXT NOT NULL, "
+            "question_key TEXT NOT NULL, question TEXT, vector BLOB, answer TEXT NOT NULL, latency REAL, "
+            "created_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_product ON answers (product, version, question_key)")
+        self._conn.commit()
+
+    def _sync_version(self, product, version):
+        """인덱스가 다시 만들어졌으면(버전 변경) 이전 버전 답변 삭제"""
+        if self._checked_versions.get(product) == version:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM answers WHERE product = ? AND version != ?", (product, version)
+        ).rowcount
+        self._conn.commit()
+        self._checked_versions[product] = version
+        self._matrices = {key: value for key, value in self._matrices.items() if key[0] != product}
+        if deleted:
+            print(f"🗑 인덱스 변경으로 저장된 답변 {deleted}개 삭제 ({product})")
+
+    def _matrix(self, product, version):
+        key = (product, version)
+        if key not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT id, vector FROM answers WHERE product = ? AND version = ? AND created_at > ? AND vector IS NOT NULL",
+                (product, version, time.time() - self.ttl),
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+            self._matrices[key] = (ids, matrix)
+        return self._matrices[key]
+
+    def _hit(self, row_id, started, similarity):
+        """저장된 답변 반환 + 통계 갱신 (그 사이 만료/삭제되었으면 None)"""
+        row = self._conn.execute(
+            "SELECT answer, latency FROM answers WHERE id = ? AND created_at > ?", (row_id, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        answer, latency = row
+        self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), row_id))
+        self._conn.commit()
+        elapsed = time.perf_counter() - started
+        self.hits += 1
+        self.saved_seconds += max(0.0, (latency or 0.0) - elapsed)
+        return {"answer": answer, "similarity": similarity, "seconds": elapsed, "saved": max(0.0, (latency or 0.0) - elapsed)}
+
+    def lookup_exact(self, product, version, question):
+        """📌 정규화한 질문이 같은 답변 조회 (임베딩 없이 바로 확인, 없으면 None)"""
+        started = time.perf_counter()
+        with self._lock:
+            self._sync_version(product, version)
+            row = self._conn.execute(
+                "SELECT id FROM answers WHERE product = ? AND version = ? AND question_key = ? AND created_at > ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (product, version, normalize_question(question), time.time() - self.ttl),
+            ).fetchone()
+            return self._hit(row[0], started, 1.0) if row else None  # 없으면 임베딩 조회에서 miss로 집계
+
+    def lookup(self, product, version, vector):
+        """📌 질문 임베딩과 가장 비슷한 저장된 질문이 threshold 이상이면 그 답변 반환 (없으면 None, miss로 집계)"""
+        started = time.perf_counter()
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        with self._lock:
+            self._sync_version(product, version)
+            ids, matrix = self._matrix(product, version)
+            if matrix is not None:
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    hit = self._hit(ids[best], started, float(similarities[best]))
+                    if hit is not None:
+                        self.semantic_hits += 1
+                        return hit
+                    self._matrices.pop((product, version), None)  # 만료된 답변이 남아 있던 행렬은 다시 생성
+            self.misses += 1
+            return None
+
+    def store(self, product, version, question, vector, answer, latency):
+        """📌 새 답변 저장 (만료된 답변 삭제, 상품당 최대 개수를 넘으면 오래 사용하지 않은 답변부터 삭제)"""
+        if not answer:
+            return
+        normalized = None
+        if vector is not None:
+            normalized = np.asarray(vector, dtype=np.float32)
+            normalized = (normalized / (np.linalg.norm(normalized) or 1.0)).tobytes()
+
+        now = time.time()
+        with self._lock:
+            self._sync_version(product, version)
+            self._conn.execute(
+                "INSERT INTO answers (product, version, question_key, question, vector, answer, latency, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (product, version, normalize_question(question), question, normalized, answer, latency, now, now),
+            )
+            self._conn.execute("DELETE FROM answers WHERE product = ? AND created_at <= ?", (product, now - self.ttl))
+            self._conn.execute(
+                "DELETE FROM answers WHERE product = ? AND id NOT IN "
+                "(SELECT id FROM answers WHERE product = ? ORDER BY last_used DESC LIMIT ?)",
+                (product, product, self.max_per_product),
+            )
+            self._conn.commit()
+            self._matrices.pop((product, version), None)
+
+    def invalidate(self, product):
+        """📌 상품 인덱스를 다시 만들었을 때 저장된 답변 전체 삭제"""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers WHERE product = ?", (product,))
+            self._conn.commit()
+            self._checked_versions.pop(product, None)
+            self._matrices = {key: value for key, value in self._matrices.items() if key[0] != product}
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+
+def get_cache():
+    """📌 프로세스 전체에서 공유하는 기본 답변 캐시 반환"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache()
+        return _default_cache
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import resource
+import argparse
+import tempfile
+import contextlib
+import io
+import numpy as np
+from langchain_core.documents import Document
+import catalog_index
+
+# ✅ 카탈로그 인덱스 규모별 성능: 상품 수가 늘어날 때 검색 지연 / 메모리 / 상품 추가·삭제 시간
+# 사용법: python bench_catalog.py --products 10 100 1000 2000 --chunks 30
+#        임베딩 API 없이 합성 벡터 사용 (카테고리 중심 + 상품별 변화 + 청크 노이즈 → 비슷한 상품끼리 가까움)
+#        post-filter = 전체에서 fetch_k개를 찾은 뒤 상품으로 거르는 방식 (LangChain FAISS filter=) 과 재현율 비교
+#        검색기 = QA에서 쓰는 CatalogRetriever (상품 범위 벡터 검색 + BM25 + RRF + SQLite 문서 조회) 전체 시간
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+CATEGORIES = 20
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+
+
+class SyntheticCatalog:
+    """📌 상품별 합성 청크 벡터 생성기 (같은 상품 번호는 항상 같은 벡터)"""
+
+    def __init__(self, dimension, chunks, seed=0):
+        self.dimension = dimension
+        self.chunks = chunks
+        self.centers = np.random.default_rng(seed).standard_normal((CATEGORIES, dimension)).astype(np.float32)
+
+    def product(self, number):
+        rng = np.random.default_rng(number + 1)
+        base = self.centers[number % CATEGORIES] + 0.05 * rng.standard_normal(self.dimension).astype(np.float32)
+        vectors = base + 0.5 * rng.standard_normal((self.chunks, self.dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        documents = [
+            Document(page_content=f"상품 {number} 청크 {i}", metadata={"source": f"image_1_crop_{i}.jpg", "chunk": 0})
+            for i in range(self.chunks)
+        ]
+        return documents, vectors
+
+
+def measure(catalog, synthetic, added, queries, fetch_k, rng):
+    """📌 (필터 검색 시간, 전체 검색 시간, post-filter 재현율, 검색기 생성 시간, 검색기 검색 시간, 검색기 상품 일치율)
+    질문 = 상품 청크 평균 방향 + 노이즈, 정답 = 상품 범위 필터 검색(정확한 Flat 검색) 상위 4개"""
+    filtered, unfiltered, builds, retrievals = [], [], [], []
+    recall = 0.0
+    matched = returned = 0
+    for _ in range(queries):
+        number = int(rng.integers(added))
+        _, vectors = synthetic.product(number)
+        query = vectors.mean(axis=0) + 0.03 * rng.standard_normal(synthetic.dimension).astype(np.float32)
+        product_id = f"p{number}"
+
+        started = time.perf_counter()
+        expected = [vector_id for vector_id, _ in catalog.search_ids(query, 4, product_id=product_id)]
+        filtered.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        results = catalog.search_ids(query, fetch_k)
+        unfiltered.append(time.perf_counter() - started)
+        low, high = catalog_index._id_range(catalog._codes[product_id])
+        post_filtered = [vector_id for vector_id, _ in results if low <= vector_id < high][:4]
+        recall += len(set(post_filtered) & set(expected)) / len(expected)
+
+        # QA 경로: 상품별 검색기 생성(BM25) → 하이브리드 검색 → Document 반환
+        started = time.perf_counter()
+        retriever = catalog_index.CatalogRetriever.for_product(catalog, product_id, embeddings=None)
+        builds.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        documents = retriever.search_with_vector(f"상품 {number} 청크 {int(rng.integers(synthetic.chunks))}", query)
+        retrievals.append(time.perf_counter() - started)
+        matched += sum(doc.metadata["product_id"] == product_id for doc in documents)
+        returned += len(documents)
+    return filtered, unfiltered, recall / queries, builds, retrievals, matched / (returned or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카탈로그 인덱스 규모별 벤치마크")
+    parser.add_argument("--products", type=int, nargs="+", default=[10, 100, 500, 1000, 2000])
+    parser.add_argument("--chunks", type=int, default=30, help="상품당 청크 수")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--fetch-k", type=int, default=20, help="post-filter 비교용 전체 검색 후보 수")
+    args = parser.parse_args()
+
+    synthetic = SyntheticCatalog(args.dimension, args.chunks)
+    rng = np.random.default_rng(42)
+    print(f"🚀 상품당 청크 {args.chunks}개 / {args.dimension}차원 / 질문 {args.queries}개")
+    print(
+        f"{'상품':>6}{'벡터':>9}{'필터p50':>9}{'필터p95':>9}{'전체p50':>9}{'추가':>8}{'삭제':>8}"
+        f"{'post재현율':>9}{'검색기생성':>8}{'검색기p50':>9}{'상품일치':>7}{'인덱스MB':>9}{'RSS MB':>8}{'로드':>7}"
+    )
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "catalog.sqlite3")
+        catalog = catalog_index.CatalogIndex(path)
+        added = 0
+        for target in sorted(args.products):
+            add_times = []
+            with contextlib.redirect_stdout(io.StringIO()):  # 상품별 추가 로그 생략
+                while added < target:
+                    documents, vectors = synthetic.product(added)
+                    started = time.perf_counter()
+                    catalog.add_product(f"p{added}", documents, vectors)
+                    add_times.append(time.perf_counter() - started)
+                    added += 1
+
+                # 상품 하나 삭제 → 다시 추가 (전체 재생성 없이 해당 상품만)
+                number = int(rng.integers(added))
+                started = time.perf_counter()
+                catalog.remove_product(f"p{number}")
+                remove_time = time.perf_counter() - started
+                catalog.add_product(f"p{number}", *synthetic.product(number))
+
+            filtered, unfiltered, post_recall, builds, retrievals, match_rate = measure(
+                catalog, synthetic, added, args.queries, args.fetch_k, rng
+            )
+
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                catalog_index.CatalogIndex(path)  # 재시작 시 SQLite → FAISS 로드 시간
+            load_time = time.perf_counter() - started
+
+            stats = catalog.stats()
+            print(
+                f"{added:>6}{stats['vectors']:>9}{percentile(filtered, 50):>8.2f}ms{percentile(filtered, 95):>7.2f}ms"
+                f"{percentile(unfiltered, 50):>7.2f}ms{np.mean(add_times[-50:]) * 1000:>6.1f}ms{remove_time * 1000:>6.1f}ms"
+                f"{post_recall:>11.2f}{percentile(builds, 50):>9.2f}ms{percentile(retrievals, 50):>8.2f}ms{match_rate:>9.2f}"
+                f"{stats['index_bytes'] / 1024 / 1024:>9.1f}{peak_rss_mb():>8.0f}{load_time:>6.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import sys
+import glob
+import time
+import asyncio
+import argparse
+import image_executor
+
+# ✅ 스레드 풀 / 프로세스 풀(공유 메모리) 이미지 전처리 성능 비교
+# 사용법: python bench_image_executor.py --workers 8 --repeat 3
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+FIXTURE_PATTERN = "test/case*/download_images/*"
+
+
+async def run_once(executor, image_paths):
+    """📌 모든 이미지를 동시에 디코딩 → 분할 → 샤프닝 + 인코딩 (원본 파일은 삭제하지 않음)"""
+    from jpg2text_run import find_crop_bounds  # 프로세스 작업자에서는 import하지 않도록 지연 import
+
+    async def process(image_path):
+        image = await executor.load(image_path)
+        if image is None:
+            return 0, 0
+        encoded = await executor.encode_crops(image, find_crop_bounds(image))
+        return len(encoded), sum(len(data) for data in encoded if data)
+
+    results = await asyncio.gather(*[process(path) for path in image_paths])
+    return sum(crops for crops, _ in results), sum(size for _, size in results)
+
+
+async def bench(backend, workers, image_paths, repeat):
+    executor = image_executor.ImageExecutor(backend, workers)
+    try:
+        await run_once(executor, image_paths[:1])  # 워밍업 (프로세스 시작 비용 제외)
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            crops, size = await run_once(executor, image_paths)
+            timings.append(time.perf_counter() - start)
+    finally:
+        executor.shutdown()
+
+    best = min(timings)
+    print(
+        f"{backend:<8} workers={workers:<3} images={len(image_paths):<3} crops={crops:<4} "
+        f"best={best:.3f}s avg={sum(timings) / len(timings):.3f}s "
+        f"({len(image_paths) / best:.1f} images/s, {size / 1024 / 1024:.1f}MB encoded)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이미지 전처리 실행기 벤치마크")
+    parser.add_argument("--workers", type=int, default=image_executor.IMAGE_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image_paths = sorted(glob.glob(FIXTURE_PATTERN))
+    if not image_paths:
+        print(f"❌ 벤치마크 이미지를 찾을 수 없습니다: {FIXTURE_PATTERN}")
+        return
+
+    for backend in ("thread", "process"):
+        asyncio.run(bench(backend, args.workers, image_paths, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
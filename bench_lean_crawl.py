@@ -0,0 +1,135 @@
+import sys
+import glob
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from playwright.sync_api import sync_playwright
+import jpg_crowling
+from product_page import parse_product_page
+from bench_page_parse import FIXTURE_PATTERN, FRAGMENT_PATTERN, synthetic_page
+
+# ✅ 로컬에서 띄운 상품 페이지로 get_html 전체 로드 vs lean 모드 비교 (페이지 시간, 전송 바이트, 추출 결과)
+# 사용법: python bench_lean_crawl.py --repeat 3
+#        저장된 페이지(test/caseN/main_image/page.html)가 있으면 사용, 없으면 합성 페이지 사용
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+IMAGE_BYTES = 150 * 1024  # 로컬 서버가 돌려주는 이미지 하나의 크기 (상세 이미지 크기와 비슷하게)
+TRACKER_SCRIPT = "/log/tracker.js"  # 분석 스크립트 흉내 (lean 모드에서 차단되어야 함)
+
+
+class PageServer:
+    """📌 저장된 페이지 + 가짜 이미지/스크립트를 제공하고 전송 바이트를 세는 로컬 HTTP 서버"""
+
+    def __init__(self, pages):
+        self.pages = pages  # 경로 → HTML
+        self.bytes_sent = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in server.pages:
+                    body, content_type = server.pages[self.path].encode("utf-8"), "text/html; charset=utf-8"
+                elif self.path == TRACKER_SCRIPT:
+                    body, content_type = b"/*" + b"x" * 50000 + b"*/", "application/javascript"
+                elif self.path.endswith(".jpg"):
+                    body, content_type = b"\xff\xd8" + b"\0" * IMAGE_BYTES, "image/jpeg"
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+                    server.requests += 1
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self._lock:
+            self.bytes_sent = 0
+            self.requests = 0
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def load_pages():
+    """📌 /caseN 경로 → 페이지 HTML (이미지는 로컬 서버를 가리키도록 구성)"""
+    pages = {}
+    for i, path in enumerate(sorted(glob.glob(FIXTURE_PATTERN)), 1):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[f"/saved{i}"] = f.read()
+    if not pages:
+        print(f"⚠ 저장된 페이지({FIXTURE_PATTERN})가 없어 조각 파일로 만든 합성 페이지를 사용합니다.")
+        for i, folder in enumerate(sorted(glob.glob(FRAGMENT_PATTERN)), 1):
+            html = synthetic_page(folder, filler_blocks=300, image_host="/img")
+            pages[f"/case{i}"] = html.replace("</head>", f'<script src="{TRACKER_SCRIPT}"></script></head>')
+    return pages
+
+
+def run(context, server, url, lean, repeat):
+    """📌 같은 페이지를 repeat번 가져와서 최소 시간, 평균 전송 바이트, 추출 결과 반환"""
+    timings, transferred, html = [], [], None
+    for _ in range(repeat):
+        server.reset()
+        start = time.perf_counter()
+        html, ok = jpg_crowling.fetch_html(context, url, lean=lean)
+        timings.append(time.perf_counter() - start)
+        transferred.append(server.bytes_sent)
+        if not ok:
+            return None
+    return min(timings), sum(transferred) / len(transferred), len(html), parse_product_page(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lean 페이지 로드 벤치마크 (로컬 서버)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if not pages:
+        print("❌ 벤치마크 페이지를 찾을 수 없습니다.")
+        return
+
+    server = PageServer(pages)
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True, args=jpg_crowling.BROWSER_ARGS)
+            context = browser.new_context()
+            for path in pages:
+                url = server.base_url + path
+                full = run(context, server, url, lean=False, repeat=args.repeat)
+                lean = run(context, server, url, lean=True, repeat=args.repeat)
+                if full is None or lean is None:
+                    print(f"❌ {path}: 페이지를 가져오지 못했습니다.")
+                    continue
+
+                full_time, full_bytes, full_html, full_page = full
+                lean_time, lean_bytes, lean_html, lean_page = lean
+                same = "✅ 추출 결과 동일" if full_page == lean_page else "❌ 추출 결과 다름"
+                print(
+                    f"📊 {path} (이미지 {len(lean_page.detail_image_urls)}개, {same})\n"
+                    f"   전체 로드: {full_time:.3f}s, 전송 {full_bytes / 1024:.0f}KB, 직렬화 HTML {full_html / 1024:.0f}KB\n"
+                    f"   lean 모드: {lean_time:.3f}s, 전송 {lean_bytes / 1024:.0f}KB, 직렬화 HTML {lean_html / 1024:.0f}KB"
+                )
+            browser.close()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import tracemalloc
+from bs4 import BeautifulSoup
+import product_page
+
+# ✅ 상품 페이지 파싱 성능 비교: 기존 방식 (html.parser로 4번 파싱) vs parse_product_page (1번 파싱)
+# 사용법: python bench_page_parse.py --repeat 5
+#        실제 페이지는 SAVE_PAGE_HTML=1 CRAWL_LEAN=0 python jpg_crowling.py <URL> 로 main_image/page.html 저장 후
+#        test/caseN/main_image/page.html 로 복사해서 사용
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+FIXTURE_PATTERN = "test/case*/main_image/page.html"
+FRAGMENT_PATTERN = "test/case*/ocr_texts"
+
+
+def legacy_parse(html):
+    """📌 기존 jpg_crowling.py 방식 (함수마다 전체 페이지를 다시 파싱)"""
+    soup = BeautifulSoup(html, "html.parser")
+    image_urls = []
+    for img in soup.select("div.subType-IMAGE img, div.subType-TEXT img"):
+        img_url = img.get("src") or img.get("data-src")
+        if img_url and img_url.split(".")[-1].split("?")[0].lower() in product_page.VALID_IMAGE_EXTENSIONS:
+            image_urls.append("https:" + img_url if img_url.startswith("//") else img_url)
+
+    soup = BeautifulSoup(html, "html.parser")
+    img_tag = soup.find("img", class_="prod-image__detail")
+    name = soup.find("h1", class_="prod-buy-header__title").text.strip()
+    price_html = soup.find("div", class_="prod-price-onetime").prettify()
+    price_html = re.sub(r'>\s+<', '><', re.sub(r'\n\s*\n+', '\n', price_html))
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", class_="prod-delivery-return-policy-table essential-info-table")
+
+    soup = BeautifulSoup(html, "html.parser")
+    li_elements = soup.find_all("li", class_="product-etc tab-contents__content etc-new-style")
+
+    return product_page.ProductPage(
+        name=name,
+        main_image_url="https:" + img_tag["src"],
+        detail_image_urls=image_urls,
+        price_html=price_html,
+        essential_info_html=str(table),
+        delivery_items_html=[str(li) for li in li_elements],
+    )
+
+
+def synthetic_page(fragment_folder, filler_blocks=3000, image_host="//image.coupangcdn.com"):
+    """📌 저장된 페이지가 없을 때: 케이스 폴더의 조각(가격/필수 표기정보/배송 안내)으로 실제 크기와 비슷한 페이지 구성"""
+    def read(name):
+        with open(os.path.join(fragment_folder, name), "r", encoding="utf-8") as f:
+            return f.read()
+
+    case_folder = os.path.dirname(fragment_folder)
+    with open(os.path.join(case_folder, "main_image", "product_name.txt"), "r", encoding="utf-8") as f:
+        name = f.read().strip()
+
+    # 추천 상품, 리뷰, 인라인 스크립트 등 추출 대상이 아닌 영역 (실제 페이지 용량의 대부분)
+    filler = "".join(
+        f'<li class="recommend-item"><a href="/vp/products/{i}"><img src="{image_host}/thumbnail/{i}.jpg">'
+        f'<span class="name">추천 상품 {i}</span><span class="price">{i * 100:,}원</span></a></li>'
+        f'<script>window.__data_{i} = {{"id": {i}, "payload": "{"x" * 200}"}};</script>'
+        for i in range(filler_blocks)
+    )
+    detail = "".join(
+        f'<div class="subType-IMAGE"><img src="{image_host}/detail/{i}.jpg"></div>' for i in range(30)
+    )
+    return (
+        f'<html><head><script>{"var a = 1;" * 5000}</script></head><body><div id="container">'
+        f'<div class="prod-image"><img class="prod-image__detail" src="{image_host}/main.jpg"></div>'
+        f'<h1 class="prod-buy-header__title">{name}</h1>{read("price_info.html")}'
+        f'<ul class="recommend">{filler}</ul><div class="product-detail-content">{detail}</div>'
+        f'{read("basic_data.html")}<ul>{read("li_data.html")}</ul></div></body></html>'
+    )
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(FIXTURE_PATTERN)):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[path] = f.read()
+    if not pages:
+        print(f"⚠ 저장된 페이지({FIXTURE_PATTERN})가 없어 조각 파일로 만든 합성 페이지를 사용합니다.")
+        for folder in sorted(glob.glob(FRAGMENT_PATTERN)):
+            pages[folder] = synthetic_page(folder)
+    return pages
+
+
+def measure(parse, html, repeat):
+    """📌 최소 실행 시간과 최대 메모리 사용량 (tracemalloc) 측정"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="상품 페이지 파싱 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    if not pages:
+        print("❌ 벤치마크 페이지를 찾을 수 없습니다.")
+        return
+
+    print(f"🚀 파서: {product_page.HTML_PARSER}")
+    for path, html in pages.items():
+        legacy = legacy_parse(html)
+        single = product_page.parse_product_page(html)
+        if legacy != single:
+            print(f"❌ {path}: 추출 결과가 기존 방식과 다릅니다.")
+            continue
+
+        legacy_time, legacy_peak = measure(legacy_parse, html, args.repeat)
+        single_time, single_peak = measure(product_page.parse_product_page, html, args.repeat)
+        print(
+            f"📊 {path} ({len(html) / 1024:.0f}KB, 이미지 {len(single.detail_image_urls)}개)\n"
+            f"   기존 4회 파싱: {legacy_time:.3f}s, 최대 메모리 {legacy_peak / 1024 / 1024:.1f}MB\n"
+            f"   1회 파싱     : {single_time:.3f}s, 최대 메모리 {single_peak / 1024 / 1024:.1f}MB "
+            f"({legacy_time / single_time:.1f}배 빠름)"
+        )
+
+
+if __name__ == "__main__":
+    main()
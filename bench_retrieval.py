@@ -0,0 +1,147 @@
+import os
+import sys
+import glob
+import zlib
+import argparse
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_community.document_loaders import BSHTMLLoader
+from langchain_community.vectorstores import FAISS
+import chunking
+import hybrid_retriever
+from token_utils import count_tokens
+
+# ✅ 검색 방식별 재현율 비교: 벡터(FAISS) vs 키워드(BM25) vs 하이브리드(RRF)
+# 사용법: python bench_retrieval.py --k 1 2 3 4 5
+#        OPENAI_API_KEY가 있으면 text-embedding-3-small 사용 (임베딩 캐시 적용), 없으면 --embeddings hash 로 오프라인 실행
+#        (hash는 글자 n-gram 해시 벡터라 실제 의미 검색 성능과 다름 → 키워드/융합 동작 확인용)
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+CORPUS_PATTERN = "test/case*/ocr_texts/*.html"  # 여러 상품 청크를 섞어서 다른 상품 정보가 방해 요소가 되도록 함
+
+# (질문, 정답 청크에 반드시 들어 있는 문자열)
+QUERIES = [
+    ("WF19T6000KW 모델 맞나요?", "WF19T6000KW"),
+    ("19kg 용량인가요?", "19kg"),
+    ("에너지 효율 1등급인가요?", "1등급"),
+    ("B182W13 냉장고 어디서 만들었어요?", "B182W13"),
+    ("MC607B 출시일 언제예요?", "2021.04"),
+    ("HU072603-21002A 인증 제품 맞죠?", "HU072603-21002A"),
+    ("R-R-SEC-WF6000TKN 전파인증 받았나요?", "R-R-SEC-WF6000TKN"),
+    ("CWAM210S 와이파이 인증 있나요", "CWAM210S"),
+    ("삼성 고객센터 번호 알려주세요", "1588-3366"),
+    ("LG 서비스센터 전화번호가 뭐예요?", "1544-7777"),
+    ("19,800원 이상 사면 무료배송이에요?", "19,800원"),
+    ("반품비 얼마예요?", "반품비"),
+    ("쿠팡친구 배송은 며칠 걸려요?", "쿠팡친구"),
+    ("와우할인가 얼마인가요?", "와우할인가"),
+    ("카드 즉시할인 몇 퍼센트 되나요?", "카드 즉시할인"),
+    ("제조국이 베트남인가요?", "베트남"),
+    ("인도네시아산인가요?", "인도네시아"),
+    ("733,770원 맞나요", "733,770원"),
+    # 정확한 단어가 없는 질문 (표현이 다름)
+    ("포장 뜯으면 환불 안 되나요?", "포장 개봉"),
+    ("화면이랑 실제 색이 다르면 돌려보낼 수 있나요?", "모니터 해상도"),
+    ("광고랑 물건이 다르면 언제까지 취소돼요?", "3개월 이내"),
+    ("어린 사람이 산 것도 취소되나요?", "미성년자"),
+]
+
+
+class HashEmbeddings(Embeddings):
+    """📌 오프라인용 임베딩 (글자 3-gram 해시 → 정규화 벡터, 같은 텍스트는 항상 같은 벡터)"""
+
+    def __init__(self, size=512):
+        self.size = size
+
+    def _embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        text = text.lower()
+        for i in range(len(text) - 2):
+            vector[zlib.crc32(text[i:i + 3].encode("utf-8")) % self.size] += 1
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_chunks():
+    documents = []
+    for path in sorted(glob.glob(CORPUS_PATTERN)):
+        loader = BSHTMLLoader(path, open_encoding="utf-8", bs_kwargs={"features": "html.parser"})
+        documents.extend(loader.load())
+    return [doc for doc in chunking.split_documents(documents) if doc.page_content.strip()]
+
+
+def build_vectorstore(chunks, embeddings_name):
+    if embeddings_name == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        import ingest
+        import embedding_cache
+        return ingest.build_vector_store(chunks, OpenAIEmbeddings(model="text-embedding-3-small"), cache=embedding_cache.get_cache())
+    return FAISS.from_documents(chunks, HashEmbeddings())
+
+
+def evaluate(retrieve, chunks, k_values):
+    """📌 k별 재현율(정답 청크가 상위 k개 안에 있는 질문 비율), MRR, 평균 컨텍스트 토큰 수"""
+    max_k = max(k_values)
+    hits = {k: 0 for k in k_values}
+    tokens = {k: 0 for k in k_values}
+    reciprocal_ranks = 0.0
+
+    for question, answer in QUERIES:
+        relevant = {i for i, chunk in enumerate(chunks) if answer.lower() in chunk.page_content.lower()}
+        ranking = retrieve(question, max_k)
+        first = next((rank for rank, position in enumerate(ranking) if position in relevant), None)
+        if first is not None:
+            reciprocal_ranks += 1.0 / (first + 1)
+        for k in k_values:
+            hits[k] += first is not None and first < k
+            tokens[k] += sum(count_tokens(chunks[position].page_content) for position in ranking[:k])
+
+    total = len(QUERIES)
+    return {k: (hits[k] / total, tokens[k] / total) for k in k_values}, reciprocal_ranks / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 방식별 재현율 벤치마크")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    parser.add_argument("--embeddings", choices=["openai", "hash"], default="openai" if os.getenv("OPENAI_API_KEY") else "hash")
+    args = parser.parse_args()
+
+    chunks = load_chunks()
+    if not chunks:
+        print(f"❌ 청크가 없습니다: {CORPUS_PATTERN}")
+        return
+    vectorstore = build_vectorstore(chunks, args.embeddings)
+    retriever = hybrid_retriever.HybridRetriever.from_vectorstore(vectorstore)
+    if args.embeddings == "hash":
+        print("⚠ 오프라인 해시 임베딩 사용: 벡터 검색 수치는 실제 OpenAI 임베딩과 다릅니다.")
+    print(f"🚀 청크 {len(chunks)}개 / 질문 {len(QUERIES)}개 / 임베딩: {args.embeddings}")
+
+    # 청크 순서 = FAISS 인덱스 위치이므로 세 방식 모두 위치 목록으로 비교
+    def vector_only(question, k):
+        return retriever.vector_search(vectorstore.embeddings.embed_query(question), k)
+
+    def keyword_only(question, k):
+        return [position for position, _ in retriever.keyword_index.search(question, k)]
+
+    def hybrid(question, k):
+        vector_ranking = retriever.vector_search(vectorstore.embeddings.embed_query(question), retriever.fetch_k)
+        keyword_ranking = keyword_only(question, retriever.fetch_k)
+        return hybrid_retriever.reciprocal_rank_fusion([vector_ranking, keyword_ranking], retriever.rrf_k)[:k]
+
+    print(f"{'방식':<8}" + "".join(f"{f'R@{k}':>8}" for k in args.k) + f"{'MRR':>8}" + "".join(f"{f'tok@{k}':>9}" for k in args.k))
+    for name, retrieve in (("vector", vector_only), ("bm25", keyword_only), ("hybrid", hybrid)):
+        results, mrr = evaluate(retrieve, chunks, args.k)
+        print(
+            f"{name:<8}" + "".join(f"{results[k][0]:>8.2f}" for k in args.k) + f"{mrr:>8.2f}"
+            + "".join(f"{results[k][1]:>9.0f}" for k in args.k)
+        )
+
+
+if __name__ == "__main__":
+    main()
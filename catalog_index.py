@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+import hybrid_retriever
+
+# ✅ 여러 상품을 하나의 벡터 인덱스에 보관하는 카탈로그 인덱스 (판매자 전체 상품 QA용)
+# 모든 벡터에 product_id / source 메타데이터를 저장하고, 상품별 검색은 FAISS ID 범위 필터로 처리 (전체 검색 후 거르지 않음)
+# 상품 추가/삭제는 해당 상품 벡터만 추가/제거 (전체 인덱스 재생성 없음)
+# 규모별 성능 비교: python bench_catalog.py
+
+CATALOG_INDEX = os.getenv("CATALOG_INDEX", "0") == "1"  # 수집이 끝난 상품을 카탈로그 인덱스에도 추가
+CATALOG_INDEX_PATH = os.getenv("CATALOG_INDEX_PATH", "catalog_index.sqlite3")
+CHUNK_BITS = 20  # 벡터 ID = 상품 번호 << CHUNK_BITS | 청크 번호 (상품당 최대 약 100만 청크)
+LOAD_BATCH = 10000  # 시작 시 SQLite → FAISS로 한 번에 올릴 벡터 수
+
+_default_catalog = None
+_default_catalog_lock = threading.Lock()
+
+
+def _id_range(code):
+    return code << CHUNK_BITS, (code + 1) << CHUNK_BITS
+
+
+class CatalogIndex:
+    """📌 상품 전체 벡터 인덱스 (SQLite: 청크/벡터/메타데이터 원본, FAISS IndexIDMap2: 메모리 검색용)"""
+
+    def __init__(self, path=CATALOG_INDEX_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS products (code INTEGER PRIMARY KEY AUTOINCREMENT, product_id TEXT UNIQUE NOT NULL, "
+            "chunks INTEGER, added_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, product_id TEXT NOT NULL, source TEXT, "
+            "text TEXT NOT NULL, metadata TEXT, vector BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (product_id, source)")
+        self._conn.commit()
+
+        self.index = None
+        self._codes = {}  # 상품 ID → 상품 번호 (ID 범위)
+        self._load()
+
+    def _load(self):
+        """저장된 벡터를 FAISS 인덱스로 읽어 오기"""
+        started = time.perf_counter()
+        self._codes = dict(self._conn.execute("SELECT product_id, code FROM products"))
+        cursor = self._conn.execute("SELECT id, vector FROM chunks ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(LOAD_BATCH)
+            if not rows:
+                break
+            vectors = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            self._ensure_index(vectors.shape[1])
+            self.index.add_with_ids(vectors, np.array([row[0] for row in rows], dtype=np.int64))
+        if self.index is not None:
+            print(
+                f"✅ 카탈로그 인덱스 로드: 상품 {len(self._codes)}개 / 벡터 {self.index.ntotal}개 "
+                f"({time.perf_counter() - started:.1f}초)"
+            )
+
+    def _check_dimension(self, dimension):
+        if self.index is not None and self.index.d != dimension:
+            raise ValueError(f"임베딩 차원이 다릅니다: 인덱스 {self.index.d} / 입력 {dimension}")
+
+    def _ensure_index(self, dimension):
+        self._check_dimension(dimension)
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))  # LangChain FAISS 기본값과 같은 L2 거리
+
+    def __len__(self):
+        return self.index.ntotal if self.index is not None else 0
+
+    def __contains__(self, product_id):
+        return product_id in self._codes
+
+    def products(self):
+        return list(self._codes)
+
+    def add_product(self, product_id, documents, vectors):
+        """📌 상품 청크 + 벡터 추가 (이미 있는 상품이면 이전 벡터를 지우고 교체)
+        SQLite 커밋이 성공한 뒤에만 메모리(FAISS / 상품 번호)를 바꾸므로 실패해도 디스크와 메모리가 어긋나지 않음"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(documents) != len(vectors):
+            raise ValueError("문서 수와 벡터 수가 다릅니다.")
+        if len(documents) >= 1 << CHUNK_BITS:
+            raise ValueError(f"상품당 청크가 너무 많습니다: {len(documents)}")
+
+        started = time.perf_counter()
+        with self._lock:
+            if len(documents):
+                self._check_dimension(vectors.shape[1])
+
+            with self._conn:  # 삭제 + 추가를 하나의 트랜잭션으로 (실패 시 롤백)
+                self._delete_rows(product_id)
+                code = self._conn.execute(
+                    "INSERT INTO products (product_id, chunks, added_at) VALUES (?, ?, ?)",
+                    (product_id, len(documents), time.time()),
+                ).lastrowid
+                ids = np.arange(len(documents), dtype=np.int64) + _id_range(code)[0]
+                self._conn.executemany(
+                    "INSERT INTO chunks (id, product_id, source, text, metadata, vector) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (int(vector_id), product_id, doc.metadata.get("source"), doc.page_content,
+                         json.dumps(doc.metadata, ensure_ascii=False), vector.tobytes())
+                        for vector_id, doc, vector in zip(ids, documents, vectors)
+                    ],
+                )
+
+            # ✅ 커밋 성공 → 메모리 인덱스 반영
+            self._drop_vectors(product_id)
+            if len(documents):
+                self._ensure_index(vectors.shape[1])
+                self.index.add_with_ids(vectors, ids)
+            self._codes[product_id] = code
+
+        print(f"✅ 카탈로그에 상품 추가: {product_id} (청크 {len(documents)}개, {time.perf_counter() - started:.2f}초)")
+
+    def add_vectorstore(self, product_id, vectorstore):
+        """📌 상품별 FAISS 벡터스토어(수집 결과)를 그대로 카탈로그에 추가 (다시 임베딩하지 않음)"""
+        total = vectorstore.index.ntotal
+        documents = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(total)]
+        vectors = vectorstore.index.reconstruct_n(0, total) if total else np.zeros((0, vectorstore.index.d), dtype=np.float32)
+        self.add_product(product_id, documents, vectors)
+
+    def _delete_rows(self, product_id):
+        """SQLite에서 상품 청크/정보 삭제 (트랜잭션 안에서 호출)"""
+        self._conn.execute("DELETE FROM chunks WHERE product_id = ?", (product_id,))
+        self._conn.execute("DELETE FROM products WHERE product_id = ?", (product_id,))
+
+    def _drop_vectors(self, product_id):
+        """메모리 인덱스에서 상품 벡터 제거 (SQLite 커밋 후 호출)"""
+        code = self._codes.pop(product_id, None)
+        if code is None or self.index is None:
+            return 0
+        return self.index.remove_ids(faiss.IDSelectorRange(*_id_range(code)))
+
+    def remove_product(self, product_id):
+        """📌 상품 벡터만 삭제 (없으면 0 반환)"""
+        with self._lock:
+            if product_id not in self._codes:
+                return 0
+            with self._conn:
+                self._delete_rows(product_id)
+            removed = self._drop_vectors(product_id)
+        if removed:
+            print(f"🗑 카탈로그에서 상품 삭제: {product_id} (벡터 {removed}개)")
+        return removed
+
+    def product_version(self, product_id):
+        """📌 상품이 카탈로그에 추가될 때마다 바뀌는 값 (없으면 None) → 검색기 캐시 키로 사용"""
+        return self._codes.get(product_id)
+
+    def _selector(self, product_id, source):
+        code = self._codes.get(product_id)
+        if code is None:
+            return None
+        if source is None:
+            return faiss.IDSelectorRange(*_id_range(code))
+        # 작은 조각을 합친 청크는 metadata의 sources 목록에 있는 출처로도 검색
+        ids = [row[0] for row in self._conn.execute(
+            "SELECT id FROM chunks WHERE product_id = ? AND (source = ? OR EXISTS "
+            "(SELECT 1 FROM json_each(chunks.metadata, '$.sources') WHERE value = ?))",
+            (product_id, source, source),
+        )]
+        return faiss.IDSelectorBatch(np.array(ids, dtype=np.int64)) if ids else None
+
+    def search_ids(self, vector, k, product_id=None, source=None):
+        """📌 (벡터 ID, 거리) 목록 (product_id / source를 주면 해당 상품/출처 벡터 안에서만 검색)"""
+        query = np.asarray([vector], dtype=np.float32)
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return []
+            params = None
+            if product_id is not None:
+                selector = self._selector(product_id, source)
+                if selector is None:
+                    return []
+                params = faiss.SearchParameters(sel=selector)
+            distances, ids = self.index.search(query, min(k, self.index.ntotal), params=params)
+        return [(int(vector_id), float(distance)) for vector_id, distance in zip(ids[0], distances[0]) if vector_id != -1]
+
+    def documents(self, ids):
+        """📌 벡터 ID 순서대로 Document 반환 (metadata에 product_id / source 포함)"""
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, product_id, text, metadata FROM chunks WHERE id IN ({','.join('?' * len(ids))})", list(ids)
+            ).fetchall()
+        by_id = {
+            row[0]: Document(page_content=row[2], metadata={**json.loads(row[3] or "{}"), "product_id": row[1]})
+            for row in rows
+        }
+        return [by_id[vector_id] for vector_id in ids if vector_id in by_id]
+
+    def texts(self, product_id):
+        """📌 상품 청크 (벡터 ID, 텍스트) 목록 (키워드 인덱스 생성용)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, text FROM chunks WHERE product_id = ? ORDER BY id", (product_id,)
+            ).fetchall()
+
+    def similarity_search_with_score_by_vector(self, vector, k=4, product_id=None, source=None):
+        """📌 LangChain 벡터스토어와 같은 형식의 (Document, 거리) 목록"""
+        results = self.search_ids(vector, k, product_id, source)
+        documents = self.documents([vector_id for vector_id, _ in results])
+        return list(zip(documents, [distance for _, distance in results]))
+
+    def stats(self):
+        vectors = len(self)
+        dimension = self.index.d if self.index is not None else 0
+        return {
+            "products": len(self._codes),
+            "vectors": vectors,
+            "dimension": dimension,
+            "index_bytes": vectors * (dimension * 4 + 8),  # 벡터 + ID (IndexIDMap2 역방향 맵 제외)
+        }
+
+
+class CatalogRetriever(BaseRetriever):
+    """📌 카탈로그 인덱스에서 한 상품만 검색하는 하이브리드 Retriever (상품 범위 벡터 검색 + BM25 → RRF)"""
+
+    catalog: object
+    product_id: str
+    embeddings: object
+    keyword_index: object
+    keyword_ids: list
+    k: int = hybrid_retriever.RETRIEVAL_K
+    fetch_k: int = hybrid_retriever.RETRIEVAL_FETCH_K
+    rrf_k: int = hybrid_retriever.RRF_K
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @classmethod
+    def for_product(cls, catalog, product_id, embeddings, **kwargs):
+        """📌 상품 청크로 키워드 인덱스 생성"""
+        rows = catalog.texts(product_id)
+        return cls(
+            catalog=catalog,
+            product_id=product_id,
+            embeddings=embeddings,
+            keyword_index=hybrid_retriever.BM25Index([text for _, text in rows]),
+            keyword_ids=[vector_id for vector_id, _ in rows],
+            **kwargs,
+        )
+
+    def search_with_vector(self, query, vector=None):
+        """📌 질문 임베딩이 이미 있으면 재사용 (없으면 새로 계산)"""
+        if not self.keyword_ids:
+            return []
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+
+        vector_ranking = [vector_id for vector_id, _ in self.catalog.search_ids(vector, self.fetch_k, self.product_id)]
+        keyword_ranking = [self.keyword_ids[position] for position, _ in self.keyword_index.search(query, self.fetch_k)]
+        fused = hybrid_retriever.reciprocal_rank_fusion([vector_ranking, keyword_ranking], self.rrf_k)
+        return self.catalog.documents(fused[:self.k])
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.search_with_vector(query)
+
+
+def get_catalog():
+    """📌 프로세스 전체에서 공유하는 기본 카탈로그 인덱스 반환"""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = CatalogIndex()
+        return _default_catalog
@@ -0,0 +1,147 @@
+import os
+import re
+from langchain_core.documents import Document
+from token_utils import count_tokens
+
+# ✅ 청크 크기 설정 (토큰 기준)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", 400))
+
+HEADING_RE = re.compile(r"^(#{1,6}\s+.+|\*\*[^*]+\*\*:?)$")  # '# 제목' 또는 단독 '**소제목**'
+BULLET_RE = re.compile(r"^(\s*[-*•·]\s+|\s*\d+[.)]\s+)")
+TABLE_ROW_RE = re.compile(r"^\s*\|.*\|\s*$")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|[\s:|-]+\|\s*$")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?。])\s+|\n")
+
+
+def _parse_blocks(text):
+    """📌 텍스트를 (종류, 줄 목록) 블록으로 분리 (제목 / 표 / 목록 / 문단)"""
+    blocks = []
+    paragraph = []
+
+    def flush_paragraph():
+        if paragraph:
+            blocks.append(("paragraph", paragraph[:]))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        stripped = line.strip()
+
+        if not stripped:
+            flush_paragraph()
+        elif TABLE_ROW_RE.match(stripped):
+            flush_paragraph()
+            if blocks and blocks[-1][0] == "table":
+                blocks[-1][1].append(stripped)  # 연속된 행은 하나의 표로 묶기
+            else:
+                blocks.append(("table", [stripped]))
+        elif HEADING_RE.match(stripped):
+            flush_paragraph()
+            blocks.append(("heading", [stripped]))
+        elif BULLET_RE.match(line):
+            flush_paragraph()
+            blocks.append(("bullet", [stripped]))
+        elif blocks and blocks[-1][0] == "bullet" and line[:1].isspace():
+            blocks[-1][1].append(stripped)  # 들여쓴 줄은 앞 목록 항목에 포함
+        else:
+            paragraph.append(stripped)
+
+    flush_paragraph()
+    return blocks
+
+
+def _split_table(rows, max_tokens):
+    """📌 표를 행 단위로 나누고, 나뉜 조각마다 헤더 행을 반복 (행은 절대 자르지 않음)"""
+    header = []
+    if len(rows) >= 2 and TABLE_SEPARATOR_RE.match(rows[1]):
+        header, rows = rows[:2], rows[2:]
+
+    header_tokens = count_tokens("\n".join(header))
+    pieces, current, current_tokens = [], [], header_tokens
+
+    for row in rows:
+        row_tokens = count_tokens(row) + 1  # 행 + 줄바꿈
+        if current and current_tokens + row_tokens > max_tokens:
+            pieces.append("\n".join(header + current))
+            current, current_tokens = [], header_tokens
+        current.append(row)
+        current_tokens += row_tokens
+
+    if current or header:
+        pieces.append("\n".join(header + current))
+    return pieces
+
+
+def _split_paragraph(lines, max_tokens):
+    """📌 긴 문단을 문장 단위로 나누기 (문장 하나가 한도를 넘으면 글자 단위로 자름)"""
+    text = "\n".join(lines)
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    pieces, current = [], ""
+    for sentence in (s for s in SENTENCE_END_RE.split(text) if s and s.strip()):
+        while count_tokens(sentence) > max_tokens:
+            cut = max(1, len(sentence) * max_tokens // count_tokens(sentence))
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:]
+        candidate = f"{current} {sentence}".strip() if current else sentence
+        if current and count_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_text(text, max_tokens=CHUNK_MAX_TOKENS):
+    """📌 제목/목록/표 구조를 따라 텍스트를 토큰 한도 이내의 (소제목, 청크) 목록으로 분할
+    청크마다 앞에 붙는 소제목도 한도에 포함 (행 하나가 한도보다 큰 표만 예외)"""
+    chunks = []
+    section, section_tokens = "", 0
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            body = "\n".join(current)
+            chunks.append((section, f"{section}\n{body}" if section else body))
+        current, current_tokens = [], 0
+
+    for kind, lines in _parse_blocks(text):
+        if kind == "heading":
+            flush()
+            section = lines[0]
+            section_tokens = count_tokens(section) + 1  # 소제목 + 줄바꿈
+            continue
+
+        budget = max(1, max_tokens - section_tokens)  # 소제목을 붙여도 한도를 넘지 않도록 본문 예산에서 제외
+        if kind == "table":
+            units = _split_table(lines, budget)
+        else:
+            units = _split_paragraph(lines, budget)  # 문단 / 목록 항목 (한도 이내면 그대로 한 덩어리)
+
+        for unit in units:
+            unit_tokens = count_tokens(unit)
+            if current and current_tokens + 1 + unit_tokens > budget:  # +1: 블록 사이 줄바꿈
+                flush()
+            current_tokens += unit_tokens + (1 if current else 0)
+            current.append(unit)
+
+    flush()
+    return [(sec, chunk) for sec, chunk in chunks if chunk.strip() and chunk.strip() != sec]
+
+
+def split_documents(documents, max_tokens=CHUNK_MAX_TOKENS):
+    """📌 문서를 구조 기반 청크로 분할하고 출처 메타데이터를 유지"""
+    chunked = []
+    for doc in documents:
+        for i, (section, chunk) in enumerate(split_text(doc.page_content, max_tokens)):
+            metadata = dict(doc.metadata)
+            metadata.update({"chunk": i, "section": section})
+            chunked.append(Document(page_content=chunk, metadata=metadata))
+    return chunked
@@ -0,0 +1,145 @@
+import os
+import re
+from token_utils import count_tokens
+
+# ✅ LLM에 전달할 문서 내용(context) 구성: 중복 제거 → MMR로 다양하게 선택 → 토큰 예산 안에서 → 원래 순서대로 정렬
+# 상세 페이지에는 같은 안내 문구/스펙 줄이 여러 이미지와 HTML(필수 표기정보 등)에 반복되므로,
+# 이미 넣은 내용과 거의 같은 청크는 제외하고 다른 청크·출처에서 반복된 줄은 한 번만 넣음
+
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", 1200))  # 문서 내용 토큰 예산
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", 8))  # 검색에서 받아 올 후보 문서 수
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))  # 1에 가까울수록 관련도, 0에 가까울수록 다양성 우선
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", 0.8))  # 이 비율 이상이 이미 선택된 내용이면 중복으로 제외
+MIN_PASSAGE_TOKENS = 50  # 예산이 이보다 적게 남으면 잘라서 넣지 않음
+
+SHINGLE_SIZE = 4
+
+
+def _normalize(text):
+    return re.sub(r"[\W_]+", "", text.lower())
+
+
+def _shingles(text):
+    """공백/문장부호를 뺀 글자 4-gram 집합 (OCR 줄바꿈/띄어쓰기 차이에 영향받지 않음)"""
+    text = _normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def source_order(source):
+    """📌 출처 파일 이름의 숫자 순서 키 (image_2_crop_10 > image_2_crop_9)"""
+    name = os.path.basename(str(source or "").replace("\\", "/"))
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", name) if part)
+
+
+def source_position(doc):
+    """📌 원래 순서 키: 출처 순서 + 파일 안 청크 번호 (작은 조각을 합친 문서는 sources 중 가장 앞선 출처 기준)"""
+    sources = doc.metadata.get("sources") or [doc.metadata.get("source", "")]
+    return min(source_order(source) for source in sources), doc.metadata.get("chunk", 0)
+
+
+class ContextBuilder:
+    """📌 검색된 문서 → 토큰 예산 안의 context 문자열 + 통계"""
+
+    def __init__(self, max_tokens=CONTEXT_MAX_TOKENS, mmr_lambda=MMR_LAMBDA, duplicate_threshold=DUPLICATE_THRESHOLD):
+        self.max_tokens = max_tokens
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+
+    def _select_order(self, passages):
+        """MMR 순서: 관련도(검색 순위) - 이미 고른 문서와의 유사도 (임베딩 없이 글자 n-gram 유사도 사용)"""
+        count = len(passages)
+        remaining = list(range(count))
+        order = []
+        while remaining:
+            def mmr(i):
+                relevance = 1.0 - i / count  # 검색 결과는 이미 질문 관련도 순
+                redundancy = max((_jaccard(passages[i]["shingles"], passages[j]["shingles"]) for j in order), default=0.0)
+                return self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+
+            best = max(remaining, key=mmr)
+            remaining.remove(best)
+            order.append(best)
+        return order
+
+    def build(self, documents):
+        """📌 (context 문자열, 선택된 문서 목록, 통계) 반환"""
+        passages = [
+            {"doc": doc, "lines": [line for line in doc.page_content.splitlines() if line.strip()], "shingles": _shingles(doc.page_content)}
+            for doc in documents
+        ]
+        stats = {
+            "candidates": len(passages),
+            "selected": 0,
+            "dropped_duplicate": 0,
+            "dropped_budget": 0,
+            "lines_removed": 0,
+            "tokens_in": sum(count_tokens(doc.page_content) for doc in documents),
+            "tokens_out": 0,
+        }
+
+        selected = []  # (문서, 넣을 텍스트)
+        seen_lines = set()
+        seen_shingles = set()
+        used_tokens = 0
+
+        for index in self._select_order(passages):
+            passage = passages[index]
+            shingles = passage["shingles"]
+
+            # ✅ 이미 넣은 내용에 대부분 포함된 문서 제외 (다른 출처에 반복된 같은 안내문 / 같은 청크)
+            if shingles and len(shingles & seen_shingles) / len(shingles) >= self.duplicate_threshold:
+                stats["dropped_duplicate"] += 1
+                continue
+
+            # ✅ 이미 넣은 줄은 빼고 새 줄만 사용 (여러 청크에 반복된 같은 문장)
+            lines = []
+            for line in passage["lines"]:
+                key = _normalize(line)
+                if key and key in seen_lines:
+                    stats["lines_removed"] += 1
+                    continue
+                lines.append(line)
+            if not lines:
+                stats["dropped_duplicate"] += 1
+                continue
+
+            # ✅ 토큰 예산: 남은 예산보다 크면 줄 단위로 잘라서 넣기 (너무 적게 남았으면 제외)
+            text = "\n".join(lines)
+            tokens = count_tokens(text)
+            budget = self.max_tokens - used_tokens
+            if tokens > budget:
+                if budget < MIN_PASSAGE_TOKENS:
+                    stats["dropped_budget"] += 1
+                    continue
+                kept = []
+                for line in lines:
+                    if count_tokens("\n".join(kept + [line])) > budget:
+                        break
+                    kept.append(line)
+                if not kept:
+                    stats["dropped_budget"] += 1
+                    continue
+                text = "\n".join(kept)
+                tokens = count_tokens(text)
+
+            selected.append((passage["doc"], text))
+            seen_lines.update(_normalize(line) for line in text.splitlines())
+            seen_shingles |= shingles
+            used_tokens += tokens
+
+        selected.sort(key=lambda item: source_position(item[0]))  # ✅ 원래 페이지 순서대로 (위 → 아래)
+        stats["selected"] = len(selected)
+        stats["tokens_out"] = used_tokens
+
+        print(
+            f"🧩 context 구성: 문서 {stats['candidates']}개 → {stats['selected']}개 "
+            f"(중복 {stats['dropped_duplicate']}개 / 예산 초과 {stats['dropped_budget']}개 제외, 중복 줄 {stats['lines_removed']}개 삭제) / "
+            f"{stats['tokens_in']} → {stats['tokens_out']} 토큰"
+        )
+        return "\n\n".join(text for _, text in selected), [doc for doc, _ in selected], stats
@@ -3,33 +3,51 @@ from streamlit import runtime
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 import shutil
 import os
-import json
-import time
+import threading
 from langchain_community.document_loaders import BSHTMLLoader
-from langchain_community.vectorstores import FAISS
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain.chains.retrieval_qa.base import RetrievalQA
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 import sys
-import subprocess
-import jpg2text_run
+import index_store
+import ingest
+import chunking
+import ingestion_jobs
+import embedding_cache
+import crawl_worker
+import rate_limiter
+import qa_stream
+import answer_cache
+import hybrid_retriever
+import context_builder
+import catalog_index
+from workspace import Workspace
 
 sys.stdout.reconfigure(encoding='utf-8')
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
-# ✅ HTML 파일이 있는 폴더 경로
-html_folder_path = "ocr_texts"  # 여러 개의 HTML 파일이 있는 폴더
+# ✅ 백그라운드 수집 진행 상황 조회 주기 (초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
 
-# ✅ OpenAI Embeddings 설정
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+# ✅ 프로세스 전체에서 열어 둘 인덱스 / QA 체인 수 (오래 쓰지 않은 것부터 정리)
+INDEX_CACHE_SIZE = int(os.getenv("INDEX_CACHE_SIZE", 16))
+QA_CHAIN_CACHE_SIZE = int(os.getenv("QA_CHAIN_CACHE_SIZE", 32))
 
-# 🚨 크롤링 제한 설정
-MAX_CRAWL_ATTEMPTS = 3  # 최대 3번
-RESET_TIME = 2 * 60 * 60  # 2시간 (초 단위)
-CRAWL_LOG_FILE = "user_ip_data.json"  # 사용자 크롤링 기록을 저장할 JSON 파일
+
+# ✅ OpenAI 클라이언트는 프로세스 전체에서 하나만 생성 (재실행마다 새로 만들지 않음)
+@st.cache_resource(show_spinner=False)
+def get_embeddings():
+    return OpenAIEmbeddings(model="text-embedding-3-small")
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm():
+    return ChatOpenAI(model_name="gpt-4o", temperature=0.5)
+
+
+embeddings = get_embeddings()
 
 
 def get_api_key():
@@ -41,26 +59,42 @@ def get_api_key():
         st.toast("✅ OpenAI API 키가 정상적으로 로드되었습니다.")
 
 
-# @st.cache_resource
-def load_vector_store():
-    vectorstore = None  
+@st.cache_resource(max_entries=INDEX_CACHE_SIZE, show_spinner=False)
+def load_saved_index(index_path, version, _embeddings):
+    """📌 저장된 인덱스를 한 번만 읽어서 모든 세션이 공유 (version이 바뀌면 = 다시 저장되면 새로 읽음)"""
+    print(f"📂 인덱스 로드: {index_path}")
+    return index_store.read_index(index_path, _embeddings)
+
+
+def read_cached_index(index_path, embeddings):
+    """index_store.load_index의 reader로 사용 (캐시된 인덱스 반환)"""
+    return load_saved_index(os.path.abspath(index_path), index_store.index_version(index_path), embeddings)
+
 
-    # ✅ HTML 폴더 내 모든 파일을 벡터 DB로 저장
-    for filename in os.listdir(html_folder_path):
+def load_vector_store(index_path="faiss_index", html_folder_path="ocr_texts"):
+    # ✅ 저장된 인덱스가 있으면 다시 만들지 않고 불러오기
+    if index_store.index_version(index_path) is not None:
+        try:
+            return read_cached_index(index_path, embeddings)
+        except Exception as e:
+            print(f"❌ 저장된 인덱스 로드 실패 ({index_path}): {e}")
+
+    documents = []
+
+    # ✅ HTML 폴더 내 모든 파일을 먼저 문서로 수집
+    for filename in (os.listdir(html_folder_path) if os.path.exists(html_folder_path) else []):
         if filename.endswith(".html"):
             file_path = os.path.join(html_folder_path, filename)
             try:
                 # ✅ 각 HTML 파일을 개별 문서로 로드
                 loader = BSHTMLLoader(file_path, open_encoding="utf-8", bs_kwargs={"features": "html.parser"})
-                documents = loader.load()
+                file_documents = loader.load()
 
-                # ✅ 벡터스토어 생성 (첫 번째 문서)
-                if vectorstore is None:
-                    vectorstore = FAISS.from_documents(documents, embeddings)
-                else:
-                    vectorstore.add_documents(documents)  # 기존 DB에 추가
+                # ✅ 제목/목록/표 구조 기준으로 청크 분할 (표의 행은 자르지 않음)
+                chunks = chunking.split_documents(file_documents)
+                documents.extend(chunks)
 
-                print(f"✅ {filename} 처리 완료! ({len(documents)}개 문서 추가됨)")
+                print(f"✅ {filename} 로드 완료! ({len(chunks)}개 청크)")
 
                 # ✅ HTML 파일 삭제
                 os.remove(file_path)
@@ -69,48 +103,149 @@ def load_vector_store():
                 print(f"❌ {filename} 처리 중 오류 발생: {e}")
                 continue  
 
+    # ✅ 배치 임베딩 후 벡터스토어를 한 번에 생성
+    vectorstore = None
+    try:
+        vectorstore = ingest.build_vector_store(documents, embeddings, cache=embedding_cache.get_cache())
+    except Exception as e:
+        print(f"❌ 벡터스토어 생성 중 오류 발생: {e}")
+
     # ✅ 새로운 벡터 DB 저장
     if vectorstore:
-        vectorstore.save_local("faiss_index")
-        print("✅ 새로운 벡터 데이터베이스 저장 완료!")
+        index_store.save_index(vectorstore, index_path)
+        print(f"✅ 새로운 벡터 데이터베이스 저장 완료! ({index_path})")
         return vectorstore
     else:
         print("⚠️ 벡터스토어 생성 실패. HTML 파일을 확인하세요.")
         return None
         
 
+# ✅ Prompt 템플릿 (검색된 문서를 포함한 질의 응답)
+QA_PROMPT_TEMPLATE = """
+    당신은 고객 지원 챗봇입니다.  
+    사용자의 질문에 대해 제공된 문서를 기반으로 정확하고 친절하게 답변하세요.  
+    
+    ✅ **답변 방식**  
+    - 문서에서 관련 정보를 찾으면, 이를 바탕으로 **쉽고 명확하게 설명**하세요.  
+    - 사용자가 이해하기 쉽게, **필요하면 추가 설명을 덧붙이세요**.  
+    - 너무 짧거나 딱딱한 답변 대신, **친절하고 부드러운 톤으로 응답**하세요.  
+
+    ❗ **문서에서 정확한 답을 찾지 못한 경우**  
+    - 관련 정보가 있다면 **논리적으로 유추하여 답변**하세요.  
+    - 예를 들어, 제품의 크기, 기능, 일반적인 사용 방법을 고려하여 **가장 적절한 답을 제공**하세요.  
+    - 정확한 정보는 없지만 비슷한 사례가 있다면 이를 참고하여 **최대한 유용한 답을 제시**하세요.  
+
+    ❌ **완전히 알 수 없는 경우**  
+    - 그래도 확실한 정보가 없을 경우, "죄송합니다. 해당 질문에 대한 정확한 정보를 찾을 수 없습니다.  
+      하지만 일반적으로 [유추된 정보]를 참고하시면 도움이 될 수 있습니다."라고 안내하세요.  
+    - 보다 자세한 사항은 판매자에게 문의하도록 유도하세요.  
+
+    🌟 **추가 사항**  
+    - 문서에 있는 정보라도 **불확실하거나 애매하면**, 확실한 부분만 답변하세요.  
+    - 판매자 문의를 유도할 때, **연락처 정보가 있으면 함께 제공**하세요.
+
+    문서 내용:
+    {context}
+
+    사용자 질문:
+    {question}
+
+    답변:
+    """
+
+
+def index_version_key(vectorstore):
+    """📌 QA 체인 캐시 키 (스트리밍 중에는 조각이 추가될 때마다 새 스냅샷 객체가 만들어지므로 객체 ID로 구분)"""
+    return f"{id(vectorstore)}:{vectorstore.index.ntotal}"
+
+
+@st.cache_resource(max_entries=QA_CHAIN_CACHE_SIZE, show_spinner=False)
+def get_qa_chain(version, answer_scope, catalog_key, _vectorstore):
+    """📌 인덱스 버전마다 Retriever + RAG 기반 QA 체인(토큰 스트리밍)을 한 번만 생성
+    answer_scope: (상품 ID, 저장된 인덱스 버전) → 같은 상품의 반복 질문은 저장된 답변 사용 (None이면 사용 안 함)
+    catalog_key: (상품 ID, 카탈로그 버전) → 카탈로그 인덱스에서 이 상품만 검색 (None이면 상품 인덱스 사용)"""
+    # ✅ 문서 검색을 위한 Retriever 설정 (BM25 키워드 + 벡터 검색 순위 융합, 후보 CONTEXT_CANDIDATES개)
+    # → 반복 문구 중복 제거 + MMR + 토큰 예산(CONTEXT_MAX_TOKENS) 안에서 context 구성
+    if catalog_key is not None:
+        retriever = catalog_index.CatalogRetriever.for_product(
+            catalog_index.get_catalog(), catalog_key[0], get_embeddings(), k=context_builder.CONTEXT_CANDIDATES
+        )
+    else:
+        retriever = hybrid_retriever.build_retriever(_vectorstore, k=context_builder.CONTEXT_CANDIDATES)
+
+    prompt_template = PromptTemplate(input_variables=["context", "question"], template=QA_PROMPT_TEMPLATE)
+
+    return qa_stream.StreamingQA(
+        llm=get_llm(),
+        retriever=retriever,
+        prompt=prompt_template,
+        embeddings=get_embeddings(),
+        answer_cache=answer_cache.get_cache(),
+        cache_scope=answer_scope,
+        context_builder=context_builder.ContextBuilder(),
+    )
+
+
+def get_catalog_key(answer_scope):
+    """📌 CATALOG_INDEX 사용 중이고 저장이 끝난 상품이 카탈로그에 있으면 (상품 ID, 카탈로그 버전)"""
+    if not catalog_index.CATALOG_INDEX or answer_scope is None:
+        return None
+    product_id = answer_scope[0]
+    version = catalog_index.get_catalog().product_version(product_id)
+    return (product_id, version) if version is not None else None
+
+
+def get_answer_scope():
+    """📌 답변 캐시 범위: 저장이 끝난 상품 인덱스를 사용 중일 때만 (상품 ID, 인덱스 버전)"""
+    product_id = st.session_state.get("answer_product")
+    version = index_store.index_version(index_store.get_index_path(product_id)) if product_id else None
+    return (product_id, str(version)) if version is not None else None
+
+
 # ✅ 벡터 DB 삭제 함수
-def delete_vector_db():
+def delete_vector_db(index_path="faiss_index"):
     """벡터 DB 삭제 함수"""
-    if os.path.exists("faiss_index"):
-        shutil.rmtree("faiss_index")
+    if os.path.exists(index_path):
+        shutil.rmtree(index_path)
         print("🗑 벡터 DB 삭제 완료!")
 
 
-# ✅ JSON 파일이 없으면 자동 생성
-def initialize_crawl_data():
-    if not os.path.exists(CRAWL_LOG_FILE):
-        with open(CRAWL_LOG_FILE, "w") as file:
-            json.dump({}, file)  # 빈 JSON 객체 생성
-        print(f"📂 {CRAWL_LOG_FILE} 파일이 생성되었습니다.")
+def get_workspace():
+    """📌 현재 세션의 작업 폴더 (없으면 새로 생성)"""
+    if st.session_state.get("workspace") is None:
+        st.session_state.workspace = Workspace.create()
+    st.session_state.workspace.touch()
+    return st.session_state.workspace
 
 
-# ✅ JSON 파일에서 크롤링 데이터 로드
-def load_crawl_data():
-    initialize_crawl_data()  # 파일이 없으면 생성
-    try:
-        with open(CRAWL_LOG_FILE, "r") as file:
-            return json.load(file)
-    except json.JSONDecodeError:
-        print("⚠️ JSON 파일이 손상되었습니다. 초기화합니다.")
-        save_crawl_data({})  # 손상된 경우 초기화
-        return {}
+def get_active_job():
+    """📌 현재 세션에 연결된 수집 작업 (없으면 None)"""
+    return ingestion_jobs.get_job(st.session_state.get("job_id"))
+
+
+def attach_job(job):
+    """📌 수집 작업을 현재 세션에 연결 (주소에도 남겨서 새로고침/재접속 후 다시 연결)"""
+    st.session_state.job_id = job.job_id
+    st.query_params["job"] = job.job_id
+    st.session_state.data_ready = True
+
 
+def new_workspace():
+    """📌 새 작업 폴더로 교체 (이전 폴더는 수집이 끝났으면 바로 삭제, 진행 중이면 오래된 폴더 정리 때 삭제)"""
+    previous = st.session_state.get("workspace")
+    job = get_active_job()
+    if previous is not None and (job is None or job.done):
+        previous.remove()
+    st.session_state.workspace = Workspace.create()
+    return st.session_state.workspace
 
-# ✅ JSON 파일에 크롤링 데이터 저장
-def save_crawl_data(data):
-    with open(CRAWL_LOG_FILE, "w") as file:
-        json.dump(data, file, indent=4)
+
+def read_product_meta(workspace):
+    """📌 작업 폴더의 상품 이름/대표 이미지를 세션에 표시"""
+    with open(os.path.join(workspace.meta_dir, "product_name.txt"), "r", encoding="utf-8") as file:
+        st.session_state.product_name = file.read().strip()
+    st.session_state.product_image = os.path.join(workspace.meta_dir, "main_image.jpg")
+    st.session_state.image_displayed = True
 
 
 def get_user_ip() -> str:
@@ -136,46 +271,40 @@ def get_user_ip() -> str:
         return f"오류 발생: {e}"
 
 
-# ✅ IP별 크롤링 횟수 관리
+# ✅ IP별 크롤링 횟수 관리 (SQLite 슬라이딩 윈도우, 재실행마다 인덱스 조회 한 번)
 def can_crawl(user_ip):
-    crawl_data = load_crawl_data()
-    now = time.time()
+    return rate_limiter.get_limiter().status(user_ip)  # (크롤링 가능 여부, 남은 횟수)
 
-    # IP별 데이터가 없으면 초기화
-    user_data = crawl_data.get(user_ip, {"count": 0, "last_time": now})
 
-    # 2시간 경과 여부 확인
-    if now - user_data["last_time"] > RESET_TIME:
-        user_data["count"] = 0  # 크롤링 횟수 초기화
-        user_data["last_time"] = now  # 시간 갱신
-        crawl_data[user_ip] = user_data
-        save_crawl_data(crawl_data)
+def retry_message(user_ip):
+    minutes = max(1, round(rate_limiter.get_limiter().retry_after(user_ip) / 60))
+    return f"🚨 크롤링 허용 횟수를 초과했습니다! 약 {minutes}분 후 다시 시도해주세요."
 
-    remaining_attempts = MAX_CRAWL_ATTEMPTS - user_data["count"]
-    return user_data["count"] < MAX_CRAWL_ATTEMPTS, remaining_attempts  # 크롤링 가능 여부 반환
-    
 
-# ✅ 버튼 클릭 시 크롤링 횟수 증가하는 함수
-def update_crawl_count(user_ip):
-    crawl_data = load_crawl_data()
-    now = time.time()
+STAGE_ICONS = {"pending": "⏸", "running": "⏳", "done": "✅", "skipped": "⏭", "failed": "❌"}
 
-    if user_ip in crawl_data:
-        crawl_data[user_ip]["count"] += 1  # ✅ 버튼 클릭 시에만 크롤링 횟수 증가
-        crawl_data[user_ip]["last_time"] = now  # 마지막 크롤링 시간 업데이트
-    else:
-        crawl_data[user_ip] = {"count": 1, "last_time": now}  # 새 사용자 추가
 
-    save_crawl_data(crawl_data)  # JSON 파일 저장
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def job_progress_panel(job_id):
+    """📌 수집 작업의 단계별 진행 상황 표시 (이 영역만 주기적으로 다시 그림)"""
+    job = ingestion_jobs.get_job(job_id)
+    if job is None:
+        return
 
+    progress = job.progress()
+    st.progress(progress["fraction"], text="⏳ 상품 정보를 수집하는 중입니다..." + (" (질문은 바로 가능합니다)" if progress["ready"] else ""))
+    for stage in progress["stages"]:
+        seconds = f" {stage['seconds']:.1f}초" if stage["seconds"] is not None else ""
+        detail = f" · {stage['detail']}" if stage["detail"] else ""
+        st.caption(f"{STAGE_ICONS[stage['status']]} {stage['label']}{seconds}{detail}")
 
-def copy_files(src_folder, dst_folder="."):
-    """주어진 폴더의 모든 파일 및 하위 폴더를 복사"""
-    folders_to_clear = ["download_images", "main_image", "ocr_texts"]
-    for folder in folders_to_clear:
-        if os.path.exists(folder):  # ✅ 폴더 존재 확인
-            shutil.rmtree(folder)   # ✅ 폴더와 내부 모든 파일 삭제
+    # ✅ 질문 가능 / 완료로 상태가 바뀌면 화면 전체를 다시 그려서 최신 인덱스 연결
+    if st.session_state.get("job_state") != (job.ready, job.done):
+        st.rerun()
 
+
+def copy_files(src_folder, dst_folder="."):
+    """주어진 폴더의 모든 파일 및 하위 폴더를 복사 (dst_folder는 새 작업 폴더이므로 지울 파일 없음)"""
     if not os.path.exists(src_folder):  # ✅ 원본 폴더가 존재하는지 확인
         st.error(f"❌ 원본 폴더 '{src_folder}'이(가) 존재하지 않습니다!")
         return False
@@ -261,37 +390,31 @@ with left:
 
     with col1:
         if st.button("Test - 냉장고"):
-            copy_success = copy_files("test/case1")
+            workspace = new_workspace()
+            copy_success = copy_files("test/case1", workspace.root)
             st.session_state.selected_link = "test/case1/main_image/link.txt"
             st.session_state.link_content = get_link_content(st.session_state.selected_link)
 
-            with open("main_image/product_name.txt", "r", encoding="utf-8") as file:
-                st.session_state.product_name = file.read().strip()
-            st.session_state.product_image = "main_image/main_image.jpg"
-            st.session_state.image_displayed = True
+            read_product_meta(workspace)
 
     with col2:
         if st.button("Test - 세탁기"):
-            copy_success = copy_files("test/case2")
+            workspace = new_workspace()
+            copy_success = copy_files("test/case2", workspace.root)
             st.session_state.selected_link = "test/case2/main_image/link.txt"
             st.session_state.link_content = get_link_content(st.session_state.selected_link)
 
-            with open("main_image/product_name.txt", "r", encoding="utf-8") as file:
-                st.session_state.product_name = file.read().strip()
-            st.session_state.product_image = "main_image/main_image.jpg"
-            st.session_state.image_displayed = True
+            read_product_meta(workspace)
 
 
     with col3:
         if st.button("Test - 청소기"):
-            copy_success = copy_files("test/case3")
+            workspace = new_workspace()
+            copy_success = copy_files("test/case3", workspace.root)
             st.session_state.selected_link = "test/case3/main_image/link.txt"
             st.session_state.link_content = get_link_content(st.session_state.selected_link)
 
-            with open("main_image/product_name.txt", "r", encoding="utf-8") as file:
-                st.session_state.product_name = file.read().strip()
-            st.session_state.product_image = "main_image/main_image.jpg"
-            st.session_state.image_displayed = True
+            read_product_meta(workspace)
 
     
     if copy_success:
@@ -301,7 +424,10 @@ with left:
         if st.session_state.link_content:  # 버튼을 눌러서 값이 설정된 경우만 표시
             st.info(f"선택된 파일 링크: `{st.session_state.link_content}`")
 
-    initialize_crawl_data()
+    # ✅ 크롤링 작업자(브라우저)를 미리 띄워 두기 (세션당 한 번, 화면 표시는 기다리지 않음)
+    if "crawl_worker_started" not in st.session_state:
+        threading.Thread(target=crawl_worker.ensure_worker, daemon=True).start()
+        st.session_state.crawl_worker_started = True
 
     # 사용자 IP 가져오기
     user_ip = get_user_ip()
@@ -321,64 +447,112 @@ with left:
     if can_crawl_now:
         if st.button("🖼 이미지 크롤링 실행"):
             if link:
-                # ✅ 버튼을 클릭했을 때만 크롤링 횟수 증가
-                update_crawl_count(user_ip)
-
-                # ✅ 남은 크롤링 횟수를 즉시 업데이트
-                can_crawl_now, remaining_attempts = can_crawl(user_ip)
-
-                # ✅ 기존 `st.write()`를 지우고 새로운 값 출력
-                remaining_attempts_display.empty()  # 기존 UI 삭제
-                remaining_attempts_display.write(f"🔹 남은 크롤링 횟수: {remaining_attempts}회")
-
-                if remaining_attempts == 0:
-                    st.error("🚨 크롤링 허용 횟수를 초과했습니다! 2시간 후 다시 시도해주세요.")
-
-                # ✅ 기존 벡터 DB 삭제 후 초기화
-                delete_vector_db()
-                st.session_state.vectorstore = None  # 벡터 DB 캐시 제거
-
-                # ✅ jpg_crowling.py 실행 (이미지 크롤링)
-                with st.spinner("🔄 이미지 가져오는 중..."):
-                    subprocess.run(["python", "jpg_crowling.py", link])     # 이것도 import 를 하면 playwright 와 asyncio 가 충돌한다. 따라서 크롤링 코드는 별도의 프로세스로 실행
+                # ✅ 상품 ID로 저장된 벡터 DB 확인 (Test 데이터는 선택된 파일 링크 기준)
+                product_id = index_store.extract_product_id(link) or index_store.extract_product_id(st.session_state.link_content)
+                cached_vectorstore = index_store.load_index(product_id, embeddings, reader=read_cached_index)
+                active_job = ingestion_jobs.find_active(product_id)
+
+                if cached_vectorstore:
+                    # ✅ 이미 저장된 상품이면 크롤링/OCR 없이 바로 사용 (크롤링 횟수 차감 없음)
+                    workspace = get_workspace()
+                    if index_store.restore_meta(product_id, meta_folder=workspace.meta_dir):
+                        read_product_meta(workspace)
+
+                    st.session_state.vectorstore = cached_vectorstore
+                    st.session_state.answer_product = product_id
+                    if catalog_index.CATALOG_INDEX and product_id not in catalog_index.get_catalog():
+                        catalog_index.get_catalog().add_vectorstore(product_id, cached_vectorstore)  # 카탈로그 사용 전에 저장된 상품
+                    st.session_state.job_id = None
+                    st.session_state.data_ready = True
+
+                    st.toast("✅ 저장된 상품 정보를 불러왔습니다! 질문받을 준비가 되었습니다.")
+
+                elif active_job is not None:
+                    # ✅ 같은 상품을 이미 수집 중이면 (다른 세션 포함) 크롤링 횟수 차감 없이 그 작업에 연결
+                    st.session_state.vectorstore = None
+                    st.session_state.answer_product = None
+                    attach_job(active_job)
+                    st.toast("♻ 같은 상품을 이미 수집 중입니다. 진행 중인 작업에 연결했습니다.")
 
-                st.toast("✅ 이미지 크롤링 완료!")
-
-                # 메인 사진, 이름 표시
-                with open("main_image/product_name.txt", "r", encoding="utf-8") as file:
-                    st.session_state.product_name = file.read().strip()
-                st.session_state.product_image = "main_image/main_image.jpg"
-                st.session_state.image_displayed = True
-
-                # ✅ jpg2text_run.py 실행 (이미지 → 텍스트 변환)
-                with st.spinner("🔄 이미지 변환 중..."):
-                    jpg2text_run.main()
-
-                st.toast("✅ 변환 완료! 데이터가 저장되었습니다.")
-
-                with st.spinner("🔄 정보 저장 중..."):
-                    # ✅ OCR 변환된 HTML 파일을 벡터 DB에 추가
-                    vectorstore = load_vector_store()
-
-                if vectorstore:
-                    st.session_state.vectorstore = vectorstore
                 else:
-                    st.error("⚠️ 데이터 생성 실패: 링크가 올바른지 확인해 주세요.")
-                
-                # ✅ 벡터 DB가 필요할 경우 세션 상태 업데이트
-                st.session_state.data_ready = True
-
-                st.toast("✅ 저장 완료! 질문받을 준비가 되었습니다.")
+                    # ✅ 새로 크롤링할 때만 횟수 차감 (확인과 차감을 한 번에 처리해서 동시 클릭에도 초과하지 않음)
+                    can_crawl_now, remaining_attempts = rate_limiter.get_limiter().try_acquire(user_ip)
+
+                    # ✅ 기존 `st.write()`를 지우고 새로운 값 출력
+                    remaining_attempts_display.empty()  # 기존 UI 삭제
+                    remaining_attempts_display.write(f"🔹 남은 크롤링 횟수: {remaining_attempts}회")
+
+                    if not can_crawl_now:
+                        st.error(retry_message(user_ip))
+                    else:
+                        # ✅ 이 세션 전용 작업 폴더 사용 (이전 수집이 아직 진행 중이면 새 폴더에서 시작)
+                        running = get_active_job()
+                        workspace = new_workspace() if running is not None and not running.done else get_workspace()
+
+                        # ✅ 기존 벡터 DB 삭제 후 초기화
+                        delete_vector_db(workspace.index_dir)
+                        st.session_state.vectorstore = None  # 벡터 DB 캐시 제거
+                        st.session_state.answer_product = None  # 인덱스 저장이 끝날 때까지 답변 캐시 사용 안 함
+
+                        # ✅ 크롤링 → OCR → 정리 → 임베딩을 백그라운드 작업으로 제출 (화면은 진행 상황만 조회)
+                        job = ingestion_jobs.submit(link, product_id, workspace, embeddings, cache=embedding_cache.get_cache())
+                        if job.workspace is not workspace:
+                            # 확인 직후 다른 세션이 같은 상품 수집을 시작해서 기존 작업에 연결된 경우 → 차감 취소
+                            remaining_attempts = rate_limiter.get_limiter().refund(user_ip)
+                            remaining_attempts_display.empty()
+                            remaining_attempts_display.write(f"🔹 남은 크롤링 횟수: {remaining_attempts}회")
+                        attach_job(job)
+
+                        st.toast("🚀 상품 정보 수집을 시작했습니다! 진행 상황은 아래에 표시됩니다.")
 
             else:
                 st.error("❌ 링크를 입력하세요! (Test 파일의 경우 아무거나 입력)")
     else:
         # 🚨 크롤링 횟수 초과 시 경고 메시지 표시
-        st.error("🚨 크롤링 허용 횟수를 초과했습니다! 2시간 후 다시 시도해주세요.")
+        st.error(retry_message(user_ip))
+
+# ✅ 새로고침/재접속한 경우 주소(?job=...)의 수집 작업에 다시 연결
+if "job_id" not in st.session_state and ingestion_jobs.get_job(st.query_params.get("job")):
+    reattached = ingestion_jobs.get_job(st.query_params["job"])
+    st.session_state.job_id = reattached.job_id
+    st.session_state.workspace = reattached.workspace
+    st.session_state.data_ready = True
 
 if "data_ready" not in st.session_state:
     st.stop()  # 🚀 사용자가 링크 입력 후 실행되도록 중단
 
+# ✅ 백그라운드 수집 작업 상태 확인 (화면은 기다리지 않고 진행 상황만 표시)
+job = get_active_job()
+if job is not None:
+    st.session_state.job_state = (job.ready, job.done)
+
+    # 크롤링이 끝나면 메인 사진, 이름 표시
+    page_info = (job.crawl_result or {}).get("page") or {}
+    if page_info.get("name"):
+        st.session_state.product_name = page_info["name"]
+        st.session_state.product_image = job.crawl_result.get("main_image_path")
+        st.session_state.image_displayed = True
+
+    # 지금까지 인덱싱된 최신 스냅샷 사용
+    if job.vectorstore is not None:
+        st.session_state.vectorstore = job.vectorstore
+
+    if job.done:
+        # ✅ 완료된 인덱스를 세션에 연결하고 작업 연결 해제
+        st.session_state.job_id = None
+        st.query_params.pop("job", None)
+        if job.error:
+            with left:
+                st.error(f"⚠️ 데이터 생성 실패: {job.error}")
+        else:
+            st.session_state.answer_product = job.product_id
+            st.toast("✅ 저장 완료! 질문받을 준비가 되었습니다.")
+    else:
+        with left:
+            job_progress_panel(job.job_id)
+        if not job.ready:
+            st.stop()  # 첫 조각이 인덱싱될 때까지 질문 영역은 표시하지 않음 (진행 상황 영역만 갱신)
+
 if st.session_state.image_displayed and st.session_state.product_name and st.session_state.product_image:
     with right:
         st.markdown(f"<span style='font-size: 18px;'>{st.session_state.product_name}</span>", unsafe_allow_html=True)
@@ -390,58 +564,17 @@ if "api_key_checked" not in st.session_state:
     st.session_state.api_key_checked = True
 
 
-# ✅ 벡터 데이터베이스 로드
-vectorstore = st.session_state.vectorstore if "vectorstore" in st.session_state else load_vector_store()
-
-# ✅ OpenAI LLM (GPT-4 Turbo) 설정
-llm = ChatOpenAI(model_name="gpt-4o", temperature=0.5)
+# ✅ 벡터 데이터베이스 로드 (한 번 불러오면 세션에 보관해서 재실행 때 다시 찾지 않음)
+if "vectorstore" not in st.session_state:
+    st.session_state.vectorstore = load_vector_store(get_workspace().index_dir, get_workspace().texts_dir)
+vectorstore = st.session_state.vectorstore
 
-# ✅ 문서 검색을 위한 Retriever 설정
-retriever = vectorstore.as_retriever(search_kwargs={"k": 5})  # 가장 관련 있는 3개 문서 검색
-
-# ✅ Prompt 템플릿 설정 (검색된 문서를 포함한 질의 응답)
-prompt_template = PromptTemplate(
-    input_variables=["context", "question"],
-    template="""
-    당신은 고객 지원 챗봇입니다.  
-    사용자의 질문에 대해 제공된 문서를 기반으로 정확하고 친절하게 답변하세요.  
-    
-    ✅ **답변 방식**  
-    - 문서에서 관련 정보를 찾으면, 이를 바탕으로 **쉽고 명확하게 설명**하세요.  
-    - 사용자가 이해하기 쉽게, **필요하면 추가 설명을 덧붙이세요**.  
-    - 너무 짧거나 딱딱한 답변 대신, **친절하고 부드러운 톤으로 응답**하세요.  
-
-    ❗ **문서에서 정확한 답을 찾지 못한 경우**  
-    - 관련 정보가 있다면 **논리적으로 유추하여 답변**하세요.  
-    - 예를 들어, 제품의 크기, 기능, 일반적인 사용 방법을 고려하여 **가장 적절한 답을 제공**하세요.  
-    - 정확한 정보는 없지만 비슷한 사례가 있다면 이를 참고하여 **최대한 유용한 답을 제시**하세요.  
-
-    ❌ **완전히 알 수 없는 경우**  
-    - 그래도 확실한 정보가 없을 경우, "죄송합니다. 해당 질문에 대한 정확한 정보를 찾을 수 없습니다.  
-      하지만 일반적으로 [유추된 정보]를 참고하시면 도움이 될 수 있습니다."라고 안내하세요.  
-    - 보다 자세한 사항은 판매자에게 문의하도록 유도하세요.  
-
-    🌟 **추가 사항**  
-    - 문서에 있는 정보라도 **불확실하거나 애매하면**, 확실한 부분만 답변하세요.  
-    - 판매자 문의를 유도할 때, **연락처 정보가 있으면 함께 제공**하세요.
-
-    문서 내용:
-    {context}
-
-    사용자 질문:
-    {question}
-
-    답변:
-    """
-)
+if vectorstore is None:
+    st.stop()  # 사용할 수 있는 인덱스가 없음 (오류는 위에서 표시)
 
-# ✅ RAG 기반 QA 시스템 생성
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    retriever=retriever,
-    return_source_documents=False,  # 참고한 문서도 함께 반환
-    chain_type_kwargs={"prompt": prompt_template}
-) if retriever else None
+# ✅ 인덱스 버전별로 캐시된 QA 체인 사용 (재실행마다 LLM / Retriever / 체인을 새로 만들지 않음)
+answer_scope = get_answer_scope()
+qa_chain = get_qa_chain(index_version_key(vectorstore), answer_scope, get_catalog_key(answer_scope), vectorstore)
 
 with left:
     user_input = st.text_area("✏️ 해당 상품에 관하여 궁금한 점을 물어봐 주세요", placeholder="ex) 배송이 얼마나 걸려?")
@@ -452,12 +585,24 @@ if "answer" not in st.session_state:
 with left:
     if st.button("질문하기") and qa_chain:
         if user_input:
-            with st.spinner("🔄 질문 처리 중..."):
-                response = qa_chain.invoke({"query": user_input})
-                st.session_state.answer = response.get("result")
-                
-            if st.session_state.answer:
-                st.markdown(f"📌 **답변:** \n\n{st.session_state.answer}")
+            # ✅ 답변 토큰을 도착하는 대로 표시 (전체 답변을 기다리지 않음)
+            st.markdown("📌 **답변:**")
+            answer = qa_chain.stream(user_input)
+            st.write_stream(answer)
+            st.session_state.answer = answer.text
+            st.session_state.answer_timings = answer.timings
+
+            if answer.timings.get("cached"):
+                stats = answer_cache.get_cache().stats()
+                st.caption(
+                    f"♻ 이전 답변 재사용 (유사도 {answer.timings['similarity']:.2f}) · {answer.timings['total'] * 1000:.0f}ms · "
+                    f"약 {answer.timings['saved']:.1f}초 단축 (적중률 {stats['hit_rate']:.0%})"
+                )
+            elif answer.timings:
+                st.caption(
+                    f"⚡ 첫 글자 {answer.timings['ttft']:.1f}초 · 전체 {answer.timings['total']:.1f}초"
+                    + (f" · 참고 문서 {answer.context_stats['selected']}개 ({answer.context_stats['tokens_out']} 토큰)" if answer.context_stats else "")
+                )
         
         else:
             st.error("❌ 질문을 입력하세요!")
\ No newline at end of file
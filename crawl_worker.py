@@ -0,0 +1,292 @@
+import os
+import sys
+import time
+import queue
+import asyncio
+import secrets
+import threading
+import subprocess
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, Client
+from playwright.async_api import async_playwright
+import jpg_crowling
+from workspace import Workspace, is_workspace_path
+
+# ✅ 상시 실행 크롤링 작업자 (브라우저를 한 번만 띄워 두고 로컬 소켓으로 작업을 받음)
+# 사용법: python crawl_worker.py  (coupangQA.py에서 필요할 때 자동으로 실행됨)
+#
+# Playwright(async)는 작업자 프로세스 메인 스레드의 이벤트 루프에서만 실행하고 (컨텍스트 풀 크기만큼 페이지를 동시에 로드),
+# 이미지 다운로드(asyncio)는 연결 처리 스레드에서 실행하므로 Streamlit / asyncio 이벤트 루프와 충돌하지 않음
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+CRAWL_WORKER_HOST = "127.0.0.1"
+CRAWL_WORKER_PORT = int(os.getenv("CRAWL_WORKER_PORT", 8765))
+# 연결 인증 키 (연결된 상대가 보낸 메시지는 unpickle되므로 공개된 기본값을 쓰지 않음)
+# 환경 변수가 없으면 설치 폴더에 무작위 키를 만들어 소유자만 읽을 수 있게(0600) 저장하고 앱/작업자가 함께 사용
+CRAWL_WORKER_KEY_FILE = os.getenv(
+    "CRAWL_WORKER_KEY_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".crawl_worker.key")
+)
+CRAWL_CONTEXT_POOL = int(os.getenv("CRAWL_CONTEXT_POOL", 2))  # 재사용할 브라우저 컨텍스트 수 (= 동시에 로드할 페이지 수)
+CRAWL_CONTEXT_MAX_USES = int(os.getenv("CRAWL_CONTEXT_MAX_USES", 20))  # 이 횟수만큼 쓰면 컨텍스트 새로 생성 (메모리/쿠키 정리)
+CRAWL_WORKER_START_TIMEOUT = float(os.getenv("CRAWL_WORKER_START_TIMEOUT", 30))  # 작업자 시작 대기 시간 (초)
+CRAWL_JOB_TIMEOUT = float(os.getenv("CRAWL_JOB_TIMEOUT", 300))  # 작업 하나의 최대 대기 시간 (초)
+
+WORKER_ADDRESS = (CRAWL_WORKER_HOST, CRAWL_WORKER_PORT)
+
+
+def _load_authkey(path=CRAWL_WORKER_KEY_FILE):
+    """📌 CRAWL_WORKER_AUTHKEY 환경 변수 → 없으면 키 파일 (처음이면 무작위 키 생성)"""
+    if os.getenv("CRAWL_WORKER_AUTHKEY"):
+        return os.environ["CRAWL_WORKER_AUTHKEY"].encode()
+
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):  # 다른 프로세스가 방금 만든 파일이면 키가 써질 때까지 잠시 대기
+            with open(path, "rb") as file:
+                key = file.read().strip()
+            if key:
+                return key
+            time.sleep(0.1)
+        raise RuntimeError(f"크롤링 작업자 키 파일이 비어 있습니다: {path}")
+
+    key = secrets.token_hex(32).encode()
+    with os.fdopen(fd, "wb") as file:
+        file.write(key)
+    return key
+
+
+CRAWL_WORKER_AUTHKEY = _load_authkey()
+
+
+class ContextPool:
+    """📌 브라우저 컨텍스트 재사용 풀 (최대 size개 보관, max_uses번 사용 후 교체, 작업자 이벤트 루프에서만 사용)"""
+
+    def __init__(self, browser, size=CRAWL_CONTEXT_POOL, max_uses=CRAWL_CONTEXT_MAX_USES):
+        self.browser = browser
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self._idle = []  # (context, 사용 횟수)
+
+    async def acquire(self):
+        if self._idle:
+            return self._idle.pop()
+        return await self.browser.new_context(), 0
+
+    async def release(self, context, uses):
+        uses += 1
+        if uses >= self.max_uses or len(self._idle) >= self.size:
+            await context.close()
+        else:
+            self._idle.append((context, uses))
+
+    async def warm_up(self):
+        """첫 작업이 컨텍스트 생성 비용을 내지 않도록 미리 만들어 둠"""
+        while len(self._idle) < self.size:
+            self._idle.append((await self.browser.new_context(), 0))
+
+    async def close(self):
+        for context, _ in self._idle:
+            await context.close()
+        self._idle.clear()
+
+
+class CrawlWorker:
+    """📌 작업 큐를 받아 처리하는 작업자 (페이지 로드는 브라우저 이벤트 루프에서 동시에, 저장은 연결 스레드)"""
+
+    def __init__(self, address=WORKER_ADDRESS, authkey=CRAWL_WORKER_AUTHKEY):
+        self.address = address
+        self.authkey = authkey
+        self.jobs = queue.Queue()
+        self.jobs_done = 0
+        self._output_locks = {}  # 작업 폴더별 잠금 (같은 폴더에 저장하는 작업만 순서대로, 다른 폴더는 동시에)
+        self._locks_guard = threading.Lock()
+        self._listener = None
+
+    def fetch(self, url):
+        """📌 연결 스레드 → 브라우저 스레드로 페이지 로드 요청 후 결과 대기"""
+        future = Future()
+        self.jobs.put((url, future))
+        try:
+            return future.result(timeout=CRAWL_JOB_TIMEOUT)
+        except TimeoutError:
+            future.cancel()  # 아직 큐에 남아 있으면 로드하지 않음
+            raise
+
+    def _output_lock(self, root):
+        with self._locks_guard:
+            return self._output_locks.setdefault(root, threading.Lock())
+
+    def handle_crawl(self, url, workspace_root=None):
+        # ✅ 작업 폴더는 WORKSPACE_ROOT 아래만 허용 (요청으로 받은 임의 경로에 파일을 쓰지 않도록)
+        if workspace_root and not is_workspace_path(workspace_root):
+            return {"ok": False, "error": f"허용되지 않은 작업 폴더입니다: {workspace_root}"}
+
+        start = time.perf_counter()
+        html_source, S_or_F, page_time = self.fetch(url)
+        if not html_source:
+            return {"ok": False, "error": "페이지 HTML을 가져오지 못했습니다.", "timings": {"page": page_time}}
+
+        workspace = Workspace(workspace_root, job_id=os.path.basename(workspace_root)) if workspace_root else Workspace()
+        with self._output_lock(workspace.root):
+            result = jpg_crowling.process_page(html_source, S_or_F, workspace)
+
+        result["timings"]["page"] = page_time
+        result["timings"]["total"] = time.perf_counter() - start
+        self.jobs_done += 1
+        print(f"🎉 크롤링 완료 ({self.jobs_done}번째 작업): {url} ({result['timings']['total']:.2f}초)")
+        return result
+
+    def handle_connection(self, conn):
+        """📌 요청 하나 처리: {"op": "ping" | "crawl" | "shutdown", "url": ..., "workspace": 작업 폴더 경로}"""
+        with conn:
+            try:
+                message = conn.recv()
+                op = message.get("op")
+                if op == "ping":
+                    conn.send({"ok": True, "jobs_done": self.jobs_done})
+                elif op == "crawl":
+                    conn.send(self.handle_crawl(message["url"], message.get("workspace")))
+                elif op == "shutdown":
+                    conn.send({"ok": True})
+                    self.jobs.put(None)
+                else:
+                    conn.send({"ok": False, "error": f"알 수 없는 요청: {op}"})
+            except (EOFError, OSError):
+                pass  # 클라이언트가 먼저 연결을 끊은 경우
+            except Exception as e:
+                print(f"❌ 작업 처리 실패: {e}")
+                try:
+                    conn.send({"ok": False, "error": str(e)})
+                except OSError:
+                    pass
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return  # 리스너 종료
+            threading.Thread(target=self.handle_connection, args=(conn,), daemon=True).start()
+
+    def serve(self):
+        """📌 브라우저를 띄워 두고 큐에 들어온 페이지 로드 요청을 처리 (메인 스레드에서 호출)"""
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        asyncio.run(self._serve_async())
+
+    async def _launch(self, p):
+        start = time.perf_counter()
+        browser = await p.chromium.launch(headless=jpg_crowling.CRAWL_HEADLESS, args=jpg_crowling.BROWSER_ARGS)
+        pool = ContextPool(browser)
+        await pool.warm_up()
+        print(f"🚀 크롤링 작업자 준비 완료: {self.address[0]}:{self.address[1]} (브라우저 시작 {time.perf_counter() - start:.2f}초)")
+        return browser, pool
+
+    async def _load(self, pool, url, future, slots):
+        """컨텍스트 하나로 페이지를 로드하고 결과를 연결 스레드에 전달"""
+        start = time.perf_counter()
+        try:
+            context, uses = await pool.acquire()
+            try:
+                html_source, S_or_F = await jpg_crowling.fetch_html_async(context, url)
+            finally:
+                await pool.release(context, uses)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result((html_source, S_or_F, time.perf_counter() - start))
+        finally:
+            slots.release()
+
+    async def _serve_async(self):
+        """📌 최대 CRAWL_CONTEXT_POOL개 페이지를 동시에 로드 (여러 수집 작업이 한 페이지씩 줄 서지 않도록)"""
+        async with async_playwright() as p:
+            browser, pool = None, None
+            slots = asyncio.Semaphore(max(1, CRAWL_CONTEXT_POOL))
+            loads = set()
+            try:
+                while True:
+                    # ✅ 브라우저가 없거나 종료되었으면 (다시) 실행
+                    if browser is None or not browser.is_connected():
+                        browser, pool = await self._launch(p)
+
+                    await slots.acquire()  # 빈 자리가 생길 때까지 다음 작업은 큐에 남겨 둠 (대기 중 시간 초과되면 취소)
+                    job = await asyncio.to_thread(self.jobs.get)
+                    if job is None:
+                        break
+
+                    url, future = job
+                    if not future.set_running_or_notify_cancel():
+                        slots.release()
+                        continue
+
+                    task = asyncio.create_task(self._load(pool, url, future, slots))
+                    loads.add(task)
+                    task.add_done_callback(loads.discard)
+            finally:
+                self.jobs.put(None)  # 예외로 끝난 경우에도 큐를 기다리는 스레드가 종료되도록
+                await asyncio.gather(*loads, return_exceptions=True)
+                self._listener.close()
+                if pool is not None:
+                    await pool.close()
+                if browser is not None and browser.is_connected():
+                    await browser.close()
+
+
+def _request(message, timeout):
+    """📌 작업자에게 요청을 보내고 응답(dict) 반환"""
+    with Client(WORKER_ADDRESS, authkey=CRAWL_WORKER_AUTHKEY) as conn:
+        conn.send(message)
+        if not conn.poll(timeout):
+            raise TimeoutError(f"크롤링 작업자 응답 시간 초과 ({timeout}초)")
+        return conn.recv()
+
+
+def is_running():
+    try:
+        return _request({"op": "ping"}, timeout=5).get("ok", False)
+    except (OSError, EOFError, TimeoutError):
+        return False
+
+
+def ensure_worker(timeout=CRAWL_WORKER_START_TIMEOUT):
+    """📌 작업자가 실행 중이 아니면 별도 프로세스로 실행하고 준비될 때까지 대기"""
+    if is_running():
+        return True
+
+    worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl_worker.py")
+    subprocess.Popen([sys.executable, worker_path], start_new_session=True)  # Streamlit 재실행과 관계없이 유지
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_running():
+            return True
+        time.sleep(0.3)
+    return False
+
+
+def crawl(url, workspace=None, timeout=CRAWL_JOB_TIMEOUT):
+    """📌 작업자에게 크롤링을 맡기고 구조화된 결과 반환 ({"ok", "page", "image_paths", "main_image_path", "timings"})
+    workspace를 주면 해당 작업 폴더에 저장 (없으면 기존처럼 현재 폴더)"""
+    if not ensure_worker():
+        return {"ok": False, "error": "크롤링 작업자를 시작하지 못했습니다."}
+    try:
+        return _request({"op": "crawl", "url": url, "workspace": workspace.root if workspace else None}, timeout)
+    except (OSError, EOFError, TimeoutError) as e:
+        return {"ok": False, "error": str(e)}
+
+
+def shutdown():
+    try:
+        _request({"op": "shutdown"}, timeout=5)
+    except (OSError, EOFError, TimeoutError):
+        pass
+
+
+if __name__ == "__main__":
+    try:
+        CrawlWorker().serve()
+    except OSError as e:
+        print(f"⚠ 크롤링 작업자를 시작할 수 없습니다 (이미 실행 중일 수 있음): {e}")
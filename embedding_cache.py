@@ -0,0 +1,87 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+
+# ✅ 상품/실행 간 공유되는 임베딩 캐시 파일 (SQLite)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+OPENAI_DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+class EmbeddingCache:
+    """📌 hash(API 주소, 모델, 텍스트)를 키로 float32 벡터를 저장하는 영구 임베딩 캐시"""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # 읽기/쓰기 동시 접근 허용
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text, model, endpoint):
+        """API 주소, 모델명, 텍스트로 캐시 키 생성 (같은 모델명이라도 가짜 서버 벡터와 섞이지 않도록)"""
+        return hashlib.sha256(f"{endpoint}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts, model, endpoint):
+        """📌 텍스트 목록의 캐시된 벡터 반환 (없으면 None)"""
+        keys = [self.make_key(text, model, endpoint) for text in texts]
+        found = {}
+
+        with self._lock:
+            for i in range(0, len(keys), 500):  # SQLite 변수 개수 제한 대비
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+
+        vectors = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                vectors.append(None)
+            else:
+                self.hits += 1
+                vectors.append(np.frombuffer(blob, dtype=np.float32).tolist())
+        return vectors
+
+    def put_many(self, texts, vectors, model, endpoint):
+        """📌 새로 계산한 벡터를 캐시에 저장"""
+        rows = [
+            (self.make_key(text, model, endpoint), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def openai_base_url(configured=None):
+    """📌 실제로 요청을 보낼 OpenAI API 주소 (설정값 → OPENAI_BASE_URL → 기본 주소 순)"""
+    return (configured or os.getenv("OPENAI_BASE_URL") or OPENAI_DEFAULT_BASE_URL).rstrip("/")
+
+
+def get_cache():
+    """📌 프로세스 전체에서 공유하는 기본 임베딩 캐시 반환"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
@@ -0,0 +1,114 @@
+import sys
+import json
+import time
+import hashlib
+import asyncio
+import argparse
+from aiohttp import web
+
+# ✅ 로컬 테스트용 가짜 OpenAI 서버 (채팅 스트리밍 + 임베딩)
+# 사용법: python fake_llm_server.py --port 8082 --first-token-latency 0.8 --token-interval 0.03
+#        OPENAI_BASE_URL=http://127.0.0.1:8082/v1 로 설정 후 streamlit run coupangQA.py
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+EMBEDDING_DIM = 1536  # text-embedding-3-small과 같은 차원 (저장된 인덱스와 호환)
+ANSWER = (
+    "안녕하세요! 문의 주셔서 감사합니다. 제공된 상품 정보를 기준으로 안내해 드리겠습니다. "
+    "이 답변은 로컬 테스트용 가짜 서버가 한 단어씩 보내는 스트리밍 응답입니다. "
+    "보다 자세한 사항은 판매자에게 문의해 주시면 정확하게 안내받으실 수 있습니다."
+)
+
+stats = {"chat": 0, "embeddings": 0}
+
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+async def handle_chat(request):
+    """📌 chat.completions 응답 흉내 (stream=true면 SSE로 단어 단위 전송)"""
+    config = request.app["config"]
+    body = await request.json()
+    model = body.get("model", "fake")
+    completion_id = f"chatcmpl-fake-{stats['chat']}"
+    stats["chat"] += 1
+    words = [word + " " for word in ANSWER.split(" ")] * config.repeat
+
+    await asyncio.sleep(config.first_token_latency)
+
+    if not body.get("stream"):
+        await asyncio.sleep(config.token_interval * len(words))
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+        })
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await response.write(f"data: {json.dumps(_chunk(completion_id, model, {'role': 'assistant', 'content': ''}))}\n\n".encode())
+    for index, word in enumerate(words):
+        if index:
+            await asyncio.sleep(config.token_interval)
+        await response.write(f"data: {json.dumps(_chunk(completion_id, model, {'content': word}))}\n\n".encode())
+    await response.write(f"data: {json.dumps(_chunk(completion_id, model, {}, 'stop'))}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+def _fake_vector(text):
+    """같은 텍스트는 항상 같은 벡터 (해시 기반)"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(EMBEDDING_DIM)]
+
+
+async def handle_embeddings(request):
+    """📌 embeddings 응답 흉내 (문자열 / 토큰 배열 입력 모두 허용)"""
+    body = await request.json()
+    inputs = body.get("input")
+    if isinstance(inputs, (str, dict)) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    stats["embeddings"] += len(inputs)
+    return web.json_response({
+        "object": "list",
+        "model": body.get("model", "fake"),
+        "data": [{"object": "embedding", "index": i, "embedding": _fake_vector(json.dumps(item))} for i, item in enumerate(inputs)],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    })
+
+
+async def handle_stats(request):
+    return web.json_response(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 테스트용 가짜 OpenAI 서버")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--first-token-latency", type=float, default=0.8, help="첫 토큰까지 지연 시간 (초)")
+    parser.add_argument("--token-interval", type=float, default=0.03, help="토큰 사이 지연 시간 (초)")
+    parser.add_argument("--repeat", type=int, default=3, help="답변 문장 반복 횟수 (답변 길이)")
+    config = parser.parse_args()
+
+    app = web.Application()
+    app["config"] = config
+    app.router.add_post("/v1/chat/completions", handle_chat)
+    app.router.add_post("/v1/embeddings", handle_embeddings)
+    app.router.add_get("/stats", handle_stats)
+
+    print(f"🚀 가짜 OpenAI 서버 실행: http://127.0.0.1:{config.port}/v1 (통계: /stats)")
+    web.run_app(app, host="127.0.0.1", port=config.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
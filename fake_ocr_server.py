@@ -0,0 +1,65 @@
+import sys
+import random
+import asyncio
+import argparse
+from aiohttp import web
+
+# ✅ 로컬 테스트용 가짜 Upstage OCR 서버
+# 사용법: python fake_ocr_server.py --port 8081 --fail-rate 0.2 --latency 0.5
+#        UPSTAGE_UPLOAD_URL=http://127.0.0.1:8081/ 로 설정 후 jpg2text_run 실행
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+stats = {"requests": 0, "ok": 0, "failed": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+async def handle_ocr(request):
+    """📌 document-parse 응답 형식을 흉내 내는 핸들러 (설정한 확률로 429/503 반환)"""
+    config = request.app["config"]
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    try:
+        form = await request.post()
+        document = form.get("document")
+        filename = getattr(document, "filename", "unknown")
+        size = len(document.file.read()) if document is not None else 0
+
+        await asyncio.sleep(config.latency)
+
+        if random.random() < config.fail_rate:
+            stats["failed"] += 1
+            status = random.choice([429, 503])
+            headers = {"Retry-After": "0.1"} if status == 429 else {}
+            return web.Response(status=status, text="fake failure", headers=headers)
+
+        stats["ok"] += 1
+        html = f"<h1>{filename}</h1><p>가짜 OCR 결과 ({size} bytes)</p>"
+        return web.json_response({"content": {"html": html}})
+    finally:
+        stats["in_flight"] -= 1
+
+
+async def handle_stats(request):
+    return web.json_response(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 테스트용 가짜 OCR 서버")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="429/503 응답 확률 (0~1)")
+    parser.add_argument("--latency", type=float, default=0.2, help="요청당 지연 시간 (초)")
+    config = parser.parse_args()
+
+    app = web.Application(client_max_size=50 * 1024 * 1024)
+    app["config"] = config
+    app.router.add_post("/", handle_ocr)
+    app.router.add_get("/stats", handle_stats)
+
+    print(f"🚀 가짜 OCR 서버 실행: http://127.0.0.1:{config.port}/ (통계: /stats)")
+    web.run_app(app, host="127.0.0.1", port=config.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
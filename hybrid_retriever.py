@@ -0,0 +1,141 @@
+import os
+import re
+import math
+from collections import Counter, defaultdict
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+# ✅ 키워드(BM25) + 벡터(FAISS) 검색 결과를 순위 융합(RRF)하는 Retriever
+# 모델명 / 용량("617L") / 크기 / 에너지 등급처럼 글자 그대로 맞아야 하는 질문은 키워드 검색이,
+# 표현이 다른 질문은 벡터 검색이 찾도록 두 결과를 합침
+# 성능 비교: python bench_retrieval.py
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # hybrid / vector
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 4))  # LLM에 전달할 문서 수
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", 20))  # 융합 전 각 검색에서 가져올 후보 수
+RRF_K = int(os.getenv("RRF_K", 60))  # 순위 융합 상수 (클수록 상위 순위의 가중치 차이가 줄어듦)
+
+NGRAM_RANGE = (2, 3)  # 한글 글자 n-gram 길이
+TOKEN_RE = re.compile(r"\d+(?:\.\d+)?[가-힣]+|[0-9a-z]+(?:[-./][0-9a-z]+)*|[가-힣]+")
+
+
+def tokenize(text, ngram_range=NGRAM_RANGE):
+    """📌 한국어 친화 토큰화: 영문/숫자 토큰(모델명, 용량)은 통째로, 한글은 글자 n-gram (조사/어미가 붙어도 매칭)"""
+    n_min, n_max = ngram_range
+    terms = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word[0].isdigit() and not word[-1].isascii():
+            # "3등급", "7일" → "3등", "3등급" (+ 한글 부분 n-gram) — 뒤에 조사가 붙은 "3등급인가요"와도 매칭
+            number = re.match(r"[\d.]+", word).group()
+            suffix = word[len(number):]
+            terms.extend(number + suffix[:n] for n in range(1, min(len(suffix), n_min) + 1))
+            word = suffix
+        elif word.isascii():
+            terms.append(word)
+            parts = re.split(r"[-./]", word)
+            if len(parts) > 1:
+                terms.extend(part for part in parts if len(part) > 1)  # "R-R-LGE-B180SM2006" → 부분 번호로도 검색
+            continue
+
+        if len(word) < n_min:
+            terms.append(word)
+        for n in range(n_min, n_max + 1):
+            terms.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return terms
+
+
+class BM25Index:
+    """📌 메모리 역색인 BM25 (문서 번호 = FAISS 인덱스 위치)"""
+
+    def __init__(self, texts, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # 단어 → [(문서 번호, 빈도)]
+        self.lengths = []
+
+        for position, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self.postings[term].append((position, count))
+
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def search(self, query, k):
+        """📌 (문서 번호, 점수) 상위 k개 (질문 단어가 하나도 없는 문서는 제외)"""
+        total = len(self.lengths)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.avg_length or 1))
+                scores[position] += idf * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """📌 여러 순위 목록을 RRF 점수(Σ 1 / (k + 순위))로 합쳐 정렬"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            scores[position] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda position: scores[position], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """📌 FAISS 벡터 검색 + BM25 키워드 검색 → RRF로 합친 상위 k개 문서 반환 (LangChain Retriever 인터페이스)"""
+
+    vectorstore: object
+    keyword_index: object
+    k: int = RETRIEVAL_K
+    fetch_k: int = RETRIEVAL_FETCH_K
+    rrf_k: int = RRF_K
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        """📌 벡터스토어에 저장된 청크로 키워드 인덱스 생성"""
+        texts = [cls._document(vectorstore, position).page_content for position in range(vectorstore.index.ntotal)]
+        return cls(vectorstore=vectorstore, keyword_index=BM25Index(texts), **kwargs)
+
+    @staticmethod
+    def _document(vectorstore, position):
+        return vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+
+    def vector_search(self, vector, k):
+        """📌 FAISS 검색 결과를 인덱스 위치 목록으로 반환"""
+        query = np.array([vector], dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            import faiss
+            faiss.normalize_L2(query)
+        _, indices = self.vectorstore.index.search(query, min(k, self.vectorstore.index.ntotal))
+        return [int(position) for position in indices[0] if position != -1]
+
+    def search_with_vector(self, query, vector=None):
+        """📌 질문 임베딩이 이미 있으면 재사용 (없으면 새로 계산)"""
+        if self.vectorstore.index.ntotal == 0:
+            return []
+        if vector is None:
+            vector = self.vectorstore.embeddings.embed_query(query)
+
+        vector_ranking = self.vector_search(vector, self.fetch_k)
+        keyword_ranking = [position for position, _ in self.keyword_index.search(query, self.fetch_k)]
+        fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking], self.rrf_k)
+        return [self._document(self.vectorstore, position) for position in fused[:self.k]]
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.search_with_vector(query)
+
+
+def build_retriever(vectorstore, mode=RETRIEVAL_MODE, k=RETRIEVAL_K):
+    """📌 설정에 맞는 Retriever 생성 (hybrid: BM25 + 벡터 RRF, vector: 기존 FAISS 검색)"""
+    if mode == "hybrid":
+        return HybridRetriever.from_vectorstore(vectorstore, k=k)
+    return vectorstore.as_retriever(search_kwargs={"k": k})
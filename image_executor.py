@@ -0,0 +1,114 @@
+import os
+import atexit
+import asyncio
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import cv2
+import numpy as np
+
+# ✅ 이미지 처리 실행 방식: "thread" (스레드 풀) 또는 "process" (프로세스 풀 + 공유 메모리)
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "thread")
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 4))  # 최대 작업자 수
+
+SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def load_image(image_path):
+    """📌 이미지를 Grayscale로 디코딩 (OCR 전처리용)"""
+    return cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+
+
+def preprocess_and_encode(crop):
+    """📌 OCR 전처리 (샤프닝) 후 메모리에서 JPEG 인코딩 (Grayscale은 디코딩 시 적용)"""
+    sharpened = cv2.filter2D(crop, -1, SHARPEN_KERNEL)
+    ok, buffer = cv2.imencode(".jpg", sharpened)
+    return buffer.tobytes() if ok else None
+
+
+def _encode_shared(shm_name, shape, dtype, y0, y1):
+    """프로세스 작업자: 공유 메모리의 이미지에서 [y0:y1] 구간만 전처리 + 인코딩 (복사 없이 view 사용)"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        encoded = preprocess_and_encode(image[y0:y1])
+        del image  # 공유 메모리 참조 해제 후 close
+        return encoded
+    finally:
+        shm.close()
+
+
+class ImageExecutor:
+    """📌 CPU 작업(디코딩/샤프닝/인코딩)을 제한된 스레드 풀 또는 프로세스 풀에서 실행"""
+
+    def __init__(self, backend=IMAGE_EXECUTOR, max_workers=IMAGE_WORKERS):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"지원하지 않는 IMAGE_EXECUTOR: {backend}")
+
+        self.backend = backend
+        self.max_workers = max(1, max_workers)
+
+        # 디코딩은 cv2가 GIL을 해제하므로 항상 스레드 풀에서 실행 (이미지 간 병렬)
+        self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+        self._processes = None
+        if backend == "process":
+            # fork 대신 spawn 사용 (스레드가 있는 부모 프로세스에서 안전)
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    async def load(self, image_path):
+        """📌 이미지 디코딩 (실패 시 None)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._threads, load_image, image_path)
+
+    async def encode_crops(self, image, bounds):
+        """📌 (y0, y1) 구간별로 전처리 + JPEG 인코딩하여 바이트 목록 반환"""
+        loop = asyncio.get_running_loop()
+
+        if self._processes is None:
+            return await asyncio.gather(
+                *[loop.run_in_executor(self._threads, preprocess_and_encode, image[y0:y1]) for y0, y1 in bounds]
+            )
+
+        # ✅ 프로세스 풀: 이미지를 공유 메모리에 한 번만 복사하고 작업자는 구간만 참조
+        shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        try:
+            shared = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+            shared[:] = image
+            del shared
+            return await asyncio.gather(
+                *[
+                    loop.run_in_executor(
+                        self._processes, _encode_shared, shm.name, image.shape, image.dtype.str, y0, y1
+                    )
+                    for y0, y1 in bounds
+                ]
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+
+
+def get_executor(backend=IMAGE_EXECUTOR, max_workers=IMAGE_WORKERS):
+    """📌 프로세스 전체에서 재사용하는 실행기 반환 (프로세스 풀 시작 비용을 한 번만 지불)"""
+    key = (backend, max_workers)
+    with _executors_lock:
+        if key not in _executors:
+            _executors[key] = ImageExecutor(backend, max_workers)
+        return _executors[key]
+
+
+@atexit.register
+def _shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
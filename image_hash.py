@@ -0,0 +1,66 @@
+import os
+import threading
+import cv2
+import numpy as np
+
+# ✅ 지각 해시(dHash) 설정 → 중복 후보를 빠르게 찾는 용도 (숫자만 다른 스펙 표도 거리가 0~4로 나오므로 해시만으로 판단하지 않음)
+HASH_SIZE = 16  # 16x16 = 256bit (긴 상세 이미지도 구분되도록 8x8보다 크게)
+HASH_DISTANCE_THRESHOLD = int(os.getenv("HASH_DISTANCE_THRESHOLD", 10))  # 이 값 이하의 해밍 거리면 픽셀 비교 대상
+ASPECT_TOLERANCE = 0.02  # 가로세로 비율 차이 허용 범위 (2%)
+
+# ✅ 픽셀 비교 설정: 축소 이미지의 최대 픽셀 차이가 이 값 이하일 때만 중복으로 판단
+# (JPEG 재압축 차이는 최대 약 27, 글자 한 개가 다른 경우는 62 이상 → test/case1~3 이미지 기준)
+THUMBNAIL_WIDTH = 640
+PIXEL_DIFF_TOLERANCE = int(os.getenv("PIXEL_DIFF_TOLERANCE", 40))
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """📌 Grayscale 이미지의 dHash 계산 → (높이, 너비, 해시 정수)"""
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return image.shape[0], image.shape[1], value
+
+
+def thumbnail(image, width=THUMBNAIL_WIDTH):
+    """📌 픽셀 비교용 축소 이미지 (너비 width 이하, 작은 이미지는 원본 복사)"""
+    if image.shape[1] <= width:
+        return image.copy()
+    height = max(1, round(image.shape[0] * width / image.shape[1]))
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def is_near_duplicate(a, b, threshold=HASH_DISTANCE_THRESHOLD):
+    """📌 두 지문이 비슷한 비율이고 해밍 거리가 threshold 이하인지 확인 (중복 후보)"""
+    (h1, w1, v1), (h2, w2, v2) = a, b
+    if abs(h1 / w1 - h2 / w2) > ASPECT_TOLERANCE * max(h1 / w1, h2 / w2):
+        return False
+    return (v1 ^ v2).bit_count() <= threshold
+
+
+def is_same_image(a, b, tolerance=PIXEL_DIFF_TOLERANCE):
+    """📌 원본 크기가 같고 축소 이미지의 모든 픽셀 차이가 tolerance 이하인지 확인"""
+    return a.shape == b.shape and int(cv2.absdiff(a, b).max()) <= tolerance
+
+
+class DuplicateFilter:
+    """📌 작업 단위 중복 필터 (해시로 후보를 찾고 픽셀 비교로 확인된 경우에만 건너뜀)"""
+
+    def __init__(self):
+        self.skipped = 0
+        self._seen = {}  # 종류(image/crop) → [(지문, 원본 크기, 축소 이미지)]
+        self._lock = threading.Lock()  # 여러 스레드에서 동시에 확인해도 같은 이미지를 둘 다 처리하지 않도록
+
+    def seen(self, image, kind="crop"):
+        """📌 이번 작업에서 이미 처리한 같은 종류(image/crop)와 같은 이미지면 True, 처음 보는 것이면 기록 후 False"""
+        fingerprint = dhash(image)
+        small = thumbnail(image)
+        with self._lock:
+            seen = self._seen.setdefault(kind, [])
+            for other_fingerprint, other_shape, other_small in seen:
+                if (other_shape == image.shape and is_near_duplicate(fingerprint, other_fingerprint)
+                        and is_same_image(small, other_small)):
+                    self.skipped += 1
+                    return True
+            seen.append((fingerprint, image.shape, small))
+            return False
@@ -0,0 +1,168 @@
+import os
+import re
+import shutil
+from langchain_community.vectorstores import FAISS
+
+# ✅ 상품별 벡터 DB 저장 위치 (상품 ID별 하위 폴더)
+INDEX_ROOT = "faiss_indexes"
+
+# ✅ 디스크 사용량 한도 (초과 시 가장 오래 사용하지 않은 인덱스부터 삭제)
+MAX_INDEX_DISK_BYTES = int(os.getenv("MAX_INDEX_DISK_BYTES", 500 * 1024 * 1024))  # 기본 500MB
+
+# ✅ 인덱스와 함께 보관할 상품 정보 파일 (캐시 적중 시 UI 복원용)
+META_FILES = ("product_name.txt", "main_image.jpg")
+main_image_folder = "main_image"
+
+# ✅ 저장된 인덱스를 메모리에 복사하지 않고 파일을 매핑해서 읽기 (여러 인덱스를 열어 둬도 메모리 사용량 최소화)
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1") == "1"
+
+
+def extract_product_id(link):
+    """📌 쿠팡 링크에서 상품 ID(+ itemId)를 추출하여 인덱스 키로 반환"""
+    if not link:
+        return None
+
+    match = re.search(r"/products/(\d+)", link)
+    if not match:
+        return None
+
+    item_match = re.search(r"[?&]itemId=(\d+)", link)
+    if item_match:
+        return f"{match.group(1)}_{item_match.group(1)}"  # 같은 상품이라도 옵션(item)별로 구분
+    return match.group(1)
+
+
+def get_index_path(product_id):
+    """📌 상품 ID에 해당하는 인덱스 폴더 경로 반환"""
+    return os.path.join(INDEX_ROOT, product_id)
+
+
+def has_index(product_id):
+    """📌 저장된 인덱스가 있는지 확인"""
+    return os.path.exists(os.path.join(get_index_path(product_id), "index.faiss"))
+
+
+def _touch(path):
+    """최근 사용 시간 갱신 (LRU 기준)"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _dir_size(path):
+    """폴더 전체 크기(byte) 계산"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def index_version(index_path):
+    """📌 인덱스 파일의 수정 시각 (다시 저장되면 바뀜, 없으면 None) → 캐시 키로 사용"""
+    try:
+        return os.stat(os.path.join(index_path, "index.faiss")).st_mtime_ns
+    except OSError:
+        return None
+
+
+def read_index(index_path, embeddings, mmap=INDEX_MMAP):
+    """📌 FAISS.load_local로 인덱스 읽기 (mmap=True면 읽기 전용 매핑, 검색만 가능)"""
+    io_flags = 0
+    if mmap:
+        import faiss
+        io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True, io_flags=io_flags)
+
+
+def save_index(vectorstore, index_path):
+    """📌 임시 폴더에 저장한 뒤 교체 (기존 파일을 덮어쓰지 않으므로 매핑해서 읽고 있던 인덱스는 그대로 유효)"""
+    tmp_path = f"{index_path}.tmp"
+    old_path = f"{index_path}.old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    vectorstore.save_local(tmp_path)
+
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(index_path):
+        os.replace(index_path, old_path)
+    os.replace(tmp_path, index_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def load_index(product_id, embeddings, reader=read_index):
+    """📌 저장된 상품 인덱스 불러오기 (없거나 손상되면 None)
+    reader: (인덱스 경로, embeddings) → 벡터스토어 (기본은 매번 디스크에서 읽기, UI에서는 캐시된 reader 사용)"""
+    if not product_id or not has_index(product_id):
+        return None
+
+    index_path = get_index_path(product_id)
+    try:
+        vectorstore = reader(index_path, embeddings)
+    except Exception as e:
+        print(f"❌ 저장된 인덱스 로드 실패 ({product_id}): {e}")
+        shutil.rmtree(index_path, ignore_errors=True)  # 손상된 인덱스는 삭제 후 재생성
+        return None
+
+    _touch(index_path)
+    print(f"✅ 저장된 벡터 DB 재사용: {index_path}")
+    return vectorstore
+
+
+def register_index(product_id, meta_folder=main_image_folder):
+    """📌 새로 저장된 인덱스에 상품 정보를 함께 보관하고 디스크 한도를 맞춤"""
+    index_path = get_index_path(product_id)
+    if not os.path.exists(index_path):
+        return
+
+    for name in META_FILES:
+        src_path = os.path.join(meta_folder, name)
+        if os.path.exists(src_path):
+            shutil.copy2(src_path, os.path.join(index_path, name))
+
+    _touch(index_path)
+    evict_lru(keep=product_id)
+
+
+def restore_meta(product_id, meta_folder=main_image_folder):
+    """📌 캐시 적중 시 인덱스와 함께 보관된 상품명/대표 이미지를 복원"""
+    index_path = get_index_path(product_id)
+    os.makedirs(meta_folder, exist_ok=True)
+
+    restored = False
+    for name in META_FILES:
+        src_path = os.path.join(index_path, name)
+        if os.path.exists(src_path):
+            shutil.copy2(src_path, os.path.join(meta_folder, name))
+            restored = True
+    return restored
+
+
+def evict_lru(max_bytes=MAX_INDEX_DISK_BYTES, keep=None):
+    """📌 디스크 한도를 넘으면 가장 오래 사용하지 않은 인덱스부터 삭제"""
+    if not os.path.exists(INDEX_ROOT):
+        return []
+
+    entries = []
+    for name in os.listdir(INDEX_ROOT):
+        path = os.path.join(INDEX_ROOT, name)
+        if os.path.isdir(path):
+            entries.append((os.path.getmtime(path), _dir_size(path), name, path))
+
+    total = sum(size for _, size, _, _ in entries)
+    evicted = []
+
+    for _, size, name, path in sorted(entries):  # 오래된 순
+        if total <= max_bytes:
+            break
+        if name == keep:  # 방금 저장한 인덱스는 유지
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        evicted.append(name)
+        print(f"🗑 오래된 벡터 DB 삭제: {name} ({size / 1024 / 1024:.1f}MB)")
+
+    return evicted
@@ -0,0 +1,102 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_community.vectorstores import FAISS
+from token_utils import count_tokens
+import embedding_cache
+
+# ✅ 임베딩 배치 설정 (환경 변수로 조정 가능)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))  # 요청 1회당 최대 문서 수
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", 50000))  # 요청 1회당 최대 토큰 수
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", 4))  # 동시 요청 수
+
+
+def make_batches(token_counts, batch_size=EMBED_BATCH_SIZE, max_tokens=EMBED_BATCH_MAX_TOKENS):
+    """📌 문서 수와 토큰 수 한도를 넘지 않도록 인덱스 묶음 생성"""
+    batches = []
+    current, current_tokens = [], 0
+
+    for i, tokens in enumerate(token_counts):
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _model_name(embeddings):
+    """캐시 키에 사용할 임베딩 모델명"""
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+def _endpoint(embeddings):
+    """캐시 키에 사용할 임베딩 API 주소 (로컬 가짜 서버로 만든 벡터가 실제 실행에 섞이지 않도록)"""
+    return embedding_cache.openai_base_url(getattr(embeddings, "openai_api_base", None))
+
+
+def embed_texts(texts, embeddings, batch_size=EMBED_BATCH_SIZE, max_tokens=EMBED_BATCH_MAX_TOKENS,
+                max_concurrency=EMBED_MAX_CONCURRENCY, cache=None):
+    """📌 캐시에 없는 텍스트만 배치로 나눠 동시에 임베딩하고 (벡터 목록, 처리 통계) 반환"""
+    model, endpoint = _model_name(embeddings), _endpoint(embeddings)
+    vectors = cache.get_many(texts, model, endpoint) if cache is not None else [None] * len(texts)
+    cache_hits = sum(vector is not None for vector in vectors)
+
+    # ✅ 캐시에 없는 텍스트만 (중복 제거 후) API 호출
+    pending = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    token_counts = [count_tokens(text) for text in pending]
+    batches = make_batches(token_counts, batch_size, max_tokens)
+    new_vectors = {}
+
+    start = time.perf_counter()
+
+    def embed_batch(indices):
+        return indices, embeddings.embed_documents([pending[i] for i in indices])
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        for indices, batch_vectors in executor.map(embed_batch, batches):
+            for i, vector in zip(indices, batch_vectors):
+                new_vectors[pending[i]] = vector
+
+    elapsed = time.perf_counter() - start
+
+    if cache is not None and new_vectors:
+        cache.put_many(list(new_vectors.keys()), list(new_vectors.values()), model, endpoint)
+
+    vectors = [vector if vector is not None else new_vectors[text] for text, vector in zip(texts, vectors)]
+
+    total_tokens = sum(token_counts)
+    stats = {
+        "docs": len(texts),
+        "embedded": len(pending),
+        "cache_hits": cache_hits,
+        "hit_rate": cache_hits / len(texts) if texts else 0.0,
+        "tokens": total_tokens,
+        "batches": len(batches),
+        "seconds": elapsed,
+        "docs_per_sec": len(pending) / elapsed if elapsed > 0 else 0.0,
+        "tokens_per_sec": total_tokens / elapsed if elapsed > 0 else 0.0,
+    }
+    return vectors, stats
+
+
+def build_vector_store(documents, embeddings, cache=None, **batch_kwargs):
+    """📌 모든 문서를 한 번에 임베딩한 뒤 FAISS 인덱스를 한 번만 생성"""
+    documents = [doc for doc in documents if doc.page_content.strip()]  # 빈 문서 제외
+    if not documents:
+        return None
+
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+
+    vectors, stats = embed_texts(texts, embeddings, cache=cache, **batch_kwargs)
+    print(
+        f"✅ 임베딩 완료: {stats['docs']}개 문서 (캐시 적중 {stats['cache_hits']}개, {stats['hit_rate']:.0%}) / "
+        f"API {stats['embedded']}개 · {stats['batches']}개 배치 / {stats['seconds']:.2f}초 "
+        f"({stats['docs_per_sec']:.1f} docs/s, {stats['tokens_per_sec']:.0f} tokens/s)"
+    )
+
+    return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
@@ -0,0 +1,191 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import crawl_worker
+import streaming_ingest
+import index_store
+import answer_cache
+import catalog_index
+
+# ✅ 백그라운드 수집 작업 설정
+INGEST_MAX_JOBS = int(os.getenv("INGEST_MAX_JOBS", 4))  # 동시에 실행할 수집 작업 수 (나머지는 대기)
+INGEST_JOB_TTL = int(os.getenv("INGEST_JOB_TTL", 3600))  # 끝난 작업을 목록에 남겨 둘 시간 (초)
+
+STAGES = ("crawl", "ingest", "save")
+STAGE_LABELS = {"crawl": "이미지 크롤링", "ingest": "OCR · 정리 · 임베딩", "save": "인덱스 저장"}
+
+_executor = ThreadPoolExecutor(max_workers=max(1, INGEST_MAX_JOBS), thread_name_prefix="ingest")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class IngestionJob:
+    """📌 크롤링 → 스트리밍 수집 → 인덱스 저장을 백그라운드에서 실행하는 작업 (UI는 상태만 조회)"""
+
+    def __init__(self, link, product_id, workspace, embeddings, cache=None, crawl=True):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.link = link
+        self.product_id = product_id
+        self.workspace = workspace
+        self.embeddings = embeddings
+        self.cache = cache
+        self.crawl = crawl
+
+        self.status = "queued"  # queued → running → done / failed
+        self.crawl_result = None
+        self.ingestion = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+        self._stage_times = {}  # 단계 이름 → [시작, 종료] (perf_counter)
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def ready(self):
+        """첫 조각이 인덱싱되어 질문할 수 있는 상태인지"""
+        return self.vectorstore is not None or self.done
+
+    @property
+    def vectorstore(self):
+        """지금까지 인덱싱된 최신 스냅샷"""
+        return self.ingestion.vectorstore if self.ingestion is not None else None
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.vectorstore
+
+    def _mark(self, stage, index, at=None):
+        self._stage_times.setdefault(stage, [None, None])[index] = at or time.perf_counter()
+
+    def run(self):
+        self.status = "running"
+        try:
+            # 1️⃣ 크롤링 (Test 데이터는 이미 작업 폴더에 복사되어 있으므로 실패해도 계속 진행)
+            if self.crawl:
+                self._mark("crawl", 0)
+                self.crawl_result = crawl_worker.crawl(self.link, self.workspace)
+                self._mark("crawl", 1)
+
+            # 2️⃣ OCR · 정리 · 임베딩 (조각 단위 스트리밍) → 3️⃣ 인덱스 저장
+            product_id = self.product_id
+            self._mark("ingest", 0)
+            self.ingestion = streaming_ingest.StreamingIngestion(
+                self.embeddings,
+                cache=self.cache,
+                workspace=self.workspace,
+                index_path=index_store.get_index_path(product_id) if product_id else self.workspace.index_dir,
+                # ✅ 상품별 인덱스로 보관 (다음 요청 시 재사용)
+                on_complete=(lambda job: _on_index_saved(product_id, job)) if product_id else None,
+            ).start()
+            self.ingestion.wait()
+
+            self._mark("ingest", 1, self.ingestion.indexed_at)
+            self._mark("save", 0, self.ingestion.indexed_at)
+            self._mark("save", 1, self.ingestion.finished_at)
+
+            self.error = self.ingestion.error
+            if self.error is None and self.vectorstore is None:
+                self.error = RuntimeError("추출된 정보가 없습니다. 링크가 올바른지 확인해 주세요.")
+        except Exception as e:
+            self.error = e
+            print(f"❌ 수집 작업 {self.job_id} 실패: {e}")
+        finally:
+            self.status = "failed" if self.error else "done"
+            self.finished_at = time.time()
+            self._done.set()
+
+    def _stage_status(self, stage):
+        started, finished = self._stage_times.get(stage, (None, None))
+        if stage == "crawl" and not self.crawl:
+            return "skipped"
+        if finished is not None:
+            return "done"
+        if started is not None:
+            return "running"
+        return "failed" if self.done else "pending"
+
+    def progress(self):
+        """📌 UI 표시용 진행 상황 (단계별 상태, 소요 시간, 세부 정보)"""
+        now = time.perf_counter()
+        stages = []
+        for stage in STAGES:
+            started, finished = self._stage_times.get(stage, (None, None))
+            detail = ""
+            if stage == "crawl" and self.crawl_result is not None:
+                detail = f"이미지 {len(self.crawl_result.get('image_paths') or [])}개"
+            elif stage == "ingest" and self.ingestion is not None:
+                detail = f"조각 {self.ingestion.fragments}개 / 청크 {self.ingestion.chunks}개"
+                embedded = self.ingestion.embedding_stats
+                if embedded["docs"]:
+                    detail += f" (임베딩 캐시 적중 {embedded['cache_hits'] / embedded['docs']:.0%})"
+            stages.append({
+                "name": stage,
+                "label": STAGE_LABELS[stage],
+                "status": self._stage_status(stage),
+                "seconds": ((finished or now) - started) if started is not None else None,
+                "detail": detail,
+            })
+
+        finished_stages = sum(1 for stage in stages if stage["status"] in ("done", "skipped"))
+        return {"status": self.status, "ready": self.ready, "fraction": finished_stages / len(STAGES), "stages": stages}
+
+
+def _on_index_saved(product_id, ingestion):
+    """상품 인덱스 저장 완료 → 상품 정보 보관 + 이전 인덱스 기준으로 저장된 답변 삭제 (+ 카탈로그 인덱스 갱신)"""
+    index_store.register_index(product_id, meta_folder=ingestion.workspace.meta_dir)
+    answer_cache.get_cache().invalidate(product_id)
+    if catalog_index.CATALOG_INDEX and ingestion.vectorstore is not None:
+        catalog_index.get_catalog().add_vectorstore(product_id, ingestion.vectorstore)  # 카탈로그 인덱스의 이전 벡터 교체
+
+
+def _prune():
+    """오래전에 끝난 작업을 목록에서 제거"""
+    now = time.time()
+    for job_id, job in list(_jobs.items()):
+        if job.done and now - job.finished_at > INGEST_JOB_TTL:
+            del _jobs[job_id]
+
+
+def _find_active(product_id):
+    return next((job for job in _jobs.values() if job.product_id == product_id and not job.done), None)
+
+
+def find_active(product_id):
+    """📌 같은 상품의 진행 중인 작업 (없으면 None) → 크롤링 횟수를 차감하기 전에 확인"""
+    if not product_id:
+        return None
+    with _jobs_lock:
+        return _find_active(product_id)
+
+
+def submit(link, product_id, workspace, embeddings, cache=None, crawl=True):
+    """📌 수집 작업을 백그라운드 실행기에 제출하고 작업 핸들 반환 (같은 상품이 이미 진행 중이면 그 작업 반환)"""
+    with _jobs_lock:
+        _prune()
+        if product_id:
+            active = _find_active(product_id)
+            if active is not None:
+                print(f"♻ 진행 중인 수집 작업에 연결: {active.job_id} ({product_id})")
+                return active
+
+        job = IngestionJob(link, product_id, workspace, embeddings, cache, crawl)
+        _jobs[job.job_id] = job
+
+    _executor.submit(job.run)
+    print(f"🚀 수집 작업 제출: {job.job_id} ({product_id or link})")
+    return job
+
+
+def get_job(job_id):
+    """📌 작업 ID로 핸들 조회 (새로고침/재접속 후 다시 연결할 때 사용)"""
+    if not job_id:
+        return None
+    with _jobs_lock:
+        return _jobs.get(job_id)
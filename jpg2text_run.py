@@ -1,5 +1,4 @@
 import os
-import cv2
 import numpy as np
 import openai
 from datetime import datetime
@@ -8,127 +7,222 @@ from bs4 import BeautifulSoup
 import aiofiles
 import asyncio
 import aiohttp
+import contextlib
+import weakref
+import time
 import sys
+import request_throttle
+import image_executor
+import image_hash
+import text_cache
+import chunking
+from token_utils import count_tokens
+from workspace import Workspace
 
 sys.stdout.reconfigure(encoding='utf-8')
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
-# ✅ 폴더 경로 설정
-save_folder = "download_images"
-cropped_folder = "cropped_images"
-text_folder = "ocr_texts"
+# ✅ 폴더 경로는 작업 폴더(workspace.Workspace) 기준 (지정하지 않으면 현재 폴더의 download_images / ocr_texts 등)
+
+# ✅ 디버그 모드: 전처리된 조각 이미지를 cropped_images 폴더에 저장 (기본은 메모리에서만 처리)
+SAVE_DEBUG_IMAGES = os.getenv("SAVE_DEBUG_IMAGES", "0").lower() in ("1", "true", "yes")
+
+# ✅ 이미지 분할 설정 (공백 띠 기준)
+CROP_MAX_HEIGHT = int(os.getenv("CROP_MAX_HEIGHT", 5000))  # 조각 최대 높이 (px)
+CROP_MIN_HEIGHT = int(os.getenv("CROP_MIN_HEIGHT", 1500))  # 조각 최소 높이 (px, 너무 잘게 나뉘지 않도록)
+BLANK_ROW_STD = float(os.getenv("BLANK_ROW_STD", 4.0))  # 이 값보다 표준편차가 작은 행은 공백으로 판단
 
 # Upstage Console API 설정
 API_KEY = os.getenv("UPSTAGE_API_KEY")
-UPLOAD_URL = os.getenv("UPSTAGE_UPLOAD_URL")
+UPLOAD_URL = os.getenv("UPSTAGE_UPLOAD_URL")  # 로컬 테스트 시 fake_ocr_server.py 주소로 변경 가능
+
+# ✅ OCR 요청 제한 설정 (환경 변수로 조정 가능)
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", 4))  # 동시 요청 수
+OCR_REQUESTS_PER_SEC = float(os.getenv("OCR_REQUESTS_PER_SEC", 2))  # 초당 요청 수 (토큰 버킷)
+OCR_MAX_RETRIES = int(os.getenv("OCR_MAX_RETRIES", 3))  # 429/5xx/타임아웃 재시도 횟수
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", 60))  # 요청당 제한 시간 (초)
+OCR_OPTIONS = {"ocr": "force", "model": "document-parse"}  # 요청 옵션 (OCR 캐시 키에도 포함)
+
+# ✅ OCR 결과 캐시 (API 주소 + 조각 바이트 + 옵션 기준 → 가짜 서버 결과가 실제 실행에 섞이지 않도록)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "ocr_cache.sqlite3")
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # 기본 200MB
+
+# ✅ OpenAI 문서 정리 설정
+CLEANUP_MODEL = os.getenv("CLEANUP_MODEL", "gpt-3.5-turbo")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # 동시 요청 수
+LLM_MIN_TOKENS = int(os.getenv("LLM_MIN_TOKENS", 150))  # 이보다 작은 조각은 합쳐서 한 번에 요청
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", 3000))  # 이보다 큰 조각은 나눠서 요청
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024))  # 기본 100MB
+
+CLEANUP_PROMPT = """
+                 이 문서는 RAG 기반 검색 데이터로 사용할 것입니다.
+                 따라서 검색 최적화를 위해 다음과 같이 정리해 주세요.
+
+                 1. **문장을 최대한 변형시키지 말고 다듬어서 가독성을 높이세요.**  
+                 2. **표(Table) 데이터는 원본 그대로 유지하세요.** (Markdown 표 `|` 형식 유지)  
+                 3. **불필요한 중복 문장 및 공백을 제거하세요.**  
+                 4. **문서의 계층 구조(제목, 소제목)를 유지하여 쉽게 검색할 수 있도록 하세요.**   
+                 5. **필요한 경우, 목록(Bullet Point)을 활용하여 가독성을 높이세요.**  
+                 6. **의미를 바꾸지 않도록 주의하고, 정보가 빠지지 않도록 유지하세요.**  
+                 """
 
 # 환경 변수 가져오기
-client = openai.OpenAI(api_key = os.getenv("OPENAI_API_KEY"))
-if client is None:
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+if OPENAI_API_KEY is None:
     print("🚨 OpenAI API 키가 설정되지 않았습니다! .env 파일을 확인하세요.")
 else:
     print("✅ OpenAI API 키가 정상적으로 로드되었습니다.")
 
+# ✅ 요청 제한은 프로세스 전체에서 공유 (수집 작업마다 별도 스레드/이벤트 루프에서 실행되어도 합계가 설정값을 넘지 않도록)
+_ocr_throttle = request_throttle.RequestThrottle(OCR_REQUESTS_PER_SEC, OCR_MAX_CONCURRENCY)
+_llm_semaphore = request_throttle.SharedSemaphore(LLM_MAX_CONCURRENCY)
 
-async def split_vertical_with_overlap_async(image_path, output_folder, crop_height=5000, overlap=500):
-    """
-    📌 긴 이미지를 일정한 높이로 나누되, 일정 부분을 겹쳐서 비동기적으로 저장
-    """
-    image = await asyncio.to_thread(cv2.imread, image_path)
-    if image is None:
-        print(f"❌ 이미지 로드 실패: {image_path}")
-        return []
+# 이벤트 루프별 비동기 클라이언트 (HTTP 연결은 루프에 묶이므로 루프 단위로 생성)
+_llm_clients = weakref.WeakKeyDictionary()
 
-    height, width, _ = image.shape
-    os.makedirs(output_folder, exist_ok=True)
 
-    count = 0
-    y = 0  
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
-    cropped_image_paths = []
-    tasks = []  
+def _row_variation(image, block_rows=1024):
+    """행별 표준편차 (메모리 절약을 위해 블록 단위 float32 계산)"""
+    rows = image.reshape(image.shape[0], -1)
+    return np.concatenate([
+        rows[y:y + block_rows].std(axis=1, dtype=np.float32)
+        for y in range(0, rows.shape[0], block_rows)
+    ])
 
-    while y < height:
-        cropped = image[y:height, 0:width] if y + crop_height > height else image[y:y+crop_height, 0:width]
-        save_path = os.path.join(output_folder, f"{base_name}_crop_{count}.jpg")
 
-        task = asyncio.to_thread(cv2.imwrite, save_path, cropped)
-        tasks.append(task)
-        cropped_image_paths.append(save_path)  
-        count += 1
-        y += crop_height - overlap  
+def _best_cut(blank, row_std, min_band=10):
+    """검색 구간에서 가장 아래쪽 공백 띠(min_band 행 이상)의 중앙을 자르는 위치로 선택
+    (충분히 두꺼운 띠가 없으면 가장 긴 띠, 공백이 전혀 없으면 변화가 가장 적은 행)"""
+    if not blank.any():
+        return int(np.argmin(row_std))
 
-    await asyncio.gather(*tasks)  # ✅ 모든 이미지 저장 후 OCR 시작
-    await asyncio.to_thread(os.remove, image_path)  
+    edges = np.diff(np.concatenate(([0], blank.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    lengths = ends - starts
 
-    return cropped_image_paths  # ✅ OCR을 위해 리스트 반환
+    wide = np.flatnonzero(lengths >= min_band)
+    best = int(wide[-1]) if len(wide) else int(np.argmax(lengths))  # 아래쪽일수록 조각 수가 줄어듦
+    return int((starts[best] + ends[best]) // 2)
 
 
-async def preprocess_image_async(image_path):
-    """📌 비동기 OCR 전처리 (Grayscale 변환 + 샤프닝)"""
-    img = await asyncio.to_thread(cv2.imread, image_path, cv2.IMREAD_GRAYSCALE)
-    if img is None:
-        print(f"❌ 이미지 전처리 실패: {image_path}")
-        return None
+def find_crop_bounds(image, max_height=CROP_MAX_HEIGHT, min_height=CROP_MIN_HEIGHT, blank_std=BLANK_ROW_STD):
+    """
+    📌 텍스트 줄이 잘리지 않도록 행별 변화가 거의 없는 가로 공백 띠에서 이미지를 나눔 (겹침 없음)
+    - 각 조각은 min_height ~ max_height 사이에서 가장 긴 공백 띠의 중앙을 기준으로 자름
+    - 전체가 공백인 조각은 OCR 대상에서 제외
+    """
+    height = image.shape[0]
+    row_std = _row_variation(image)
+    blank = row_std < blank_std
 
-    # 샤프닝 필터 적용
-    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-    img = await asyncio.to_thread(cv2.filter2D, img, -1, kernel)
+    bounds = []
+    y0 = 0
+    while y0 < height:
+        if height - y0 <= max_height:
+            y1 = height
+        else:
+            lo, hi = y0 + min_height, y0 + max_height
+            y1 = lo + _best_cut(blank[lo:hi], row_std[lo:hi])
 
-    # 새로운 파일 경로 설정
-    preprocessed_path = image_path.replace(".jpg", "_processed.jpg").replace(".png", "_processed.png")
+        if not blank[y0:y1].all():
+            bounds.append((y0, y1))
+        y0 = y1
 
-    # 비동기적으로 이미지 저장
-    await asyncio.to_thread(cv2.imwrite, preprocessed_path, img)
-    await asyncio.to_thread(os.remove, image_path)  # 원본 삭제
+    return bounds
 
-    return preprocessed_path  # 전처리된 이미지 경로 반환
 
+async def save_debug_crop_async(file_name, image_data, cropped_folder):
+    """디버그 모드에서만 전처리된 조각을 파일로 저장"""
+    os.makedirs(cropped_folder, exist_ok=True)
+    async with aiofiles.open(os.path.join(cropped_folder, file_name), "wb") as file:
+        await file.write(image_data)
 
-async def process_ocr_to_html_async(image_path, session):   # upstage ocr
-    """📌 비동기 OCR 수행 및 HTML 저장"""
-    async with aiofiles.open(image_path, "rb") as image_file:
-        image_data = await image_file.read()
-    
-    # 🔹 Multipart FormData 생성
-    form_data = aiohttp.FormData()
-    form_data.add_field("ocr", "force")  # OCR 강제 수행 옵션
-    form_data.add_field("model", "document-parse")  # 모델 선택
-    form_data.add_field("document", 
-                        image_data, 
-                        filename=os.path.basename(image_path), 
-                        content_type="image/jpeg"
-                        )
 
+async def request_ocr_async(image_data, filename, session, throttle=None):   # upstage ocr
+    """📌 Upstage OCR 요청 후 HTML 문자열 반환 (동시성/초당 요청 제한, 429·5xx·타임아웃 재시도)"""
     headers = {"Authorization": f"Bearer {API_KEY}"}  # Content-Type은 자동 설정됨
+    timeout = aiohttp.ClientTimeout(total=OCR_TIMEOUT)
+
+    for attempt in range(OCR_MAX_RETRIES + 1):
+        # 🔹 Multipart FormData 생성 (재시도 시 재사용 불가하므로 매번 생성)
+        form_data = aiohttp.FormData()
+        form_data.add_field("ocr", OCR_OPTIONS["ocr"])  # OCR 강제 수행 옵션
+        form_data.add_field("model", OCR_OPTIONS["model"])  # 모델 선택
+        form_data.add_field("document", 
+                            image_data, 
+                            filename=filename, 
+                            content_type="image/jpeg"
+                            )
+
+        retry_after = None
+        try:
+            async with throttle or contextlib.nullcontext():
+                async with session.post(UPLOAD_URL, headers=headers, data=form_data, timeout=timeout) as response:
+                    if response.status == 200:
+                        ocr_data = await response.json()
+                        break
 
-    try:
-        async with session.post(UPLOAD_URL, headers=headers, data=form_data) as response:
-            if response.status != 200:
-                print(f"❌ OCR 오류: {response.status}, {await response.text()}")
-                await asyncio.to_thread(os.remove, image_path)  # ✅ OCR 실패해도 이미지 삭제
-                return None
+                    message = await response.text()
+                    if response.status not in request_throttle.RETRY_STATUSES:
+                        print(f"❌ OCR 오류: {response.status}, {message}")
+                        return None
 
-            ocr_data = await response.json()
+                    retry_after = response.headers.get("Retry-After")
+                    print(f"⚠ OCR 재시도 대상 응답: {response.status} ({filename}, {attempt + 1}회차)")
 
-    except Exception as e:
-        print(f"❌ 비동기 OCR 요청 실패: {e}")
-        await asyncio.to_thread(os.remove, image_path)  # ✅ 예외 발생 시에도 이미지 삭제
-        return None
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            print(f"⚠ OCR 요청 실패: {type(e).__name__} {e} ({filename}, {attempt + 1}회차)")
 
-    # 🔹 OCR 결과 확인 및 HTML 파일 저장
+        except Exception as e:
+            print(f"❌ 비동기 OCR 요청 실패: {e}")
+            return None
+
+        if attempt == OCR_MAX_RETRIES:
+            print(f"❌ OCR 재시도 횟수 초과: {filename}")
+            return None
+
+        await asyncio.sleep(request_throttle.backoff_delay(attempt, retry_after))
+
+    # 🔹 OCR 결과 확인
     html_content = ocr_data.get("content", {}).get("html", "")
     if not html_content:
         print(f"⚠ OCR 결과가 없습니다! API 응답 확인 필요.")
-        await asyncio.to_thread(os.remove, image_path)  # ✅ OCR 결과가 없어도 이미지 삭제
+        return None
+
+    return html_content
+
+
+async def ocr_crop_async(crop, session, throttle=None):
+    """📌 조각 OCR (이전 작업에서 OCR한 같은 조각이 있으면 API 호출 없이 재사용)"""
+    crop_name, image_data = crop
+
+    # ✅ 같은 API 주소로 OCR한 완전히 같은 조각(바이트 + 옵션)은 캐시에서 바로 반환 → 네트워크 호출 없음
+    cache = text_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES)
+    cache_key = text_cache.make_key(UPLOAD_URL or "", image_data, OCR_OPTIONS)
+    html_content = cache.get(cache_key)
+    if html_content:
+        return html_content
+
+    html_content = await request_ocr_async(image_data, crop_name, session, throttle)
+    if html_content:
+        cache.put(cache_key, html_content)
+    return html_content
+
+
+async def process_ocr_to_html_async(crop, session, text_folder, throttle=None):
+    """📌 비동기 OCR 수행 및 HTML 저장"""
+    base_name = os.path.splitext(crop[0])[0]  # 확장자 제거
+
+    html_content = await ocr_crop_async(crop, session, throttle)
+    if not html_content:
         return None
 
     os.makedirs(text_folder, exist_ok=True)
 
     # ✅ 파일명 생성: 원본 이미지 이름 + 타임스탬프 (마이크로초 포함)
-    base_name = os.path.splitext(os.path.basename(image_path))[0]  # 확장자 제거
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")  # 마이크로초까지 포함
     file_name = f"{base_name}_{timestamp}.html"
     
@@ -137,60 +231,153 @@ async def process_ocr_to_html_async(image_path, session):   # upstage ocr
     async with aiofiles.open(output_path, "w", encoding="utf-8") as file:
         await file.write(html_content)
 
-    await asyncio.to_thread(os.remove, image_path)
-
     return output_path
 
 
-async def process_images_and_ocr_mixed():
-    """📌 이미지 분할 & 전처리는 비동기로 실행, OCR은 순차적으로 실행"""
+def print_ocr_cache_stats(before):
+    """📌 이번 실행의 OCR 캐시 적중/미적중 횟수 출력"""
+    after = text_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES).stats()
+    hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+    if hits + misses:
+        print(f"📊 OCR 캐시: 적중 {hits}회 / 미적중 {misses}회 ({hits / (hits + misses):.0%}), 캐시 크기 {after['bytes'] / 1024 / 1024:.1f}MB")
 
-    image_files = [
+
+def list_image_files(save_folder):
+    """📌 OCR 대상 이미지 목록 반환"""
+    if not os.path.exists(save_folder):
+        return []
+
+    return [
         os.path.join(save_folder, img)
         for img in os.listdir(save_folder)
         if img.endswith((".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".svg", ".tiff", ".JPG"))
     ]
 
-    async with aiohttp.ClientSession() as session:
-        for image_path in image_files:
-            print(f"🚀 이미지 처리 시작: {image_path}")
 
-            # 1️⃣ [이미지 분할] → 비동기 실행
-            cropped_images = await split_vertical_with_overlap_async(image_path, cropped_folder)
-            if not cropped_images:
-                print(f"⚠ 분할 실패: {image_path}")
-                continue
+async def prepare_crops_async(image_path, dedup=None, workspace=None):
+    """📌 이미지를 한 번만 디코딩한 뒤 분할 + 전처리 + JPEG 인코딩까지 메모리에서 처리하여 (조각 이름, 바이트) 목록 반환"""
+    print(f"🚀 이미지 처리 시작: {image_path}")
 
-            print(f"✅ 분할 완료: {image_path} → {len(cropped_images)}개 이미지 생성")
+    executor = image_executor.get_executor()
 
-            # 2️⃣ [이미지 전처리] → 비동기 실행
-            preprocessed_images = await asyncio.gather(
-                *[preprocess_image_async(cropped) for cropped in cropped_images]
-            )
+    # 1️⃣ [이미지 로드] → Grayscale로 한 번만 디코딩 후 원본 삭제
+    image = await executor.load(image_path)
+    await asyncio.to_thread(os.remove, image_path)
+    if image is None:
+        print(f"❌ 이미지 로드 실패: {image_path}")
+        return []
+
+    # ✅ 이번 작업에서 이미 처리한 이미지(같은 배너/배송 안내 등)와 픽셀까지 같으면 건너뛰기
+    if dedup is not None and await asyncio.to_thread(dedup.seen, image, "image"):
+        print(f"⏭ 중복 이미지 건너뜀: {image_path}")
+        return []
 
-            preprocessed_images = [img for img in preprocessed_images if img]  # None 제거
-            if not preprocessed_images:
-                print(f"⚠ 전처리 실패: {image_path}")
-                continue
+    # 2️⃣ [이미지 분할] → 가로 공백 띠 기준으로 구간만 계산 (겹침 없음, 빈 조각 제외)
+    bounds = await asyncio.to_thread(find_crop_bounds, image)
+    if not bounds:
+        print(f"⚠ 텍스트가 없는 이미지: {image_path}")
+        return []
+
+    # ✅ 조각 단위 중복 확인 → 이번 작업에서 이미 처리한 조각과 픽셀까지 같으면 제외
+    duplicates = await asyncio.to_thread(lambda: [dedup is not None and dedup.seen(image[y0:y1]) for y0, y1 in bounds])
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    crops = [
+        (f"{base_name}_crop_{i}.jpg", bound)
+        for i, (bound, duplicate) in enumerate(zip(bounds, duplicates))
+        if not duplicate
+    ]
+    if not crops:
+        print(f"⏭ 중복 조각만 있는 이미지: {image_path}")
+        return []
+
+    # 3️⃣ [이미지 전처리] → 샤프닝 + JPEG 인코딩 (스레드/프로세스 풀, 메모리 버퍼)
+    encoded = await executor.encode_crops(image, [bound for _, bound in crops])
+
+    prepared = [
+        (name, image_data)
+        for (name, _), image_data in zip(crops, encoded)
+        if image_data
+    ]
+    if not prepared:
+        print(f"⚠ 전처리 실패: {image_path}")
+        return []
+
+    if SAVE_DEBUG_IMAGES:
+        cropped_folder = (workspace or Workspace()).cropped_dir
+        await asyncio.gather(*[save_debug_crop_async(name, data, cropped_folder) for name, data in prepared])
+
+    print(f"✅ 전처리 완료: {image_path} → {len(prepared)}개 이미지 전처리됨")
+    return prepared
 
-            print(f"✅ 전처리 완료: {image_path} → {len(preprocessed_images)}개 이미지 전처리됨")
 
-            # 3️⃣ [OCR 실행] → **순차적으로 실행 (동기적 실행)**
-            ocr_results = []
-            for preprocessed in preprocessed_images:
-                ocr_output = await process_ocr_to_html_async(preprocessed, session)  # 동기 처리
-                if ocr_output:
-                    ocr_results.append(ocr_output)
+async def process_images_and_ocr_mixed(workspace=None):
+    """📌 이미지 분할 & 전처리 후, 모든 이미지의 조각을 제한된 동시성으로 OCR"""
+
+    workspace = workspace or Workspace()
+    image_files = list_image_files(workspace.images_dir)
+    throttle = _ocr_throttle
+    dedup = image_hash.DuplicateFilter()
+    cache_before = text_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES).stats()
+
+    async with aiohttp.ClientSession() as session:
 
-            if not ocr_results:
+        async def process_image(image_path):
+            # 3️⃣ [OCR 실행] → 전처리가 끝난 이미지부터 바로 동시 실행 (초당 요청 수 제한)
+            preprocessed_images = await prepare_crops_async(image_path, dedup, workspace)
+            ocr_results = await asyncio.gather(
+                *[process_ocr_to_html_async(crop, session, workspace.texts_dir, throttle) for crop in preprocessed_images]
+            )
+            ocr_results = [result for result in ocr_results if result]
+
+            if preprocessed_images and not ocr_results:
                 print(f"⚠ OCR 결과 없음: {image_path}")
-                continue
+            elif ocr_results:
+                print(f"✅ OCR 완료: {image_path} → {len(ocr_results)}개 HTML 파일 생성됨")
+            return len(ocr_results)
 
-            print(f"✅ OCR 완료: {image_path} → {len(ocr_results)}개 HTML 파일 생성됨")
+        counts = await asyncio.gather(*[process_image(image_path) for image_path in image_files])
 
-    print(f"🎉 모든 이미지 OCR 순차 처리 완료!")
+    print(f"🎉 모든 이미지 OCR 처리 완료! (총 {sum(counts)}개 HTML 파일, 중복 제외 {dedup.skipped}개)")
+    print_ocr_cache_stats(cache_before)
  
 
+async def stream_fragments_async(queue, workspace=None):
+    """📌 크롤링된 HTML과 이미지 OCR 결과를 완료되는 즉시 (출처, HTML) 형태로 큐에 전달"""
+    workspace = workspace or Workspace()
+    text_folder = workspace.texts_dir
+
+    # 1️⃣ 크롤링 단계에서 저장된 HTML (필수 표기정보, 배송/반품, 가격) → 바로 전달
+    if os.path.exists(text_folder):
+        for filename in sorted(os.listdir(text_folder)):
+            if filename.endswith(".html"):
+                file_path = os.path.join(text_folder, filename)
+                async with aiofiles.open(file_path, "r", encoding="utf-8") as file:
+                    html_content = await file.read()
+                await asyncio.to_thread(os.remove, file_path)
+                await queue.put((filename, html_content))
+
+    # 2️⃣ 상세 이미지 → 분할/전처리 후 OCR이 끝난 조각부터 전달 (모든 이미지의 조각을 동시에 OCR)
+    throttle = _ocr_throttle
+    dedup = image_hash.DuplicateFilter()
+    cache_before = text_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_BYTES).stats()
+
+    async with aiohttp.ClientSession() as session:
+
+        async def ocr_and_enqueue(crop):
+            html_content = await ocr_crop_async(crop, session, throttle)
+            if html_content:
+                await queue.put((crop[0], html_content))
+
+        async def process_image(image_path):
+            preprocessed_images = await prepare_crops_async(image_path, dedup, workspace)
+            await asyncio.gather(*[ocr_and_enqueue(crop) for crop in preprocessed_images])
+
+        await asyncio.gather(*[process_image(image_path) for image_path in list_image_files(workspace.images_dir)])
+
+    print(f"🎉 모든 이미지 OCR 처리 완료! (중복 제외 {dedup.skipped}개)")
+    print_ocr_cache_stats(cache_before)
+
+
 def clean_html_to_markdown_table(html_content):
     """HTML에서 표를 Markdown 형식으로 변환하고, 태그 속성을 제거하여 순수 텍스트만 추출하는 함수"""
     
@@ -230,34 +417,47 @@ def clean_html_to_markdown_table(html_content):
     return clean_text
 
 
+def _get_llm_client():
+    """현재 이벤트 루프에서 사용할 AsyncOpenAI 클라이언트 반환"""
+    loop = asyncio.get_running_loop()
+    if loop not in _llm_clients:
+        _llm_clients[loop] = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _llm_clients[loop]
+
+
 async def correct_text_with_openai(input_text):
-    """📌 OpenAI API (최신 버전)로 RAG 기반 검색 최적화 문서 정리"""
-    try:
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", 
-                 "content": 
-                 """
-                 이 문서는 RAG 기반 검색 데이터로 사용할 것입니다.
-                 따라서 검색 최적화를 위해 다음과 같이 정리해 주세요.
+    """📌 OpenAI API (비동기 클라이언트)로 RAG 기반 검색 최적화 문서 정리 (결과 캐시 + 동시 요청 제한)"""
+    client = _get_llm_client()
+    cache = text_cache.get_cache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES)
+    # API 주소도 키에 포함 → OPENAI_BASE_URL로 가짜 서버를 쓴 결과가 실제 실행에 섞이지 않도록
+    cache_key = text_cache.make_key(str(client.base_url), CLEANUP_MODEL, CLEANUP_PROMPT, input_text)
+    corrected_text = cache.get(cache_key)
+    if corrected_text:
+        return corrected_text
 
-                 1. **문장을 최대한 변형시키지 말고 다듬어서 가독성을 높이세요.**  
-                 2. **표(Table) 데이터는 원본 그대로 유지하세요.** (Markdown 표 `|` 형식 유지)  
-                 3. **불필요한 중복 문장 및 공백을 제거하세요.**  
-                 4. **문서의 계층 구조(제목, 소제목)를 유지하여 쉽게 검색할 수 있도록 하세요.**   
-                 5. **필요한 경우, 목록(Bullet Point)을 활용하여 가독성을 높이세요.**  
-                 6. **의미를 바꾸지 않도록 주의하고, 정보가 빠지지 않도록 유지하세요.**  
-                 """
-                },
-                {"role": "user", "content": input_text}
-            ]
-        )
+    try:
+        async with _llm_semaphore:
+            start = time.perf_counter()
+            response = await client.chat.completions.create(
+                model=CLEANUP_MODEL,
+                messages=[
+                    {"role": "system", "content": CLEANUP_PROMPT},
+                    {"role": "user", "content": input_text}
+                ]
+            )
+            latency = time.perf_counter() - start
 
         # ✅ 최신 OpenAI SDK에서는 응답 데이터 접근 방식 변경됨
         corrected_text = response.choices[0].message.content
 
+        usage = response.usage
+        print(
+            f"⏱ OpenAI 문서 정리: {latency:.2f}초 "
+            f"(입력 {usage.prompt_tokens if usage else '?'} / 출력 {usage.completion_tokens if usage else '?'} 토큰)"
+        )
+
+        if corrected_text:
+            cache.put(cache_key, corrected_text)
         return corrected_text
 
     except Exception as e:
@@ -265,45 +465,99 @@ async def correct_text_with_openai(input_text):
         return None
 
 
+def plan_cleanup_requests(items, min_tokens=LLM_MIN_TOKENS, max_tokens=LLM_MAX_TOKENS):
+    """
+    📌 (출처, 텍스트) 목록을 토큰 수 기준으로 요청 단위 (출처 목록, 요청 텍스트 목록)로 묶기
+    - min_tokens보다 작은 조각은 max_tokens 이내로 합쳐서 한 번에 요청
+    - max_tokens보다 큰 조각은 제목/표 구조를 유지하며 나눠서 요청
+    """
+    plans = []
+    merged_sources, merged_texts, merged_tokens = [], [], 0
+
+    def flush_merged():
+        nonlocal merged_sources, merged_texts, merged_tokens
+        if merged_sources:
+            plans.append((merged_sources, ["\n\n".join(merged_texts)]))
+        merged_sources, merged_texts, merged_tokens = [], [], 0
+
+    for source, text in items:
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            plans.append(([source], [chunk for _, chunk in chunking.split_text(text, max_tokens)]))
+        elif tokens < min_tokens:
+            if merged_tokens + tokens > max_tokens:
+                flush_merged()
+            merged_sources.append(source)
+            merged_texts.append(text)
+            merged_tokens += tokens
+        else:
+            plans.append(([source], [text]))
+
+    flush_merged()
+    return plans
+
+
+async def correct_parts_async(parts):
+    """📌 나눠진 요청을 동시에 정리한 뒤 순서대로 합치기 (실패한 부분은 원문 유지)"""
+    corrected = await asyncio.gather(*[correct_text_with_openai(part) for part in parts])
+    return "\n\n".join(result or part for result, part in zip(corrected, parts))
+
+
+async def correct_cleaned_text_async(cleaned_text):
+    """📌 Markdown 정리가 끝난 텍스트를 OpenAI로 문서 정리 (LLM_MAX_TOKENS보다 크면 나눠서 요청, 실패 시 원문)"""
+    if count_tokens(cleaned_text) > LLM_MAX_TOKENS:
+        parts = [chunk for _, chunk in chunking.split_text(cleaned_text, LLM_MAX_TOKENS)]
+    else:
+        parts = [cleaned_text]
+    return await correct_parts_async(parts)
+
+
+async def clean_fragment_async(html_content):
+    """📌 OCR HTML 한 조각을 Markdown 정리 + OpenAI 문서 정리 (작은 조각 묶음은 StreamingIngestion에서 처리)"""
+    cleaned_text = clean_html_to_markdown_table(html_content)
+    if not cleaned_text.strip():
+        return None
+    return await correct_cleaned_text_async(cleaned_text)
+
+
 async def process_text_file_async(input_folder, output_folder):
-    """📌 OCR 결과 파일을 읽고 OpenAI로 수정한 후 비동기 처리하여 저장"""
+    """📌 OCR 결과 파일을 읽고 OpenAI로 수정한 후 비동기 처리하여 저장 (작은 파일은 합치고 큰 파일은 나눠서 요청)"""
 
-    async def process_single_file(file_path, output_path):
-        """개별 파일을 비동기적으로 처리하는 내부 함수"""
-        try:
-            # ✅ 비동기 파일 읽기
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                ocr_text = await f.read()
+    # ✅ 모든 파일을 먼저 읽고 토큰 수 기준으로 요청 계획 세우기
+    items = []
+    for filename in sorted(os.listdir(input_folder)):
+        if filename.endswith(".html"):  # HTML 파일만 처리
+            try:
+                async with aiofiles.open(os.path.join(input_folder, filename), "r", encoding="utf-8") as f:
+                    items.append((filename, await f.read()))
+            except FileNotFoundError:
+                print(f"❌ 파일을 찾을 수 없습니다: {filename}")
 
-            print(f"🚀 OpenAI에 텍스트 전달 중... (파일: {file_path})")
+    plans = plan_cleanup_requests(items)
+    print(f"🚀 OpenAI에 텍스트 전달 중... ({len(items)}개 파일 → {sum(len(parts) for _, parts in plans)}개 요청)")
 
-            # ✅ 비동기 OpenAI API 호출
-            corrected_text = await correct_text_with_openai(ocr_text)
+    async def process_plan(sources, parts):
+        """요청 단위를 정리한 뒤 첫 번째 출처 파일에 저장 (합쳐진 나머지 파일은 삭제)"""
+        corrected_text = await correct_parts_async(parts)
 
-            if corrected_text:
-                # ✅ 비동기 파일 쓰기
-                async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
-                    await f.write(corrected_text)
-                print(f"✅ 수정된 텍스트 저장 완료: {output_path}")
-            else:
-                print(f"⚠️ {file_path} 처리 실패: OpenAI 응답 없음")
+        output_path = os.path.join(output_folder, sources[0])
+        async with aiofiles.open(output_path, "w", encoding="utf-8") as f:
+            await f.write(corrected_text)
 
-        except FileNotFoundError:
-            print(f"❌ 파일을 찾을 수 없습니다: {file_path}")
+        if input_folder == output_folder:
+            for source in sources[1:]:
+                await asyncio.to_thread(os.remove, os.path.join(input_folder, source))
 
-    # ✅ 모든 파일을 비동기적으로 처리
-    tasks = []
-    for filename in os.listdir(input_folder):
-        if filename.endswith(".html"):  # HTML 파일만 처리
-            input_path = os.path.join(input_folder, filename)
-            output_path = os.path.join(output_folder, filename)
-            tasks.append(process_single_file(input_path, output_path))
+        print(f"✅ 수정된 텍스트 저장 완료: {output_path}" + (f" ({len(sources)}개 파일 병합)" if len(sources) > 1 else ""))
+
+    await asyncio.gather(*[process_plan(sources, parts) for sources, parts in plans])
 
-    await asyncio.gather(*tasks)  # 모든 파일을 동시에 처리
 
+def main(workspace=None):
+    workspace = workspace or Workspace()
+    text_folder = workspace.texts_dir
 
-def main():
-    asyncio.run(process_images_and_ocr_mixed())  # ✅ OCR만 동기적으로 실행하도록 변경
+    asyncio.run(process_images_and_ocr_mixed(workspace))  # ✅ OCR만 동기적으로 실행하도록 변경
 
     for filename in os.listdir(text_folder):
         if filename.endswith(".html"):  # HTML 파일만 처리
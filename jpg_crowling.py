@@ -1,122 +1,227 @@
 import sys
 from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
 import os
 import re
-import shutil
 import requests
 from PIL import Image
-from io import BytesIO
+import time
+import asyncio
+import aiohttp
+import aiofiles
+from dataclasses import asdict
+from product_page import parse_product_page
+from workspace import Workspace
 
 # ✅ Windows 환경에서 UTF-8로 출력되도록 설정
 sys.stdout.reconfigure(encoding="utf-8")
 
-save_folder = "download_images"
-main_image_folder = "main_image"
-html_folder = "ocr_texts"
 
+# ✅ 이미지 다운로드 설정
+DOWNLOAD_MAX_CONCURRENCY = int(os.getenv("DOWNLOAD_MAX_CONCURRENCY", 6))  # 동시 다운로드 수 (연결 풀 크기)
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", 30))  # 이미지당 제한 시간 (초)
+SAVE_PAGE_HTML = os.getenv("SAVE_PAGE_HTML", "0") == "1"  # 파싱 벤치마크용 원본 페이지 저장 (main_image/page.html)
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.0.0 Safari/537.36"
+
+
+BROWSER_ARGS = ["--no-sandbox", "--disable-gpu"]
+CRAWL_HEADLESS = os.getenv("CRAWL_HEADLESS", "0") == "1"  # 기본은 브라우저 보이게 실행 (디버깅 가능)
+
+# ✅ 가벼운 페이지 로드: 이미지/폰트/분석 스크립트 요청 차단 + 필요한 노드만 가져오기
+# 실제 Chromium에서 기존 방식과 같은 추출 결과가 확인될 때까지 기본은 끔 (확인: python bench_lean_crawl.py)
+CRAWL_LEAN = os.getenv("CRAWL_LEAN", "0") == "1"
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+BLOCKED_URL_PATTERN = re.compile(
+    r"google-analytics|googletagmanager|doubleclick|facebook\.(net|com)|criteo|analytics|/log(ging)?/|beacon"
+)
+DETAIL_IMAGE_SELECTOR = "div.subType-IMAGE img, div.subType-TEXT img"
+
+# 페이지에서 ProductPage에 필요한 노드만 골라 작은 HTML로 직렬화 (전체 outerHTML 대신)
+EXTRACT_NODES_JS = """
+() => {
+  const html = (selector) => Array.from(document.querySelectorAll(selector), (el) => el.outerHTML).join("\\n");
+  const images = Array.from(document.querySelectorAll("%s"), (img) => {
+    const copy = document.createElement("img");
+    for (const name of ["src", "data-src"]) {
+      if (img.hasAttribute(name)) copy.setAttribute(name, img.getAttribute(name));
+    }
+    return copy.outerHTML;
+  }).join("");
+  return [
+    html("h1.prod-buy-header__title"),
+    html("img.prod-image__detail"),
+    html("div.prod-price-onetime"),
+    '<div class="subType-IMAGE">' + images + "</div>",
+    html("table.prod-delivery-return-policy-table.essential-info-table"),
+    html("li.product-etc.tab-contents__content.etc-new-style"),
+  ].join("\\n");
+}
+""" % DETAIL_IMAGE_SELECTOR
+
+
+def _block_heavy_requests(route):
+    """이미지/미디어/폰트와 분석·추적 요청은 보내지 않고 중단"""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_PATTERN.search(request.url):
+        return route.abort()
+    return route.continue_()
+
+
+def fetch_html(context, url, lean=CRAWL_LEAN):
+    """📌 이미 열려 있는 브라우저 컨텍스트에서 새 탭으로 페이지 HTML 가져오기 (탭은 닫고 컨텍스트는 재사용)
+    lean=True: 무거운 요청 차단, DOMContentLoaded + 상세 이미지 셀렉터까지만 대기, 필요한 노드만 직렬화"""
+    page = context.new_page()
+
+    headers = {
+        'User-Agent': USER_AGENT
+    }
+    page.set_extra_http_headers(headers)
+    if lean:
+        page.route("**/*", _block_heavy_requests)
+
+    # ✅ 랜덤한 대기 시간 추가 (1.5 ~ 5초)
+    # time.sleep(random.uniform(1.5, 5.0))
+
+    try:
+        # 페이지 이동 (lean 모드는 HTML만 로드되면 진행, 아니면 모든 리소스 로드까지 대기)
+        page.goto(url, timeout=60000, wait_until="domcontentloaded" if lean else "load")
+
+        if page.wait_for_selector(DETAIL_IMAGE_SELECTOR, state="attached" if lean else "visible", timeout=20000):
+
+            # ✅ JavaScript 실행 후 동적으로 생성된 HTML 가져오기
+            html = page.evaluate(EXTRACT_NODES_JS if lean else "document.documentElement.outerHTML")
+            return html, True
+        else:
+            return None, False
 
-def get_html(url):
-    """Playwright를 사용해 HTML을 가져오는 함수"""
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False, args=["--no-sandbox", "--disable-gpu"])  # 브라우저 보이게 실행 (디버깅 가능)
-        context = browser.new_context()
-        page = context.new_page()
+    except Exception as e:
+        print(f"❌ 오류 발생: {e}")
+        return None, False
+    finally:
+        page.close()
 
-        headers = {
-            'User-Agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.0.0 Safari/537.36"
-        }
-        page.set_extra_http_headers(headers)
 
-        # ✅ 랜덤한 대기 시간 추가 (1.5 ~ 5초)
-        # time.sleep(random.uniform(1.5, 5.0))
+async def fetch_html_async(context, url, lean=CRAWL_LEAN):
+    """📌 fetch_html의 Playwright async 버전 (crawl_worker가 한 브라우저의 여러 컨텍스트로 동시에 페이지 로드)"""
+    page = await context.new_page()
+    await page.set_extra_http_headers({'User-Agent': USER_AGENT})
+    if lean:
+        await page.route("**/*", _block_heavy_requests)  # 반환한 route.abort()/continue_()는 Playwright가 await
 
-        try:
-            # 페이지 이동 (HTML만 로드되면 가져오기)
-            page.goto(url, timeout=60000, wait_until="load")
-
-            if page.wait_for_selector("div.subType-IMAGE img, div.subType-TEXT img", timeout=20000):
-
-                # ✅ JavaScript 실행 후 동적으로 생성된 HTML 가져오기
-                html = page.evaluate("document.documentElement.outerHTML")
-                browser.close()
-                return html, True
-            else:
-                browser.close()
-                return None, False
-            
-        except Exception as e:
-            print(f"❌ 오류 발생: {e}")
-            browser.close()
+    try:
+        await page.goto(url, timeout=60000, wait_until="domcontentloaded" if lean else "load")
+
+        if await page.wait_for_selector(DETAIL_IMAGE_SELECTOR, state="attached" if lean else "visible", timeout=20000):
+            html = await page.evaluate(EXTRACT_NODES_JS if lean else "document.documentElement.outerHTML")
+            return html, True
+        else:
             return None, False
 
+    except Exception as e:
+        print(f"❌ 오류 발생: {e}")
+        return None, False
+    finally:
+        await page.close()
 
-def extract_filtered_images(html):
-    """HTML에서 특정 클래스 내부의 이미지 URL만 추출"""
-    soup = BeautifulSoup(html, "html.parser")
 
-    # 'subType-IMAGE','subType-TEXT' 찾기
-    image_containers = soup.select("div.subType-IMAGE, div.subType-TEXT")
+def get_html(url):
+    """Playwright를 사용해 HTML을 가져오는 함수 (브라우저를 매번 새로 실행, 상시 실행은 crawl_worker.py 사용)"""
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=CRAWL_HEADLESS, args=BROWSER_ARGS)
+        try:
+            return fetch_html(browser.new_context(), url)
+        finally:
+            browser.close()
 
-    image_urls = []
 
-    # 🔹 가져올 이미지 확장자 목록 (대소문자 구분 없이 처리)
-    valid_extensions = {"jpg", "jpeg", "png", "gif", "bmp", "webp", "svg", "tiff"}
+def _target_format(ext):
+    """저장 확장자에 해당하는 PIL 포맷 이름"""
+    return "PNG" if ext.lower() == "png" else "JPEG"
 
-    for container in image_containers:
-        # 해당 div 내의 모든 img 태그 찾기
-        img_tags = container.find_all("img")
 
-        for img in img_tags:
-            img_url = img.get("src") or img.get("data-src")  # src가 없으면 data-src 체크
+def _finalize_image(part_path, save_path, ext):
+    """📌 내려받은 파일의 헤더만 확인해서, 포맷/모드가 맞으면 그대로 사용하고 필요한 경우에만 재인코딩"""
+    with Image.open(part_path) as image:  # 헤더만 읽음 (전체 디코딩 없음)
+        needs_convert = image.mode in ("RGBA", "P", "LA") or image.format != _target_format(ext)
 
-            if img_url:
-                # 🔹 URL에서 확장자를 소문자로 변환하여 필터링
-                ext = img_url.split(".")[-1].split("?")[0].lower()
-                if ext in valid_extensions:
-                    # 상대 URL이면 절대 URL로 변환
-                    if img_url.startswith("//"):
-                        img_url = "https:" + img_url
-                    image_urls.append(img_url)
+        if needs_convert:
+            # ✅ RGBA 또는 P 모드 이미지는 RGB로 변환 후 저장 (JPEG/PNG 외 포맷은 확장자에 맞게 변환)
+            converted = image.convert("RGB") if image.mode not in ("RGB", "L") else image
+            converted.save(save_path, format=_target_format(ext))
+
+    if needs_convert:
+        os.remove(part_path)
+    else:
+        os.replace(part_path, save_path)
+    return needs_convert
 
-    return image_urls
 
+async def download_images_async(image_urls, save_folder):
+    """📌 여러 개의 이미지를 연결을 재사용하는 세션으로 동시에 내려받아 디스크에 바로 저장"""
+    os.makedirs(save_folder, exist_ok=True)
 
-def download_images(image_urls):
-    """여러 개의 이미지 다운로드 후 저장"""
-    for i, img_url in enumerate(image_urls, 1):
+    timeout = aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)
+    connector = aiohttp.TCPConnector(limit=DOWNLOAD_MAX_CONCURRENCY, keepalive_timeout=30)
+    semaphore = asyncio.Semaphore(DOWNLOAD_MAX_CONCURRENCY)
+    headers = {"User-Agent": USER_AGENT}
+
+    async def download_one(session, i, img_url):
         # 저장 경로 설정 (이미지 확장자 유지)
         ext = img_url.split(".")[-1].split("?")[0]  # 확장자 추출 (jpg, png 등, URL에 ? 붙어 있는 경우 제거)
         if ext.lower() not in ["jpg", "jpeg", "png"]:  # 확장자가 이상하면 기본 jpg 사용
             ext = "jpg"
         save_path = os.path.join(save_folder, f"image_{i}.{ext}")
-
-        try:
-            # 이미지 다운로드
-            response = requests.get(img_url, stream=True)
-            if response.status_code == 200:
-                image = Image.open(BytesIO(response.content))
-
-                # ✅ RGBA 또는 P 모드 이미지는 RGB로 변환 후 저장
-                if image.mode in ("RGBA", "P"):
-                    image = image.convert("RGB")
-
-                image.save(save_path)  # 변환된 이미지 저장
-                print(f"✅ {i}. 이미지 저장 완료: {save_path}")
-            else:
-                print(f"❌ {i}. 이미지 저장 실패: {img_url}")
-        except Exception as e:
-            print(f"❌ {i}. 오류 발생: {e}")
-
-
-def product_image_and_name_download(html):
-    soup = BeautifulSoup(html, "html.parser")
-    img_tag = soup.find("img", class_="prod-image__detail")
-
-    if img_tag:
-        img_url = "https:" + img_tag["src"]  # src 값이 //로 시작하므로 https:를 붙여야 함
-
-        img_response = requests.get(img_url)
+        part_path = save_path + ".part"
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with session.get(img_url) as response:
+                    if response.status != 200:
+                        print(f"❌ {i}. 이미지 저장 실패: {img_url} ({response.status})")
+                        return None, 0
+
+                    # ✅ 메모리에 전체를 올리지 않고 청크 단위로 바로 디스크에 기록
+                    size = 0
+                    async with aiofiles.open(part_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(64 * 1024):
+                            await f.write(chunk)
+                            size += len(chunk)
+
+                converted = await asyncio.to_thread(_finalize_image, part_path, save_path, ext)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"✅ {i}. 이미지 저장 완료: {save_path} ({size / 1024:.0f}KB, {elapsed:.2f}초"
+                    + (", 재인코딩" if converted else "") + ")"
+                )
+                return save_path, size
+
+            except Exception as e:
+                print(f"❌ {i}. 오류 발생: {e}")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                return None, 0
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+        results = await asyncio.gather(*[download_one(session, i, url) for i, url in enumerate(image_urls, 1)])
+
+    elapsed = time.perf_counter() - start
+    saved_paths = [path for path, _ in results if path]
+    total_size = sum(size for _, size in results)
+    print(f"📊 이미지 {len(saved_paths)}/{len(image_urls)}개 다운로드: {total_size / 1024 / 1024:.1f}MB, {elapsed:.2f}초")
+    return saved_paths
+
+
+def download_images(image_urls, save_folder):
+    """여러 개의 이미지 다운로드 후 저장 (저장된 경로 목록 반환)"""
+    return asyncio.run(download_images_async(image_urls, save_folder))
+
+
+def product_image_and_name_download(page, workspace):
+    main_image_folder, html_folder = workspace.meta_dir, workspace.texts_dir
+
+    if page.main_image_url:
+        img_response = requests.get(page.main_image_url)
 
         if img_response.status_code == 200:
 
@@ -130,33 +235,31 @@ def product_image_and_name_download(html):
                 f.write(img_response.content)
             print("이미지 저장 완료: main_image.jpg")
         else:
+            image_path = None
             print("이미지 다운로드 실패")
     else:
+        image_path = None
         print("이미지를 찾을 수 없음")
 
-    name = soup.find("h1", class_="prod-buy-header__title").text.strip()
-
+    os.makedirs(main_image_folder, exist_ok=True)
     name_path = os.path.join(main_image_folder, "product_name.txt")
-    if name:
+    if page.name:
         with open(name_path, "w", encoding="utf-8") as file:
-            file.write(name)
+            file.write(page.name)
 
-    price_div = soup.find("div", class_="prod-price-onetime")
-    if price_div:
-        price_html = price_div.prettify()  # HTML을 보기 좋게 정리
-        price_html = re.sub(r'\n\s*\n+', '\n', price_html)  # 여러 개의 연속된 줄바꿈을 하나로 줄이기
-        price_html = re.sub(r'>\s+<', '><', price_html)  # 태그 사이의 불필요한 공백 제거
+    if page.price_html:
+        os.makedirs(html_folder, exist_ok=True)
+        price_path = os.path.join(html_folder, "price_info.html")
+        with open(price_path, "w", encoding="utf-8") as file:
+            file.write(page.price_html)
 
-    price_path = os.path.join(html_folder, "price_info.html")
-    with open(price_path, "w", encoding="utf-8") as file:
-        file.write(price_html)
+    return image_path
 
 
-def basic_information(html):
-    soup = BeautifulSoup(html, "html.parser")
-    table = soup.find("table", class_="prod-delivery-return-policy-table essential-info-table")
+def basic_information(page, workspace):
+    html_folder = workspace.texts_dir
 
-    if table:
+    if page.essential_info_html:
         if not os.path.exists(html_folder):
             os.makedirs(html_folder)
         
@@ -164,67 +267,96 @@ def basic_information(html):
 
         # 테이블 HTML 저장
         with open(file_path, "w", encoding="utf-8") as f:
-            f.write(str(table))
+            f.write(page.essential_info_html)
 
         print(f"테이블 HTML 저장 완료: {file_path}")
     else:
         print("테이블을 찾을 수 없음")
 
 
-def delibery_data(html):
-    soup = BeautifulSoup(html, "html.parser")
-    li_element = soup.find_all("li", class_="product-etc tab-contents__content etc-new-style")
+def delibery_data(page, workspace):
+    html_folder = workspace.texts_dir
 
-    if li_element:
+    if page.delivery_items_html:
+        os.makedirs(html_folder, exist_ok=True)
         file_path = os.path.join(html_folder, "li_data.html")
 
         # 모든 <li> 태그를 하나의 HTML 파일에 저장
         with open(file_path, "w", encoding="utf-8") as f:
-            for li in li_element:
-                f.write(str(li) + "\n")  # HTML 그대로 저장 + 줄바꿈 추가
+            for li in page.delivery_items_html:
+                f.write(li + "\n")  # HTML 그대로 저장 + 줄바꿈 추가
 
         print(f"<li> HTML 저장 완료: {file_path}")
     else:
         print("<li> 태그를 찾을 수 없음")
 
 
-# ✅ 명령줄 인자로 URL을 받기
-if len(sys.argv) < 2:
-    print("❌ 사용법: python jpg_crowling.py <쿠팡 상품 URL>")
-    sys.exit(1)
+def save_page_html(html, workspace):
+    """원본 페이지 HTML 저장 (bench_page_parse.py 벤치마크 자료로 사용)"""
+    os.makedirs(workspace.meta_dir, exist_ok=True)
+    with open(os.path.join(workspace.meta_dir, "page.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def process_page(html_source, S_or_F, workspace=None):
+    """📌 가져온 페이지 HTML → 파싱 → 작업 폴더에 이미지/메타 저장 후 구조화된 결과(dict) 반환"""
+    workspace = workspace or Workspace()
+    timings = {}
+
+    # ✅ 페이지를 한 번만 파싱 (이름, 이미지 URL, 가격, 필수 표기정보, 배송 안내)
+    start = time.perf_counter()
+    page = parse_product_page(html_source)
+    timings["parse"] = time.perf_counter() - start
+    print(f"📊 페이지 파싱: {len(html_source) / 1024:.0f}KB, {timings['parse']:.3f}초")
+
+    # ✅ 결과 출력
+    print("총 이미지 개수:", len(page.detail_image_urls))
+
+    # ✅ 이미지 삭제(있다면) 후 다운로드 실행
+    image_paths = []
+    start = time.perf_counter()
+    if S_or_F:
+        workspace.clear()
+        image_paths = download_images(page.detail_image_urls, workspace.images_dir)
+    timings["download"] = time.perf_counter() - start
+
+    if SAVE_PAGE_HTML:
+        save_page_html(html_source, workspace)
+
+    # 메인 이미지, 필수 표기정보, 배송/교환/반품 안내 다운로드
+    main_image_path = product_image_and_name_download(page, workspace)
 
-url = sys.argv[1]  # ✅ 명령줄에서 URL 받기
+    basic_information(page, workspace)
 
-# url = "https://www.coupang.com/vp/products/8338421081?itemId=24078900518&vendorItemId=83384767739&q=%EB%83%89%EC%9E%A5%EA%B3%A0&itemsCount=27&searchId=31fcffc05584302&rank=0&searchRank=0&isAddedCart="
+    delibery_data(page, workspace)
 
-# ✅ 쿠팡 제품 URL
-html_source, S_or_F = get_html(url)
+    return {
+        "ok": bool(S_or_F and image_paths),
+        "page": asdict(page),
+        "image_paths": image_paths,
+        "main_image_path": main_image_path,
+        "timings": timings,
+    }
 
-# ✅ 특정 클래스 안에 있는 jpg, png 이미지 URL 추출
-filtered_image_urls = extract_filtered_images(html_source)
 
-# ✅ 결과 출력
-print("총 이미지 개수:", len(filtered_image_urls))
+def main():
+    # ✅ 명령줄 인자로 URL을 받기
+    if len(sys.argv) < 2:
+        print("❌ 사용법: python jpg_crowling.py <쿠팡 상품 URL>")
+        sys.exit(1)
 
-# ✅ 이미지 삭제(있다면) 후 다운로드 실행
-if S_or_F:
-    folders_to_clear = ["download_images", "main_image", "ocr_texts"]
+    url = sys.argv[1]  # ✅ 명령줄에서 URL 받기
 
-    for folder in folders_to_clear:
-        if os.path.exists(folder):  # ✅ 폴더 존재 확인
-            for item in os.listdir(folder):  # ✅ 폴더 내부 파일 및 폴더 순회
-                item_path = os.path.join(folder, item)
-                
-                if os.path.isfile(item_path):  # ✅ 파일이면 삭제
-                    os.remove(item_path)
-                elif os.path.isdir(item_path):  # ✅ 폴더이면 폴더 삭제 (하위 파일 포함)
-                    shutil.rmtree(item_path)
+    # url = "https://www.coupang.com/vp/products/8338421081?itemId=24078900518&vendorItemId=83384767739&q=%EB%83%89%EC%9E%A5%EA%B3%A0&itemsCount=27&searchId=31fcffc05584302&rank=0&searchRank=0&isAddedCart="
 
-    download_images(filtered_image_urls)
+    # ✅ 쿠팡 제품 URL
+    html_source, S_or_F = get_html(url)
+    if not html_source:
+        print("❌ 페이지 HTML을 가져오지 못했습니다.")
+        sys.exit(1)
 
-# 메인 이미지, 필수 표기정보, 배송/교환/반품 안내 다운로드
-product_image_and_name_download(html_source)
+    process_page(html_source, S_or_F)
 
-basic_information(html_source)
 
-delibery_data(html_source)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
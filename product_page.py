@@ -0,0 +1,86 @@
+import re
+from dataclasses import dataclass, field
+from bs4 import BeautifulSoup, SoupStrainer
+
+# ✅ lxml이 설치되어 있으면 더 빠른 lxml 파서 사용 (없으면 기본 html.parser)
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# 🔹 가져올 이미지 확장자 목록 (대소문자 구분 없이 처리)
+VALID_IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "bmp", "webp", "svg", "tiff"}
+
+# ✅ 필요한 영역의 클래스만 트리로 만들기 (스크립트/헤더/추천 상품 등은 파싱 중에 버림 → 메모리 절약)
+# class 속성은 파싱 중에는 "a b" 문자열, 파싱 후에는 값 목록으로 비교되므로 두 경우 모두 맞도록 작성
+_TARGET_CLASSES = (
+    "prod-buy-header__title",
+    "prod-image__detail",
+    "subType-IMAGE",
+    "subType-TEXT",
+    "prod-price-onetime",
+    "essential-info-table",
+    "product-etc",
+)
+_STRAINER = SoupStrainer(class_=re.compile(r"(^|\s)(" + "|".join(map(re.escape, _TARGET_CLASSES)) + r")(\s|$)"))
+
+
+@dataclass
+class ProductPage:
+    """📌 상품 페이지에서 한 번에 추출한 정보"""
+
+    name: str | None = None
+    main_image_url: str | None = None
+    detail_image_urls: list[str] = field(default_factory=list)
+    price_html: str | None = None  # 가격 영역 (정리된 HTML)
+    essential_info_html: str | None = None  # 필수 표기정보 테이블
+    delivery_items_html: list[str] = field(default_factory=list)  # 배송/교환/반품 안내 <li> 목록
+
+
+def _absolute_url(url):
+    """상대 URL(//로 시작)이면 https: 붙이기"""
+    return "https:" + url if url.startswith("//") else url
+
+
+def _detail_image_urls(soup):
+    """📌 상세 설명 영역('subType-IMAGE', 'subType-TEXT') 안의 이미지 URL만 추출"""
+    image_urls = []
+    for img in soup.select("div.subType-IMAGE img, div.subType-TEXT img"):
+        img_url = img.get("src") or img.get("data-src")  # src가 없으면 data-src 체크
+        if not img_url:
+            continue
+
+        # 🔹 URL에서 확장자를 소문자로 변환하여 필터링
+        ext = img_url.split(".")[-1].split("?")[0].lower()
+        if ext in VALID_IMAGE_EXTENSIONS:
+            image_urls.append(_absolute_url(img_url))
+    return image_urls
+
+
+def _clean_price_html(price_div):
+    price_html = price_div.prettify()  # HTML을 보기 좋게 정리
+    price_html = re.sub(r'\n\s*\n+', '\n', price_html)  # 여러 개의 연속된 줄바꿈을 하나로 줄이기
+    return re.sub(r'>\s+<', '><', price_html)  # 태그 사이의 불필요한 공백 제거
+
+
+def parse_product_page(html, parser=HTML_PARSER, strain=True):
+    """📌 상품 페이지 HTML을 한 번만 파싱해서 ProductPage 생성"""
+    soup = BeautifulSoup(html, parser, parse_only=_STRAINER if strain else None)
+
+    name_tag = soup.find("h1", class_="prod-buy-header__title")
+    img_tag = soup.find("img", class_="prod-image__detail")
+    price_div = soup.find("div", class_="prod-price-onetime")
+    table = soup.find("table", class_="prod-delivery-return-policy-table essential-info-table")
+    li_elements = soup.find_all("li", class_="product-etc tab-contents__content etc-new-style")
+
+    page = ProductPage(
+        name=name_tag.text.strip() if name_tag else None,
+        main_image_url=_absolute_url(img_tag["src"]) if img_tag and img_tag.get("src") else None,
+        detail_image_urls=_detail_image_urls(soup),
+        price_html=_clean_price_html(price_div) if price_div else None,
+        essential_info_html=str(table) if table else None,
+        delivery_items_html=[str(li) for li in li_elements],
+    )
+    soup.decompose()  # 트리 참조를 바로 끊어서 메모리 반환
+    return page
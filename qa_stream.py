@@ -0,0 +1,129 @@
+import time
+from token_utils import count_tokens
+
+# ✅ 검색 → 프롬프트 → LLM 토큰 스트리밍 QA (RetrievalQA "stuff" 방식과 같은 프롬프트 구성)
+# 로컬 테스트: python fake_llm_server.py 실행 후 OPENAI_BASE_URL=http://127.0.0.1:8082/v1 로 설정
+
+
+class AnswerStream:
+    """📌 답변 토큰을 도착하는 대로 내보내는 이터레이터 (다 읽고 나면 text / timings 사용)"""
+
+    def __init__(self, qa, question):
+        self.qa = qa
+        self.question = question
+        self.source_documents = []
+        self.text = ""
+        self.cached = None  # 저장된 답변을 사용한 경우 {"answer", "similarity", "seconds", "saved"}
+        self.timings = {}  # retrieval / ttft(첫 토큰) / total (초), tokens, context_tokens (+ 캐시 적중 시 cached / similarity / saved)
+        self.context_stats = None  # context_builder 사용 시 문서 선택/중복 제거/토큰 통계
+
+    def _lookup_cache(self):
+        """📌 같은 질문 → 비슷한 질문 순으로 저장된 답변 조회 (질문 임베딩은 검색에도 재사용)"""
+        cache, scope = self.qa.answer_cache, self.qa.cache_scope
+        hit = cache.lookup_exact(*scope, self.question)
+        vector = None
+        if hit is None and self.qa.embeddings is not None:
+            vector = self.qa.embeddings.embed_query(self.question)
+            hit = cache.lookup(*scope, vector)
+        return hit, vector
+
+    def _retrieve(self, vector):
+        """질문 임베딩이 이미 있으면 벡터로 바로 검색 (임베딩 API 중복 호출 방지)"""
+        retriever = self.qa.retriever
+        if vector is not None and hasattr(retriever, "search_with_vector"):
+            return retriever.search_with_vector(self.question, vector)
+        vectorstore = getattr(retriever, "vectorstore", None)
+        if vector is not None and vectorstore is not None and getattr(retriever, "search_type", None) == "similarity":
+            return vectorstore.similarity_search_by_vector(vector, **retriever.search_kwargs)
+        return retriever.invoke(self.question)
+
+    def __iter__(self):
+        start = time.perf_counter()
+        use_cache = self.qa.answer_cache is not None and self.qa.cache_scope is not None
+        vector = None
+        if use_cache:
+            self.cached, vector = self._lookup_cache()
+            if self.cached is not None:
+                yield from self._replay_cached(start)
+                return
+
+        self.source_documents = self._retrieve(vector)
+        if self.qa.context_builder is not None:
+            context, self.source_documents, self.context_stats = self.qa.context_builder.build(self.source_documents)
+        else:
+            context = "\n\n".join(doc.page_content for doc in self.source_documents)
+        retrieved_at = time.perf_counter()
+
+        prompt = self.qa.prompt.format(context=context, question=self.question)
+
+        parts = []
+        first_token_at = None
+        for chunk in self.qa.llm.stream(prompt):
+            token = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if not token:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(token)
+            yield token
+
+        finished_at = time.perf_counter()
+        self.text = "".join(parts)
+        self.timings = {
+            "retrieval": retrieved_at - start,
+            "ttft": (first_token_at or finished_at) - start,
+            "total": finished_at - start,
+            "tokens": count_tokens(self.text),
+        }
+        if self.context_stats:
+            self.timings["context_tokens"] = self.context_stats["tokens_out"]
+        print(
+            f"⚡ 답변 스트리밍: 검색 {self.timings['retrieval']:.2f}초 / 첫 토큰 {self.timings['ttft']:.2f}초 / "
+            f"전체 {self.timings['total']:.2f}초 ({self.timings['tokens']} 토큰)"
+        )
+
+        if use_cache and self.text:
+            self.qa.answer_cache.store(*self.qa.cache_scope, self.question, vector, self.text, self.timings["total"])
+
+    def _replay_cached(self, start):
+        self.text = self.cached["answer"]
+        yield self.text
+        elapsed = time.perf_counter() - start
+        self.timings = {
+            "retrieval": 0.0,
+            "ttft": elapsed,
+            "total": elapsed,
+            "tokens": count_tokens(self.text),
+            "cached": True,
+            "similarity": self.cached["similarity"],
+            "saved": self.cached["saved"],
+        }
+        stats = self.qa.answer_cache.stats()
+        print(
+            f"♻ 저장된 답변 사용: 유사도 {self.cached['similarity']:.3f} / {elapsed * 1000:.1f}ms "
+            f"(적중률 {stats['hit_rate']:.0%}, 누적 {stats['saved_seconds']:.1f}초 절약)"
+        )
+
+
+class StreamingQA:
+    """📌 Retriever + 프롬프트 + LLM 묶음 (stream: 토큰 스트리밍, invoke: 기존 RetrievalQA와 같은 형식)
+    answer_cache + cache_scope(상품 ID, 인덱스 버전)를 주면 같은/비슷한 질문은 저장된 답변으로 응답
+    context_builder를 주면 검색 결과를 중복 제거 + 토큰 예산 안에서 골라 context 구성 (없으면 전부 이어 붙임)"""
+
+    def __init__(self, llm, retriever, prompt, embeddings=None, answer_cache=None, cache_scope=None, context_builder=None):
+        self.llm = llm
+        self.retriever = retriever
+        self.prompt = prompt
+        self.context_builder = context_builder
+        self.embeddings = embeddings  # 비슷한 질문 조회용 (없으면 정확히 같은 질문만 재사용)
+        self.answer_cache = answer_cache
+        self.cache_scope = cache_scope
+
+    def stream(self, question):
+        return AnswerStream(self, question)
+
+    def invoke(self, inputs):
+        answer = self.stream(inputs["query"])
+        for _ in answer:
+            pass
+        return {"result": answer.text, "source_documents": answer.source_documents, "timings": answer.timings}
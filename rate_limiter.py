@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+
+# ✅ IP별 크롤링 횟수 제한 (SQLite WAL, 슬라이딩 윈도우)
+# 동작 확인: python rate_limiter.py  (여러 프로세스 x 스레드가 동시에 요청해도 허용 횟수를 넘지 않는지 검사)
+
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "crawl_limits.sqlite3")
+MAX_CRAWL_ATTEMPTS = int(os.getenv("MAX_CRAWL_ATTEMPTS", 3))  # 윈도우 안에서 허용할 크롤링 횟수
+CRAWL_WINDOW = int(os.getenv("CRAWL_WINDOW", 2 * 60 * 60))  # 슬라이딩 윈도우 (초, 기본 2시간)
+EVICT_INTERVAL = 60  # 만료된 기록 전체 정리 주기 (초)
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+class CrawlRateLimiter:
+    """📌 최근 window초 동안의 크롤링 기록으로 허용 여부 판단 (확인 + 기록을 한 트랜잭션으로 처리)"""
+
+    def __init__(self, path=RATE_LIMIT_DB, max_attempts=MAX_CRAWL_ATTEMPTS, window=CRAWL_WINDOW):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+
+        # isolation_level=None: 트랜잭션을 직접 BEGIN IMMEDIATE로 시작 (다른 프로세스와의 경쟁 방지)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS crawl_events (ip TEXT NOT NULL, at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS crawl_events_ip_at ON crawl_events (ip, at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS crawl_events_at ON crawl_events (at)")
+
+    def _count(self, ip, now):
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM crawl_events WHERE ip = ? AND at > ?", (ip, now - self.window)
+        ).fetchone()
+        return count
+
+    def _evict_expired(self, now):
+        """만료된 기록 삭제 (EVICT_INTERVAL마다 한 번, 인덱스로 범위 삭제)"""
+        if now - self._last_evict < EVICT_INTERVAL:
+            return
+        self._last_evict = now
+        self._conn.execute("DELETE FROM crawl_events WHERE at <= ?", (now - self.window,))
+
+    def status(self, ip):
+        """📌 (크롤링 가능 여부, 남은 횟수) 조회 (기록은 변경하지 않음)"""
+        with self._lock:
+            remaining = max(0, self.max_attempts - self._count(ip, time.time()))
+        return remaining > 0, remaining
+
+    def try_acquire(self, ip):
+        """📌 허용 횟수가 남아 있으면 기록 후 (True, 남은 횟수), 아니면 (False, 0)"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute("BEGIN IMMEDIATE")  # 쓰기 잠금을 먼저 잡아서 확인~기록 사이 끼어들기 방지
+            try:
+                self._evict_expired(now)
+                count = self._count(ip, now)
+                allowed = count < self.max_attempts
+                if allowed:
+                    self._conn.execute("INSERT INTO crawl_events (ip, at) VALUES (?, ?)", (ip, now))
+                    count += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed, max(0, self.max_attempts - count)
+
+    def refund(self, ip):
+        """📌 가장 최근 기록 하나 취소 (차감 후 실제로 크롤링을 시작하지 않은 경우) → 남은 횟수 반환"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "DELETE FROM crawl_events WHERE rowid = "
+                "(SELECT rowid FROM crawl_events WHERE ip = ? AND at > ? ORDER BY at DESC LIMIT 1)",
+                (ip, now - self.window),
+            )
+            return max(0, self.max_attempts - self._count(ip, now))
+
+    def retry_after(self, ip):
+        """📌 다음 크롤링이 가능해지기까지 남은 시간 (초, 바로 가능하면 0)"""
+        with self._lock:
+            now = time.time()
+            rows = self._conn.execute(
+                "SELECT at FROM crawl_events WHERE ip = ? AND at > ? ORDER BY at DESC LIMIT ?",
+                (ip, now - self.window, self.max_attempts),
+            ).fetchall()
+        if len(rows) < self.max_attempts:
+            return 0.0
+        return max(0.0, rows[-1][0] + self.window - now)  # 윈도우 안의 가장 오래된 기록이 만료되는 시점
+
+
+def get_limiter():
+    """📌 프로세스 전체에서 공유하는 기본 제한기 반환"""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = CrawlRateLimiter()
+        return _default_limiter
+
+
+def _hammer(path, max_attempts, window, ip, threads, attempts):
+    """동작 확인용: 한 프로세스에서 여러 스레드가 동시에 try_acquire 호출 → 허용된 횟수 반환"""
+    limiter = CrawlRateLimiter(path, max_attempts, window)
+    allowed = []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        allowed.extend(ok for ok, _ in (limiter.try_acquire(ip) for _ in range(attempts)))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(allowed)
+
+
+def self_check(processes=4, threads=8, attempts=5):
+    """📌 여러 프로세스 x 스레드 동시 요청에서 허용 횟수 / 슬라이딩 윈도우 / 만료 정리 확인"""
+    import tempfile
+    import multiprocessing
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "limits.sqlite3")
+        max_attempts = 7
+        CrawlRateLimiter(path, max_attempts, 3600)  # 테이블 미리 생성
+
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            results = pool.starmap(
+                _hammer, [(path, max_attempts, 3600, "1.2.3.4", threads, attempts)] * processes
+            )
+        total = sum(results)
+        print(f"{'✅' if total == max_attempts else '❌'} 동시 요청 {processes * threads * attempts}회 → 허용 {total}회 (기대값 {max_attempts})")
+
+        limiter = CrawlRateLimiter(path, 2, window=1)
+        first = [limiter.try_acquire("5.6.7.8")[0] for _ in range(3)]
+        time.sleep(1.1)
+        after = limiter.try_acquire("5.6.7.8")[0]
+        window_ok = first == [True, True, False] and after
+        print(f"{'✅' if window_ok else '❌'} 슬라이딩 윈도우: {first} → 1초 후 {after}")
+
+        limiter._last_evict = 0
+        time.sleep(1.1)
+        limiter.try_acquire("9.9.9.9")
+        (rows,) = limiter._conn.execute("SELECT COUNT(*) FROM crawl_events").fetchone()
+        evict_ok = rows == 1  # 만료된 다른 IP 기록은 모두 삭제되고 방금 기록만 남음
+        print(f"{'✅' if evict_ok else '❌'} 만료 기록 정리: 남은 기록 {rows}개")
+
+    return total == max_attempts and window_ok and evict_ok
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.exit(0 if self_check() else 1)
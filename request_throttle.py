@@ -0,0 +1,121 @@
+import time
+import random
+import asyncio
+import threading
+import collections
+
+# ✅ 재시도 대상 응답 코드 (요청 과다 / 서버 오류)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """📌 초당 요청 수를 제한하는 토큰 버킷 (rate <= 0 이면 제한 없음)
+    여러 스레드/이벤트 루프에서 함께 사용 가능: 토큰을 미리 예약하고 차례가 올 때까지 각자 대기"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """토큰 1개 예약 → 사용할 수 있을 때까지 기다릴 시간(초) 반환 (부족하면 음수로 빌려 순서대로 대기)"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class SharedSemaphore:
+    """📌 여러 스레드의 이벤트 루프가 함께 쓰는 async 세마포어 (asyncio.Semaphore는 루프 하나에서만 사용 가능)"""
+
+    def __init__(self, value):
+        self._value = max(1, value)
+        self._waiters = collections.deque()  # (이벤트 루프, future) 도착 순서
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+                    raise
+            if future.done() and not future.cancelled():
+                self.release()  # 넘겨받은 직후 취소됨 → 반납
+            raise
+
+    def _grant(self, future):
+        if future.cancelled():
+            self.release()  # 기다리던 작업이 취소됨 → 다음 대기자에게
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if loop.is_closed():
+                    continue
+                loop.call_soon_threadsafe(self._grant, future)  # 대기자의 이벤트 루프에서 깨움
+                return
+            self._value += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class RequestThrottle:
+    """📌 동시 요청 수(세마포어) + 초당 요청 수(토큰 버킷)를 함께 제한하는 async 컨텍스트
+    프로세스 전체에서 하나를 공유하면 동시에 실행되는 수집 작업 수와 관계없이 전체 요청량이 제한됨"""
+
+    def __init__(self, requests_per_sec, max_concurrency):
+        self.bucket = TokenBucket(requests_per_sec)
+        self.semaphore = SharedSemaphore(max_concurrency)
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+        return False
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, max_delay=30.0):
+    """📌 재시도 대기 시간 (Retry-After 헤더 우선, 없으면 지수 백오프 + full jitter)"""
+    if retry_after:
+        try:
+            return min(max_delay, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_delay, base * 2 ** attempt))
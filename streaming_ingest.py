@@ -0,0 +1,210 @@
+import os
+import time
+import asyncio
+import threading
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+import jpg2text_run
+import chunking
+import ingest
+import index_store
+from context_builder import source_order
+from token_utils import count_tokens
+
+# ✅ 동시에 정리(LLM) + 임베딩을 수행할 작업자 수
+STREAM_CONSUMERS = int(os.getenv("STREAM_CONSUMERS", 4))
+# ✅ 질문을 받기 시작할 최소 인덱싱 조각 수
+STREAM_READY_FRAGMENTS = int(os.getenv("STREAM_READY_FRAGMENTS", 1))
+
+
+class StreamingIngestion:
+    """📌 OCR 조각이 완료되는 즉시 정리 → 청크 분할 → 임베딩 → 인덱스 추가하는 백그라운드 파이프라인"""
+
+    def __init__(self, embeddings, cache=None, index_path=None, on_complete=None, workspace=None,
+                 consumers=STREAM_CONSUMERS, ready_fragments=STREAM_READY_FRAGMENTS):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.workspace = workspace  # 입력(이미지/HTML)을 읽을 작업 폴더 (없으면 현재 폴더)
+        self.index_path = index_path
+        self.on_complete = on_complete
+        self.consumers = max(1, consumers)
+        self.ready_fragments = max(1, ready_fragments)
+
+        self.vectorstore = None  # 읽기 전용 스냅샷 (조각이 추가될 때마다 교체)
+        self.fragments = 0
+        self.chunks = 0
+        # 조각별 임베딩 통계 합계 (ingest.embed_texts의 stats, seconds는 조각별 소요 시간 합)
+        self.embedding_stats = {"docs": 0, "embedded": 0, "cache_hits": 0, "tokens": 0, "batches": 0, "seconds": 0.0}
+        self.error = None
+        self.started_at = None
+        self.first_ready_at = None
+        self.indexed_at = None  # 모든 조각 인덱싱 완료 (이후 디스크 저장)
+        self.finished_at = None
+
+        self._small_fragments = []  # LLM_MIN_TOKENS보다 작은 조각 (출처, 텍스트) → 모아서 한 번에 문서 정리
+        self._small_tokens = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """📌 별도 스레드(자체 이벤트 루프)에서 파이프라인 시작"""
+        self.started_at = time.perf_counter()
+        if self.workspace is not None:
+            self.workspace.touch()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_until_ready(self, timeout=None):
+        """📌 첫 조각이 인덱싱되거나 전체 작업이 끝날 때까지 대기"""
+        self._ready.wait(timeout)
+        return self.vectorstore
+
+    def wait(self, timeout=None):
+        """📌 전체 작업 완료까지 대기"""
+        self._done.wait(timeout)
+        return self.vectorstore
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def _run(self):
+        try:
+            asyncio.run(self._pipeline())
+            self.indexed_at = time.perf_counter()
+            if self.vectorstore is not None and self.index_path:
+                index_store.save_index(self.vectorstore, self.index_path)
+                print(f"✅ 새로운 벡터 데이터베이스 저장 완료! ({self.index_path})")
+            if self.on_complete:
+                self.on_complete(self)
+        except Exception as e:
+            self.error = e
+            print(f"❌ 스트리밍 저장 중 오류 발생: {e}")
+        finally:
+            # ✅ 작업 폴더의 중간 결과(이미지/조각/OCR HTML) 정리 (메타 정보와 인덱스는 유지)
+            if self.workspace is not None and self.workspace.isolated:
+                self.workspace.cleanup_intermediate()
+            self.finished_at = time.perf_counter()
+            print(
+                f"🎉 스트리밍 저장 완료: {self.fragments}개 조각 / {self.chunks}개 청크 / "
+                f"{self.finished_at - self.started_at:.1f}초"
+            )
+            stats = self.embedding_stats
+            if stats["docs"]:
+                print(
+                    f"📊 임베딩: {stats['docs']}개 문서 (캐시 적중 {stats['cache_hits']}개, {stats['cache_hits'] / stats['docs']:.0%}) / "
+                    f"API {stats['embedded']}개 · {stats['batches']}개 배치 · {stats['tokens']} 토큰 / 임베딩 시간 합계 {stats['seconds']:.2f}초"
+                    + (f" ({stats['embedded'] / stats['seconds']:.1f} docs/s)" if stats["seconds"] > 0 else "")
+                )
+            self._ready.set()
+            self._done.set()
+
+    async def _pipeline(self):
+        queue = asyncio.Queue(maxsize=self.consumers * 2)
+        workers = [asyncio.create_task(self._consume(queue)) for _ in range(self.consumers)]
+
+        try:
+            await jpg2text_run.stream_fragments_async(queue, self.workspace)
+        finally:
+            for _ in workers:
+                await queue.put(None)  # 종료 신호
+            await asyncio.gather(*workers)
+
+        # ✅ 끝까지 LLM_MIN_TOKENS를 채우지 못한 작은 조각도 한 번에 정리해서 인덱싱
+        if self._small_fragments:
+            await self._index_small_batch(self._take_small_batch())
+
+    async def _consume(self, queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+
+            source, html_content = item
+            try:
+                await self._index_fragment(source, html_content)
+            except Exception as e:
+                print(f"❌ {source} 처리 중 오류 발생: {e}")
+
+    async def _index_fragment(self, source, html_content):
+        """📌 조각 하나를 정리 → 청크 분할 → 임베딩 후 인덱스에 추가
+        작은 조각은 LLM_MIN_TOKENS 이상이 될 때까지 모았다가 합쳐서 정리 (process_text_file_async와 같은 기준)"""
+        text = jpg2text_run.clean_html_to_markdown_table(html_content)
+        if not text.strip():
+            return
+
+        tokens = count_tokens(text)
+        if tokens < jpg2text_run.LLM_MIN_TOKENS:
+            self._small_fragments.append((source, text))
+            self._small_tokens += tokens
+            if self._small_tokens >= jpg2text_run.LLM_MIN_TOKENS:
+                await self._index_small_batch(self._take_small_batch())
+            return
+
+        await self._index_text(source, await jpg2text_run.correct_cleaned_text_async(text))
+
+    def _take_small_batch(self):
+        """모아 둔 작은 조각을 꺼내고 비우기 (같은 이벤트 루프에서만 호출되므로 잠금 불필요)"""
+        batch, self._small_fragments, self._small_tokens = self._small_fragments, [], 0
+        return batch
+
+    async def _index_small_batch(self, batch):
+        """작은 조각 묶음을 페이지 순서로 합쳐 한 번에 정리 → 모든 출처를 metadata(sources)에 남겨 인덱싱"""
+        batch = sorted(batch, key=lambda item: source_order(item[0]))  # 도착 순서가 아닌 원래 페이지 순서
+        sources = [source for source, _ in batch]
+        text = await jpg2text_run.correct_cleaned_text_async("\n\n".join(text for _, text in batch))
+        await self._index_text(sources[0], text, sources=sources)
+
+    async def _index_text(self, source, text, sources=None):
+        """📌 정리된 텍스트 → 청크 분할 → 임베딩 후 인덱스에 추가 (sources = 합쳐진 작은 조각들의 출처 목록)"""
+        if not text:
+            return
+
+        metadata = {"source": source}
+        if sources and len(sources) > 1:
+            metadata["sources"] = sources
+        merged = len(sources) if sources else 1
+        chunks = chunking.split_documents([Document(page_content=text, metadata=metadata)])
+        chunks = [doc for doc in chunks if doc.page_content.strip()]
+        if not chunks:
+            return
+
+        texts = [doc.page_content for doc in chunks]
+        vectors, stats = await asyncio.to_thread(
+            ingest.embed_texts, texts, self.embeddings, max_concurrency=1, cache=self.cache
+        )
+        with self._lock:
+            for key in self.embedding_stats:
+                self.embedding_stats[key] += stats[key]
+        await asyncio.to_thread(self._publish, texts, vectors, [doc.metadata for doc in chunks], merged)
+        print(f"✅ {source} 인덱싱 완료! ({len(chunks)}개 청크" + (f", 작은 조각 {merged}개 병합)" if merged > 1 else ")"))
+
+    def _publish(self, texts, vectors, metadatas, fragments=1):
+        """📌 이번 조각의 벡터만 새 인덱스로 만든 뒤 현재 스냅샷 복사본에 합쳐 교체 (검색 중인 스냅샷은 변경하지 않음)"""
+        added = FAISS.from_embeddings(list(zip(texts, vectors)), self.embeddings, metadatas=metadatas)
+        with self._lock:
+            current = self.vectorstore
+            if current is None:
+                snapshot = added
+            else:
+                # FAISS 인덱스 복사(memcpy) + 문서 목록 얕은 복사 → 누적 텍스트/벡터로 다시 만들지 않음
+                snapshot = FAISS(
+                    self.embeddings,
+                    faiss.clone_index(current.index),
+                    InMemoryDocstore(dict(current.docstore._dict)),
+                    dict(current.index_to_docstore_id),
+                )
+                snapshot.merge_from(added)
+            self.vectorstore = snapshot
+            self.fragments += fragments
+            self.chunks = snapshot.index.ntotal
+
+            if self.fragments >= self.ready_fragments and not self._ready.is_set():
+                self.first_ready_at = time.perf_counter()
+                print(f"⚡ 첫 조각 인덱싱 완료: {self.first_ready_at - self.started_at:.1f}초")
+                self._ready.set()
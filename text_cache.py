@@ -0,0 +1,91 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class TextCache:
+    """📌 SHA-256 키 → 텍스트 영구 캐시 (SQLite, 전체 크기 제한, LRU 삭제)"""
+
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key):
+        """📌 캐시된 텍스트 반환 (없으면 None)"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, text):
+        """📌 텍스트 저장 후 전체 크기가 한도를 넘으면 오래 사용하지 않은 항목부터 삭제"""
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()),
+            )
+            self._total += size - (previous[0] if previous else 0)
+
+            while self._total > self.max_bytes:
+                oldest = self._conn.execute(
+                    "SELECT key, size FROM cache WHERE key != ? ORDER BY last_used LIMIT 1", (key,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (oldest[0],))
+                self._total -= oldest[1]
+
+            self._conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes": self._total,
+        }
+
+
+def make_key(*parts):
+    """📌 여러 값(bytes / 문자열 / dict)을 합쳐 SHA-256 캐시 키 생성"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, dict):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False)
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(hashlib.sha256(part).digest())  # 경계가 섞이지 않도록 각 값을 따로 해시
+    return digest.hexdigest()
+
+
+def get_cache(path, max_bytes):
+    """📌 경로별로 프로세스 전체에서 공유하는 캐시 반환"""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = TextCache(path, max_bytes)
+        return _caches[path]
@@ -0,0 +1,14 @@
+try:
+    import tiktoken  # langchain-openai 설치 시 함께 설치됨
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text):
+    """📌 OpenAI 모델 기준 토큰 수 계산 (tiktoken이 없으면 글자 수로 근사)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 2)  # 한글 기준 대략 2글자당 1토큰
@@ -0,0 +1,96 @@
+import os
+import time
+import uuid
+import shutil
+
+# ✅ 작업(수집 1건)마다 별도 폴더를 사용해서 여러 세션이 동시에 수집해도 서로의 파일을 지우지 않도록 함
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "workspaces")
+WORKSPACE_TTL = int(os.getenv("WORKSPACE_TTL", 6 * 3600))  # 이 시간(초) 동안 사용하지 않은 작업 폴더는 정리
+
+# 작업 폴더 안의 하위 폴더 (기존 전역 폴더와 같은 이름)
+IMAGES_DIR = "download_images"
+CROPPED_DIR = "cropped_images"
+META_DIR = "main_image"
+TEXTS_DIR = "ocr_texts"
+INDEX_DIR = "faiss_index"
+INTERMEDIATE_DIRS = (IMAGES_DIR, CROPPED_DIR, TEXTS_DIR)  # 인덱싱이 끝나면 필요 없는 중간 결과
+
+
+class Workspace:
+    """📌 작업 하나의 파일 경로 묶음 (root="." 이면 기존처럼 현재 폴더 사용)"""
+
+    def __init__(self, root=".", job_id=None):
+        self.root = root
+        self.job_id = job_id
+        self.images_dir = os.path.join(root, IMAGES_DIR)
+        self.cropped_dir = os.path.join(root, CROPPED_DIR)
+        self.meta_dir = os.path.join(root, META_DIR)
+        self.texts_dir = os.path.join(root, TEXTS_DIR)
+        self.index_dir = os.path.join(root, INDEX_DIR)
+
+    @classmethod
+    def create(cls):
+        """📌 새 작업 폴더 생성 (오래된 작업 폴더도 함께 정리)"""
+        sweep_stale()
+        job_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        root = os.path.abspath(os.path.join(WORKSPACE_ROOT, job_id))  # 크롤링 작업자 프로세스와 경로 공유
+        os.makedirs(root)
+        return cls(root, job_id)
+
+    @property
+    def isolated(self):
+        return self.job_id is not None
+
+    def touch(self):
+        """📌 사용 중 표시 (오래된 작업 폴더 정리 대상에서 제외)"""
+        if self.isolated and os.path.isdir(self.root):
+            os.utime(self.root)
+
+    def __repr__(self):
+        return f"Workspace({self.root!r})"
+
+    def clear(self):
+        """이전 상품의 이미지/메타/HTML 파일 삭제"""
+        for folder in (self.images_dir, self.meta_dir, self.texts_dir):
+            if os.path.exists(folder):  # ✅ 폴더 존재 확인
+                for item in os.listdir(folder):  # ✅ 폴더 내부 파일 및 폴더 순회
+                    item_path = os.path.join(folder, item)
+
+                    if os.path.isfile(item_path):  # ✅ 파일이면 삭제
+                        os.remove(item_path)
+                    elif os.path.isdir(item_path):  # ✅ 폴더이면 폴더 삭제 (하위 파일 포함)
+                        shutil.rmtree(item_path)
+
+    def cleanup_intermediate(self):
+        """📌 인덱싱 완료 후 이미지/조각/OCR HTML 삭제 (메타 정보와 인덱스는 유지)"""
+        for name in INTERMEDIATE_DIRS:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def remove(self):
+        """📌 작업 폴더 전체 삭제 (현재 폴더를 쓰는 기본 작업 공간은 삭제하지 않음)"""
+        if self.isolated:
+            shutil.rmtree(self.root, ignore_errors=True)
+            print(f"🗑 작업 폴더 삭제 완료: {self.root}")
+
+
+def is_workspace_path(path):
+    """📌 path가 WORKSPACE_ROOT 아래의 작업 폴더인지 확인 (심볼릭 링크 / ".." 경로는 실제 위치 기준)"""
+    root = os.path.realpath(WORKSPACE_ROOT)
+    path = os.path.realpath(path)
+    return path != root and os.path.commonpath([root, path]) == root
+
+
+def sweep_stale(max_age=WORKSPACE_TTL):
+    """📌 max_age초 넘게 touch()되지 않은 작업 폴더 삭제 (세션이 끝나도 남은 폴더 정리)"""
+    if not os.path.isdir(WORKSPACE_ROOT):
+        return 0
+
+    removed = 0
+    now = time.time()
+    for entry in os.scandir(WORKSPACE_ROOT):
+        if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    if removed:
+        print(f"🗑 오래된 작업 폴더 {removed}개 삭제")
+    return removed